@@ -0,0 +1,87 @@
+"""
+Measures peak RSS of MediaImagekitStorage.save for growing file sizes.
+Every size runs in a fresh subprocess against a fake Imagekit endpoint consuming
+the request body in chunks, so no network access or credentials are needed.
+
+    python benchmarks/upload_memory.py 16 64 256
+    python benchmarks/upload_memory.py --legacy 16 64 256
+
+--legacy measures the former read() + base64 upload for comparison.
+"""
+import argparse
+import base64
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def get_peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def consume(data):
+    while data.read(64 * 1024):
+        pass
+
+
+def run(size_mb, legacy):
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.settings')
+    import django
+    django.setup()
+    from unittest import mock
+
+    from django.core.files import File
+    from imagekitio.models.results.UploadFileResult import UploadFileResult
+    from imagekitio.utils.utils import convert_to_response_object
+
+    from imagekitio_storage.resource import ImageKitResource
+    from imagekitio_storage.storage import MediaImagekitStorage
+
+    response = mock.Mock(status_code=200, headers={})
+    response.json.return_value = {'fileId': 'file-id', 'name': 'name', 'filePath': '/name', 'url': 'url',
+                                  'size': size_mb, 'AITags': [], 'versionInfo': {'id': 'file-id', 'name': 'v1'}}
+
+    def request(method, url, headers, params=None, files=None, data=None):
+        consume(data)
+        return response
+
+    def legacy_upload(self, file, file_name, options):
+        encoded = base64.b64encode(file.read())
+        len(encoded)
+        return convert_to_response_object(response, UploadFileResult)
+
+    with tempfile.TemporaryFile() as file:
+        file.truncate(size_mb * 1024 * 1024)
+        baseline = get_peak_rss_mb()
+        with mock.patch.object(ImageKitResource, 'request', side_effect=request), \
+                mock.patch('imagekitio_storage.storage.metadata_cache'):
+            if legacy:
+                with mock.patch.object(MediaImagekitStorage, '_upload', legacy_upload):
+                    MediaImagekitStorage().save('name', File(file, 'name'))
+            else:
+                MediaImagekitStorage().save('name', File(file, 'name'))
+        print('{:>8} MB  peak RSS growth {:8.1f} MB'.format(size_mb, get_peak_rss_mb() - baseline))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('sizes', nargs='*', type=int, default=[16, 64, 256], help='File sizes in MB.')
+    parser.add_argument('--legacy', action='store_true', help='Measure read() + base64 upload.')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run(args.sizes[0], args.legacy)
+        return
+    for size in args.sizes:
+        command = [sys.executable, __file__, '--child', str(size)] + (['--legacy'] if args.legacy else [])
+        subprocess.check_call(command)
+
+
+if __name__ == '__main__':
+    main()
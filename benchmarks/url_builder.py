@@ -0,0 +1,54 @@
+"""
+Compares building Imagekit urls with ik_api.url and with the package url builder,
+for unsigned and signed urls of paths and of sources with query transformations,
+checking that both build the same urls. No network access is needed.
+
+    python benchmarks/url_builder.py
+    python benchmarks/url_builder.py --number 100000
+"""
+import argparse
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = [
+    ('unsigned path', {'path': '/static/images/hero.jpg', 'transformation': [{'width': 640, 'format': 'webp'}],
+                       'transformation_position': 'query'}),
+    ('unsigned srcset variant', {'src': '{endpoint}/static/images/hero.jpg',
+                                 'transformation': [{'format': 'webp', 'width': 1280}],
+                                 'transformation_position': 'query'}),
+    ('signed path', {'path': '/media/private/report.jpg', 'transformation': [{'width': 640}], 'signed': True}),
+    ('signed srcset variant', {'src': '{endpoint}/media/private/report.jpg',
+                               'transformation': [{'width': 1280}], 'signed': True}),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=20000, help='Urls built per case and builder.')
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tests.settings')
+    import django
+    django.setup()
+
+    from imagekitio_storage import ik_api
+    from imagekitio_storage.url_builder import build_url
+
+    endpoint = ik_api.ik_request.url_endpoint.rstrip('/')
+    print('{:<26}{:>14}{:>14}{:>10}'.format('case', 'sdk us/url', 'native us/url', 'speedup'))
+    for name, options in CASES:
+        options = {key: value.format(endpoint=endpoint) if isinstance(value, str) else value
+                   for key, value in options.items()}
+        assert build_url(options) == ik_api.url(options), name
+        sdk = min(timeit.repeat(lambda: ik_api.url(options), number=args.number, repeat=3))
+        native = min(timeit.repeat(lambda: build_url(options), number=args.number, repeat=3))
+        print('{:<26}{:>14.2f}{:>14.2f}{:>9.1f}x'.format(
+            name, sdk / args.number * 1e6, native / args.number * 1e6, sdk / native))
+
+
+if __name__ == '__main__':
+    main()
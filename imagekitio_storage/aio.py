@@ -0,0 +1,122 @@
+import asyncio
+import tempfile
+import weakref
+
+import httpx
+from django.conf import settings
+from django.core.files.base import File
+from django.utils.module_loading import import_string
+from imagekitio.constants.url import URL
+from imagekitio.models.ListAndSearchFileRequestOptions import ListAndSearchFileRequestOptions
+from imagekitio.models.UploadFileRequestOptions import UploadFileRequestOptions
+from imagekitio.models.results.FileResult import FileResult
+from imagekitio.models.results.FileResultWithResponseMetadata import FileResultWithResponseMetadata
+from imagekitio.models.results.ListFileResult import ListFileResult
+from imagekitio.models.results.ResponseMetadataResult import ResponseMetadataResult
+from imagekitio.models.results.UploadFileResult import UploadFileResult
+from imagekitio.utils.formatter import request_formatter
+from imagekitio.utils.utils import (
+    convert_to_list_response_object, convert_to_response_metadata_result_object, convert_to_response_object,
+    general_api_throw_exception
+)
+
+from imagekitio_storage import app_settings
+from imagekitio_storage.resource import ImageKitResource
+
+# async clients are bound to the event loop they were created in
+_clients = weakref.WeakKeyDictionary()
+
+
+def create_async_client():
+    """
+    Default HTTP_ASYNC_CLIENT_FACTORY, creates client with connection pool of HTTP_POOL_SIZE connections.
+    """
+    limits = httpx.Limits(max_connections=app_settings.HTTP_POOL_SIZE,
+                          max_keepalive_connections=app_settings.HTTP_POOL_SIZE)
+    transport = httpx.AsyncHTTPTransport(limits=limits, retries=app_settings.HTTP_MAX_RETRIES)
+    timeout = httpx.Timeout(app_settings.HTTP_READ_TIMEOUT, connect=app_settings.HTTP_CONNECT_TIMEOUT)
+    return httpx.AsyncClient(transport=transport, timeout=timeout)
+
+
+def get_async_client():
+    """
+    Returns async HTTP client shared by all async storage I/O running in the current event loop.
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        factory = app_settings.HTTP_ASYNC_CLIENT_FACTORY
+        if isinstance(factory, str):
+            factory = import_string(factory)
+        client = _clients[loop] = factory()
+    return client
+
+
+async def aclose_async_client():
+    """
+    Closes client of the current event loop, to be called on ASGI lifespan shutdown.
+    """
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+async def adownload(url):
+    """
+    Downloads file to a temporary file kept in memory up to FILE_UPLOAD_MAX_MEMORY_SIZE bytes.
+    Returns None when the file doesn't exist.
+    """
+    async with get_async_client().stream('GET', url, headers={'Accept-Encoding': 'identity'}) as response:
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        file = tempfile.SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+        async for chunk in response.aiter_bytes():
+            file.write(chunk)
+    file.seek(0)
+    return File(file)
+
+
+class AsyncImageKitResource(ImageKitResource):
+    """
+    Coroutine counterparts of Imagekit API calls made by storages,
+    sent with the async client of the running event loop.
+    """
+
+    @staticmethod
+    async def arequest(method, url, headers, params=None, files=None, data=None):
+        return await get_async_client().request(method, url, params=params, files=files, data=data,
+                                                headers=headers)
+
+    async def aupload(self, file, file_name: str, options: UploadFileRequestOptions = None) -> UploadFileResult:
+        """
+        Uploads file object as binary multipart body streamed from the file in chunks.
+        """
+        fields = self.get_upload_fields(file_name, options)
+        resp = await self.arequest(
+            "POST", url="{}/api/v1/files/upload".format(URL.UPLOAD_BASE_URL), headers=self.create_headers(),
+            data=fields, files={"file": (file_name, file, "application/octet-stream")}
+        )
+        return self.get_upload_result(resp)
+
+    async def aget_file_details(self, file_id: str) -> FileResultWithResponseMetadata:
+        url = "{}/v1/files/{}/details".format(URL.API_BASE_URL, file_id)
+        resp = await self.arequest("GET", url=url, headers=self.create_headers())
+        if resp.status_code == 200:
+            return convert_to_response_object(resp, FileResultWithResponseMetadata)
+        general_api_throw_exception(resp)
+
+    async def alist_files(self, options: ListAndSearchFileRequestOptions) -> ListFileResult:
+        url = "{}/v1/files".format(URL.API_BASE_URL)
+        params = {key: value for key, value in request_formatter(options.__dict__).items() if value is not None}
+        resp = await self.arequest("GET", url=url, headers=self.create_headers(), params=params)
+        if resp.status_code == 200:
+            return convert_to_list_response_object(resp, FileResult, ListFileResult)
+        general_api_throw_exception(resp)
+
+    async def adelete_file(self, file_id: str) -> ResponseMetadataResult:
+        url = "{}/v1/files/{}".format(URL.API_BASE_URL, file_id)
+        resp = await self.arequest("DELETE", url=url, headers=self.create_headers())
+        if resp.status_code == 204:
+            return convert_to_response_metadata_result_object(resp)
+        general_api_throw_exception(resp)
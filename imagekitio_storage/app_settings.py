@@ -1,6 +1,7 @@
 import importlib
 import os
 import sys
+import tempfile
 from operator import itemgetter
 
 from django.conf import settings
@@ -21,6 +22,9 @@ INVALID_VIDEO_ERROR_MESSAGE = user_settings.get('INVALID_VIDEO_ERROR_MESSAGE', '
 
 STATIC_TAG = user_settings.get('STATIC_TAG', None)
 STATICFILES_MANIFEST_ROOT = user_settings.get('STATICFILES_MANIFEST_ROOT', os.path.join(BASE_DIR, 'manifest'))
+STATICFILES_SYNC_STATE_NAME = user_settings.get('STATICFILES_SYNC_STATE_NAME', 'imagekit-sync-state.json')
+STATICFILES_URL_MANIFEST_NAME = user_settings.get('STATICFILES_URL_MANIFEST_NAME', 'imagekit-urls.json')
+STATIC_URL_TRANSFORMATIONS = user_settings.get('STATIC_URL_TRANSFORMATIONS', {})
 
 STATIC_IMAGES_EXTENSIONS = user_settings.get('STATIC_IMAGES_EXTENSIONS',
                                              [
@@ -83,6 +87,53 @@ DEFAULT_ROOT_FOLDER = UPLOAD_OPTIONS.get('folder', '/django-imagekitio-storage/'
 DEFAULT_MEDIA_FOLDER = MEDIA_TAG
 DEFAULT_STATIC_FOLDER = STATIC_TAG
 
+USE_FILE_PATH_AS_NAME = user_settings.get('USE_FILE_PATH_AS_NAME', False)
+
+BATCH_MAX_WORKERS = user_settings.get('BATCH_MAX_WORKERS', 8)
+SEARCH_QUERY_MAX_LENGTH = user_settings.get('SEARCH_QUERY_MAX_LENGTH', 2000)
+LIST_FILES_PAGE_SIZE = user_settings.get('LIST_FILES_PAGE_SIZE', 1000)
+LIST_FILES_PREFETCH = user_settings.get('LIST_FILES_PREFETCH', True)
+WALK_MAX_WORKERS = user_settings.get('WALK_MAX_WORKERS', 8)
+
+HTTP_SESSION_FACTORY = user_settings.get('HTTP_SESSION_FACTORY', 'imagekitio_storage.session.create_session')
+HTTP_ASYNC_CLIENT_FACTORY = user_settings.get('HTTP_ASYNC_CLIENT_FACTORY', 'imagekitio_storage.aio.create_async_client')
+HTTP_POOL_SIZE = user_settings.get('HTTP_POOL_SIZE', 10)
+HTTP_MAX_RETRIES = user_settings.get('HTTP_MAX_RETRIES', 0)
+HTTP_CONNECT_TIMEOUT = user_settings.get('HTTP_CONNECT_TIMEOUT', 10)
+HTTP_READ_TIMEOUT = user_settings.get('HTTP_READ_TIMEOUT', 120)
+
+OPEN_READ_AHEAD_SIZE = user_settings.get('OPEN_READ_AHEAD_SIZE', 256 * 1024)
+
+STATIC_URL_CACHE_SIZE = user_settings.get('STATIC_URL_CACHE_SIZE', 4096)
+SRCSET_WIDTHS = user_settings.get('SRCSET_WIDTHS', [320, 640, 960, 1280, 1920])
+SRCSET_CACHE_SIZE = user_settings.get('SRCSET_CACHE_SIZE', 4096)
+URL_TRANSFORMATION_CACHE_SIZE = user_settings.get('URL_TRANSFORMATION_CACHE_SIZE', 1024)
+
+RETRIED_UPLOAD_THRESHOLD = user_settings.get('RETRIED_UPLOAD_THRESHOLD', 20 * 1024 * 1024)
+RETRIED_UPLOAD_MAX_RETRIES = user_settings.get('RETRIED_UPLOAD_MAX_RETRIES', 5)
+RETRIED_UPLOAD_RETRY_DELAY = user_settings.get('RETRIED_UPLOAD_RETRY_DELAY', 1)
+RETRIED_UPLOAD_CHECKPOINT_DIR = user_settings.get('RETRIED_UPLOAD_CHECKPOINT_DIR',
+                                                  os.path.join(tempfile.gettempdir(), 'imagekitio-storage-uploads'))
+
+ASYNC_UPLOAD = user_settings.get('ASYNC_UPLOAD', False)
+ASYNC_UPLOAD_WORKERS = user_settings.get('ASYNC_UPLOAD_WORKERS', 4)
+ASYNC_UPLOAD_MAX_RETRIES = user_settings.get('ASYNC_UPLOAD_MAX_RETRIES', 5)
+ASYNC_UPLOAD_RETRY_DELAY = user_settings.get('ASYNC_UPLOAD_RETRY_DELAY', 1)
+ASYNC_UPLOAD_SPOOL_DIR = user_settings.get('ASYNC_UPLOAD_SPOOL_DIR',
+                                           os.path.join(tempfile.gettempdir(), 'imagekitio-storage-spool'))
+ASYNC_UPLOAD_SPOOL_URL = user_settings.get('ASYNC_UPLOAD_SPOOL_URL', None)
+
+DEFERRED_DELETE = user_settings.get('DEFERRED_DELETE', False)
+DEFERRED_DELETE_MAX_RETRIES = user_settings.get('DEFERRED_DELETE_MAX_RETRIES', 5)
+DEFERRED_DELETE_RETRY_DELAY = user_settings.get('DEFERRED_DELETE_RETRY_DELAY', 1)
+DEFERRED_DELETE_SHUTDOWN_TIMEOUT = user_settings.get('DEFERRED_DELETE_SHUTDOWN_TIMEOUT', 10)
+
+METADATA_CACHE_ALIAS = user_settings.get('METADATA_CACHE_ALIAS', 'default')
+METADATA_CACHE_TIMEOUT = user_settings.get('METADATA_CACHE_TIMEOUT', 60 * 60)
+METADATA_CACHE_LOCAL_TIMEOUT = user_settings.get('METADATA_CACHE_LOCAL_TIMEOUT', 5 * 60)
+METADATA_CACHE_NEGATIVE_TIMEOUT = user_settings.get('METADATA_CACHE_NEGATIVE_TIMEOUT', 10)
+METADATA_CACHE_MAX_ENTRIES = user_settings.get('METADATA_CACHE_MAX_ENTRIES', 1024)
+
 
 def set_credentials(user_attrs=user_settings):
     try:
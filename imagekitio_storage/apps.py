@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ImagekitStorageConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'imagekitio_storage'
+
+    def ready(self):
+        # routes Imagekit SDK requests through the shared keep-alive session
+        from imagekitio_storage import session  # noqa: F401
@@ -0,0 +1,161 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+
+from imagekitio_storage import app_settings
+
+CACHE_KEY_PREFIX = 'imagekitio_storage:metadata:'
+
+# cached in place of metadata of files known not to exist
+MISSING = False
+
+
+class LocalLRUCache(object):
+    """
+    Small thread-safe in-process LRU cache with per-entry expiry.
+    """
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_max_entries(self):
+        return self.max_entries if self.max_entries is not None else app_settings.METADATA_CACHE_MAX_ENTRIES
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires_at, value = self._data[key]
+            except KeyError:
+                return default
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        expires_at = time.monotonic() + timeout if timeout is not None else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            max_entries = self._get_max_entries()
+            while len(self._data) > max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class MetadataCache(object):
+    """
+    Two-tier cache of Imagekit file metadata keyed by stored name.
+    The first tier is an in-process LRU, the second one is the Django cache
+    configured with METADATA_CACHE_ALIAS, so that workers share warmed entries.
+    Files known not to exist are cached as MISSING for METADATA_CACHE_NEGATIVE_TIMEOUT seconds.
+    Setting METADATA_CACHE_TIMEOUT to 0 disables caching altogether.
+    """
+
+    def __init__(self):
+        self.local = LocalLRUCache()
+
+    @property
+    def enabled(self):
+        return bool(app_settings.METADATA_CACHE_TIMEOUT)
+
+    @property
+    def shared(self):
+        alias = app_settings.METADATA_CACHE_ALIAS
+        return caches[alias] if alias else None
+
+    @staticmethod
+    def make_key(name):
+        return CACHE_KEY_PREFIX + hashlib.md5(str(name).encode('utf-8')).hexdigest()
+
+    def _get_local_timeout(self, timeout=None):
+        timeout = timeout if timeout is not None else app_settings.METADATA_CACHE_TIMEOUT
+        return min(app_settings.METADATA_CACHE_LOCAL_TIMEOUT, timeout)
+
+    def get(self, name):
+        """
+        Returns cached metadata, MISSING for files known not to exist or None on a cache miss.
+        """
+        if not self.enabled:
+            return None
+        metadata = self.local.get(name)
+        if metadata is not None:
+            return metadata
+        shared = self.shared
+        if shared is None:
+            return None
+        metadata = shared.get(self.make_key(name))
+        if metadata is not None:
+            timeout = app_settings.METADATA_CACHE_NEGATIVE_TIMEOUT if metadata is MISSING else None
+            self.local.set(name, metadata, self._get_local_timeout(timeout))
+        return metadata
+
+    def set(self, name, metadata, timeout=None):
+        if not self.enabled:
+            return
+        timeout = timeout if timeout is not None else app_settings.METADATA_CACHE_TIMEOUT
+        self.local.set(name, metadata, self._get_local_timeout(timeout))
+        shared = self.shared
+        if shared is not None:
+            shared.set(self.make_key(name), metadata, timeout)
+
+    def set_missing(self, name):
+        timeout = app_settings.METADATA_CACHE_NEGATIVE_TIMEOUT
+        if timeout:
+            self.set(name, MISSING, timeout)
+        else:
+            self.delete(name)
+
+    def delete(self, name):
+        self.local.delete(name)
+        shared = self.shared
+        if shared is not None:
+            shared.delete(self.make_key(name))
+
+    async def aget(self, name):
+        """
+        Coroutine counterpart of get, the shared tier is queried in a worker thread
+        only when the in-process tier misses.
+        """
+        if not self.enabled:
+            return None
+        metadata = self.local.get(name)
+        if metadata is not None:
+            return metadata
+        return await sync_to_async(self.get, thread_sensitive=False)(name)
+
+    async def aset(self, name, metadata, timeout=None):
+        await sync_to_async(self.set, thread_sensitive=False)(name, metadata, timeout)
+
+    async def aset_missing(self, name):
+        await sync_to_async(self.set_missing, thread_sensitive=False)(name)
+
+    async def adelete(self, name):
+        await sync_to_async(self.delete, thread_sensitive=False)(name)
+
+    def clear(self):
+        """
+        Clears only the in-process tier, as the shared Django cache
+        can be used by other parts of the project.
+        """
+        self.local.clear()
+
+
+metadata_cache = MetadataCache()
@@ -1,7 +1,15 @@
-from django.db import models
+import atexit
+import os
+import queue
+import threading
+import time
+
+from django.db import models, transaction
 from django.forms.models import model_to_dict
 
-from imagekitio_storage import ik_api
+from imagekitio_storage import app_settings, logger
+from imagekitio_storage.storage import BULK_DELETE_MAX_FILES, MediaImagekitStorage
+from imagekitio_storage.uploads import RETRIED_EXCEPTIONS
 
 
 def imagekit_delete_file_receiver(signal=None, **kwargs):
@@ -19,23 +27,120 @@ def imagekit_delete_file_receiver(signal=None, **kwargs):
     return _decorator
 
 
-def _delete_files(file):
-    """ Deletes files from imagekitio. """
-    file_id = str(file)
+def _delete_files(files):
+    """ Deletes files from imagekitio with as few bulk delete requests as possible. """
+    # file names are resolved to file ids the same way by all media storages
+    return MediaImagekitStorage().delete_many(str(file) for file in files)
+
+
+class DeferredDeleteQueue(object):
+    """
+    Deletes queued files in a background thread, coalescing files queued within linger seconds
+    into bulk delete requests and retrying transient failures with exponential backoff.
+    Files which still cannot be deleted are logged, remove_orphaned_media command removes them later.
+    """
+
+    def __init__(self, linger=0.1):
+        self.linger = linger
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def put(self, names):
+        self._ensure_worker()
+        for name in names:
+            self._queue.put(str(name))
+
+    def _ensure_worker(self):
+        with self._lock:
+            # threads don't survive fork, so forked workers start their own one
+            if self._thread is None or not self._thread.is_alive() or self._pid != os.getpid():
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='imagekit-deferred-delete', daemon=True)
+                self._thread.start()
+
+    def _get_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.linger
+        while len(batch) < BULK_DELETE_MAX_FILES:
+            try:
+                batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                break
+        return batch
 
-    response = ik_api.delete_file(file_id=file_id)
-    return response.response_metadata
+    def _run(self):
+        while True:
+            batch = self._get_batch()
+            try:
+                self._delete(batch)
+            except Exception:
+                logger.exception('Deferred deletion of %d files failed, they are left in Imagekit: %s',
+                                 len(batch), ', '.join(batch))
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    @staticmethod
+    def _delete(names):
+        attempt = 0
+        while True:
+            try:
+                return MediaImagekitStorage().delete_many(names)
+            except RETRIED_EXCEPTIONS as e:
+                if attempt >= app_settings.DEFERRED_DELETE_MAX_RETRIES:
+                    raise
+                attempt += 1
+                logger.warning('Deferred deletion of %d files failed (%s), retrying (%d/%d)', len(names), e,
+                               attempt, app_settings.DEFERRED_DELETE_MAX_RETRIES)
+                time.sleep(app_settings.DEFERRED_DELETE_RETRY_DELAY * 2 ** (attempt - 1))
+
+    def join(self, timeout=None):
+        """
+        Waits until queued files are deleted, returns False when timeout passes first.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+
+delete_queue = DeferredDeleteQueue()
+
+
+@atexit.register
+def _flush_delete_queue():
+    delete_queue.join(timeout=app_settings.DEFERRED_DELETE_SHUTDOWN_TIMEOUT)
 
 
 def delete_imagekit_files(instance=None, fields=None, *args, **kwargs):
+    """
+    Deletes files of the instance fields. With DEFERRED_DELETE setting, files are deleted
+    in the background once the transaction deleting the instance is committed, and not at all
+    when it is rolled back.
+    """
     if fields is None:
         fields = []
 
     if instance:
         model = model_to_dict(instance)
 
+        files = []
         for field in fields:
             if model[field]:
-                _delete_files(model[field])
+                files.append(model[field])
             else:
                 raise KeyError(f"{field} is not found in instance")
+        if files:
+            if app_settings.DEFERRED_DELETE:
+                names = [str(file) for file in files]
+                transaction.on_commit(lambda: delete_queue.put(names), using=instance._state.db)
+            else:
+                _delete_files(files)
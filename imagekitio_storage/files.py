@@ -0,0 +1,123 @@
+import io
+
+from django.core.files.base import File
+
+from imagekitio_storage import app_settings
+from imagekitio_storage.session import get_session
+
+
+class RemoteFileIO(io.RawIOBase):
+    """
+    Read-only raw file object streaming a remote file over HTTP.
+    Sequential reads consume one streamed response, seeking elsewhere
+    reopens the stream at the new position with a Range request,
+    so memory usage doesn't depend on the file size.
+    """
+
+    def __init__(self, url, response=None, size=None):
+        super(RemoteFileIO, self).__init__()
+        self.url = url
+        self._response = response
+        self._position = 0
+        self._stream_position = 0
+        if size is None and response is not None:
+            size = self._get_size(response)
+        self.size = size
+
+    @staticmethod
+    def _get_size(response):
+        content_length = response.headers.get('content-length')
+        return int(content_length) if content_length is not None else None
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self._position + offset
+        elif whence == io.SEEK_END:
+            if self.size is None:
+                raise io.UnsupportedOperation('Size of the remote file is unknown.')
+            position = self.size + offset
+        else:
+            raise ValueError('Invalid whence ({}).'.format(whence))
+        if position < 0:
+            raise ValueError('Negative seek position {}.'.format(position))
+        self._position = position
+        return position
+
+    def _open_stream(self):
+        self._close_stream()
+        headers = {'Accept-Encoding': 'identity'}
+        if self._position:
+            headers['Range'] = 'bytes={}-'.format(self._position)
+        response = get_session().get(self.url, headers=headers, stream=True)
+        if response.status_code == 416:
+            response.close()
+            return None
+        response.raise_for_status()
+        self._response = response
+        self._stream_position = 0 if response.status_code == 200 else self._position
+        if self.size is None and response.status_code == 200:
+            self.size = self._get_size(response)
+        return response
+
+    def _close_stream(self):
+        if self._response is not None:
+            self._response.close()
+            self._response = None
+
+    def readinto(self, buffer):
+        if self.size is not None and self._position >= self.size:
+            return 0
+        if self._response is None or self._stream_position != self._position:
+            if self._response is not None and 0 < self._position - self._stream_position <= len(buffer):
+                self._skip(self._position - self._stream_position)
+            else:
+                if self._open_stream() is None:
+                    return 0
+                # servers ignoring Range header send the file from the beginning
+                self._skip(self._position - self._stream_position)
+        data = self._response.raw.read(len(buffer))
+        size = len(data)
+        buffer[:size] = data
+        self._position += size
+        self._stream_position += size
+        return size
+
+    def _skip(self, count):
+        while count > 0:
+            data = self._response.raw.read(min(count, io.DEFAULT_BUFFER_SIZE))
+            if not data:
+                break
+            count -= len(data)
+            self._stream_position += len(data)
+
+    def close(self):
+        self._close_stream()
+        super(RemoteFileIO, self).close()
+
+
+class RemoteFile(File):
+    """
+    File returned by Imagekit storages' open, reading through a read-ahead buffer
+    of OPEN_READ_AHEAD_SIZE bytes.
+    """
+
+    def __init__(self, url, name, mode='rb', response=None, size=None):
+        self.raw = RemoteFileIO(url, response=response, size=size)
+        file = io.BufferedReader(self.raw, buffer_size=app_settings.OPEN_READ_AHEAD_SIZE)
+        super(RemoteFile, self).__init__(file, name)
+        self.mode = mode
+
+    @property
+    def size(self):
+        return self.raw.size
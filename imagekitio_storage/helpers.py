@@ -1,33 +1,80 @@
+import copy
 import os
+import posixpath
+import re
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 from imagekitio.models.ListAndSearchFileRequestOptions import ListAndSearchFileRequestOptions
 
 from imagekitio_storage import ik_api, app_settings
 
+FILE_ID_RE = re.compile(r'^[0-9a-f]{24}$')
 
-def get_resources(path):
+
+def iter_list_files(options, page_size=None, prefetch=None):
+    """
+    Yields files listed with options, paging through results with skip and limit,
+    LIST_FILES_PAGE_SIZE files per request. Limit and skip of options bound the whole listing.
+    With LIST_FILES_PREFETCH the next page is requested while the current one is consumed.
+    """
+    page_size = page_size or app_settings.LIST_FILES_PAGE_SIZE
+    prefetch = app_settings.LIST_FILES_PREFETCH if prefetch is None else prefetch
+    remaining = getattr(options, 'limit', None)
+    skip = getattr(options, 'skip', None) or 0
+
+    def fetch(skip, limit):
+        page_options = copy.copy(options)
+        page_options.skip = skip
+        page_options.limit = limit
+        return ik_api.list_files(options=page_options).list
+
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    pending = None
+    try:
+        while remaining is None or remaining > 0:
+            limit = page_size if remaining is None else min(page_size, remaining)
+            page = pending.result() if pending is not None else fetch(skip, limit)
+            pending = None
+            skip += len(page)
+            if remaining is not None:
+                remaining -= len(page)
+            last_page = len(page) < limit or remaining == 0
+            if executor is not None and not last_page:
+                next_limit = page_size if remaining is None else min(page_size, remaining)
+                pending = executor.submit(fetch, skip, next_limit)
+            yield from page
+            if last_page:
+                return
+    finally:
+        if executor is not None:
+            if pending is not None:
+                pending.cancel()
+            executor.shutdown(wait=False)
+
+
+def iter_resources(path):
     options = ListAndSearchFileRequestOptions(
         type='file',
         sort='ASC_CREATED',
         path=path,
         file_type='all',
     )
-    resources = []
-    while True:
-        response = ik_api.list_files(options=options)
-        for resource in response.list:
-            resources.append(resource.url)
-        return resources
+    for resource in iter_list_files(options):
+        yield resource.url
 
 
-def get_resources_query(type: str = None,
-                        sort: str = None,
-                        path: str = None,
-                        search_query: str = None,
-                        file_type: str = None,
-                        limit: int = None,
-                        skip: int = None,
-                        tags=None):
+def get_resources(path):
+    return list(iter_resources(path))
+
+
+def iter_resources_query(type: str = None,
+                         sort: str = None,
+                         path: str = None,
+                         search_query: str = None,
+                         file_type: str = None,
+                         limit: int = None,
+                         skip: int = None,
+                         tags=None):
     options = ListAndSearchFileRequestOptions(
         type=type or 'file',
         sort=sort or 'ASC_CREATED',
@@ -38,12 +85,199 @@ def get_resources_query(type: str = None,
         skip=skip,
         tags=tags,
     )
-    resources = []
-    while True:
-        response = ik_api.list_files(options=options)
-        for resource in response.list:
-            resources.append(resource.__dict__)
-        return resources
+    for resource in iter_list_files(options):
+        yield resource.__dict__
+
+
+def get_resources_query(type: str = None,
+                        sort: str = None,
+                        path: str = None,
+                        search_query: str = None,
+                        file_type: str = None,
+                        limit: int = None,
+                        skip: int = None,
+                        tags=None):
+    return list(iter_resources_query(type=type, sort=sort, path=path, search_query=search_query,
+                                     file_type=file_type, limit=limit, skip=skip, tags=tags))
+
+
+def _quote(value):
+    return '"{}"'.format(value.replace('"', '\\"'))
+
+
+def get_resource_by_path_options(file_path):
+    """
+    Returns normalised file path and list files options of the search query finding it.
+    """
+    file_path = '/' + file_path.strip('/')
+    folder, name = posixpath.split(file_path)
+    options = ListAndSearchFileRequestOptions(
+        type='file',
+        path=folder,
+        search_query='name = {}'.format(_quote(name)),
+        file_type='all',
+    )
+    return file_path, options
+
+
+def find_resource_by_path(resources, file_path):
+    for resource in resources:
+        if resource.file_path == file_path:
+            return resource
+    return None
+
+
+def get_resource_by_path(file_path):
+    """
+    Finds a file by its Imagekit file path, returns None when it doesn't exist.
+    """
+    file_path, options = get_resource_by_path_options(file_path)
+    response = ik_api.list_files(options=options)
+    return find_resource_by_path(response.list, file_path)
+
+
+def get_names_search_queries(names, max_length=None):
+    """
+    Splits names into as few `name IN [...]` search queries as possible,
+    keeping every query within SEARCH_QUERY_MAX_LENGTH characters.
+    """
+    max_length = max_length or app_settings.SEARCH_QUERY_MAX_LENGTH
+    queries = []
+    chunk = []
+    length = len('name IN []')
+    for name in names:
+        quoted = _quote(name)
+        if chunk and length + len(quoted) + 2 > max_length:
+            queries.append((chunk, 'name IN [{}]'.format(', '.join(map(_quote, chunk)))))
+            chunk = []
+            length = len('name IN []')
+        chunk.append(name)
+        length += len(quoted) + 2
+    if chunk:
+        queries.append((chunk, 'name IN [{}]'.format(', '.join(map(_quote, chunk)))))
+    return queries
+
+
+def get_resources_by_paths(file_paths, executor=None):
+    """
+    Finds many files by their Imagekit file paths with one search query per folder
+    (or more when the query would be too long), run concurrently on the given executor.
+    Returns dictionary of found file paths, in the same form as passed, mapped to resources.
+    """
+    folders = {}
+    for file_path in file_paths:
+        folder, name = posixpath.split('/' + file_path.strip('/'))
+        folders.setdefault(folder, {})[name] = file_path
+
+    def search(folder, names, search_query):
+        options = ListAndSearchFileRequestOptions(
+            type='file',
+            path=folder,
+            search_query=search_query,
+            file_type='all',
+            limit=1000,
+        )
+        found = {}
+        for resource in ik_api.list_files(options=options).list:
+            folder_of_resource, name = posixpath.split(resource.file_path)
+            if folder_of_resource == folder and name in names:
+                found[names[name]] = resource
+        return found
+
+    calls = []
+    for folder, names in folders.items():
+        for chunk, search_query in get_names_search_queries(names):
+            calls.append((folder, {name: names[name] for name in chunk}, search_query))
+
+    resources = {}
+    if executor is None:
+        results = [search(*call) for call in calls]
+    else:
+        results = executor.map(lambda call: search(*call), calls)
+    for found in results:
+        resources.update(found)
+    return resources
+
+
+def list_folder(path, page_size=None, with_files=True):
+    """
+    Lists Imagekit folder path without its subfolders' contents.
+    Returns names of subfolders and files within the folder, files are not listed without with_files.
+    """
+    folders = ListAndSearchFileRequestOptions(type='folder', sort='ASC_NAME', path=path)
+    files = ListAndSearchFileRequestOptions(type='file', sort='ASC_NAME', path=path, file_type='all')
+    # folders are listed concurrently by walk_folders, so pages are not prefetched
+    subfolders = [folder.name for folder in iter_list_files(folders, page_size=page_size, prefetch=False)]
+    if not with_files:
+        return subfolders, []
+    return subfolders, list(iter_list_files(files, page_size=page_size, prefetch=False))
+
+
+def walk_folders(path, max_workers=None, page_size=None, with_files=True):
+    """
+    Yields (folder path, subfolder names, files) of Imagekit folder path and all its subfolders, top-down.
+    Up to WALK_MAX_WORKERS folders are listed concurrently and each one is yielded as soon as it is listed,
+    so siblings come in no particular order. Without with_files only folders are listed.
+    """
+    path = '/' + path.strip('/')
+    executor = ThreadPoolExecutor(max_workers=max_workers or app_settings.WALK_MAX_WORKERS)
+    pending = {executor.submit(list_folder, path, page_size, with_files): path}
+    try:
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                folder = pending.pop(future)
+                subfolders, files = future.result()
+                for subfolder in subfolders:
+                    subfolder_path = posixpath.join(folder, subfolder)
+                    pending[executor.submit(list_folder, subfolder_path, page_size, with_files)] = subfolder_path
+                yield folder, subfolders, files
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+def get_resources_index(path, page_size=None):
+    """
+    Lists all files within the folder path, including subfolders, with one request
+    per LIST_FILES_PAGE_SIZE files. Returns dictionary of file paths mapped to file metadata.
+    """
+    index = {}
+    for folder, subfolders, files in walk_folders(path, page_size=page_size):
+        for resource in files:
+            index[resource.file_path] = get_resource_metadata(resource)
+    return index
+
+
+def get_remote_file_name(file_name):
+    """
+    Imagekit replaces characters other than alphanumerics, dots and dashes in file names with underscores.
+    """
+    return re.sub(r'[^a-zA-Z0-9.\-]', '_', file_name)
+
+
+def is_file_id(name):
+    """
+    Returns whether the name is an Imagekit file id, which are 24 hexadecimal characters.
+    """
+    return FILE_ID_RE.match(str(name)) is not None
+
+
+def get_resource_metadata(resource):
+    """
+    Returns picklable subset of Imagekit file details or upload result,
+    which is enough to answer url, exists and size without any API call.
+    """
+    return {
+        'file_id': resource.file_id,
+        'name': resource.name,
+        'file_path': resource.file_path,
+        'url': resource.url,
+        'size': resource.size,
+        'created_at': getattr(resource, 'created_at', None),
+        'updated_at': getattr(resource, 'updated_at', None),
+    }
 
 
 def get_uploaded_media_file_name_from_url(url, index=-1):
@@ -61,7 +295,6 @@ def get_uploaded_media_path_from_url(url):
     file = get_uploaded_media_file_name_from_url(url)
     url = url.split(endpoint)[1]
     url = url.split(file)[0].strip('/')
-    print(url)
     return url
 
 
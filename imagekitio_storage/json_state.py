@@ -0,0 +1,53 @@
+import json
+import threading
+
+from django.core.files.base import ContentFile
+
+
+class JSONState(object):
+    """
+    State kept as one JSON file in a storage, loaded once on first access and written as a whole.
+    The file is ignored when it was written by another version or for another target,
+    Imagekit account and upload folder. Subclasses turn the stored payload into their state with _load.
+    """
+    version = '1.0'
+
+    def __init__(self, storage, name, target):
+        self.storage = storage
+        self.name = name
+        self.target = target
+        self._state = None
+        self._lock = threading.Lock()
+
+    def _read(self):
+        """
+        Returns the stored payload, None when the file is missing, invalid or of another version or target.
+        """
+        try:
+            with self.storage.open(self.name) as state_file:
+                payload = json.loads(state_file.read().decode('utf-8'))
+        except (IOError, ValueError):
+            return None
+        if not isinstance(payload, dict) or payload.get('version') != self.version or \
+                payload.get('target') != self.target:
+            return None
+        return payload
+
+    def _load(self):
+        raise NotImplementedError
+
+    @property
+    def state(self):
+        if self._state is None:
+            with self._lock:
+                if self._state is None:
+                    self._state = self._load()
+        return self._state
+
+    def _dumps(self, payload):
+        return json.dumps(dict(payload, version=self.version, target=self.target), sort_keys=True).encode('utf-8')
+
+    def _write(self, contents):
+        if self.storage.exists(self.name):
+            self.storage.delete(self.name)
+        self.storage._save(self.name, ContentFile(contents))
@@ -1,5 +1,14 @@
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
 from django.conf import settings
 from django.contrib.staticfiles.management.commands import collectstatic
+from django.core.files.base import File
+from django.core.management.base import CommandError
+
+_task = threading.local()
 
 
 class Command(collectstatic.Command):
@@ -7,15 +16,183 @@ class Command(collectstatic.Command):
         super(Command, self).add_arguments(parser)
         parser.add_argument('--upload-unhashed-files', action='store_true', dest='upload_unhashed_files',
                             help='Use only when you need it. Use when also want to upload unhashed. ')
+        parser.add_argument('--jobs', type=int, default=1, dest='jobs',
+                            help='Number of files copied and uploaded during post-processing concurrently.')
+        parser.add_argument('--verify-remote', action='store_true', dest='verify_remote',
+                            help='Check uploaded files with Imagekit instead of the local sync state.')
 
     def set_options(self, **options):
         super(Command, self).set_options(**options)
         self.upload_unhashed_files = options['upload_unhashed_files']
+        self.verify_remote = options['verify_remote']
+        self.jobs = options['jobs']
+        if self.jobs < 1:
+            raise CommandError('--jobs must be a positive number.')
+        self.executor = None
+        self.pending = deque()
+        self.submitted_paths = []
+
+    def collect(self):
+        """
+        Imagekit storages answer metadata lookups from one listing of the static folder during the run,
+        their local sync state is saved once files are collected and their url manifest once all
+        of them are collected successfully.
+        """
+        imagekit_storage = hasattr(self.storage, 'sync_state')
+        if imagekit_storage:
+            self.storage.verify_remote = self.verify_remote
+            self.storage.prefetch_inventory()
+        try:
+            if self.jobs == 1:
+                collected = super(Command, self).collect()
+            else:
+                collected = self.collect_concurrently()
+            if imagekit_storage and not self.dry_run:
+                self.storage.save_url_manifest()
+        finally:
+            if imagekit_storage:
+                del self.storage.verify_remote
+                self.storage.clear_inventory()
+                if not self.dry_run:
+                    self.storage.save_sync_state()
+        return collected
+
+    def collect_concurrently(self):
+        """
+        Copies files and uploads post-processed files on a thread pool of --jobs threads.
+        Results are reported in the order files were found and the first error stops the command
+        once running uploads finish.
+        """
+        self.executor = ThreadPoolExecutor(max_workers=self.jobs)
+        wrapped = hasattr(self.storage, 'post_process')
+        if wrapped:
+            self.storage.post_process = self.get_post_process(self.storage.post_process)
+        try:
+            collected = super(Command, self).collect()
+            self.report_results(wait=True)
+        except BaseException:
+            for future, path in self.pending:
+                future.cancel()
+            raise
+        finally:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+            if wrapped:
+                del self.storage.post_process
+
+        # collected lists are built before the last submitted tasks finish
+        order = {path: index for index, path in enumerate(self.submitted_paths)}
+        for paths in (self.copied_files, self.unmodified_files):
+            paths.sort(key=lambda path: order.get(path, len(order)))
+        collected.update({
+            'modified': self.copied_files + self.symlinked_files,
+            'unmodified': self.unmodified_files,
+            'post_processed': self.post_processed_files,
+        })
+        return collected
+
+    def get_post_process(self, post_process):
+        """
+        Wraps storage post_process, so that it starts after copied files are uploaded
+        and the uploads of Imagekit storages run on the thread pool.
+        """
+        def deferred_post_process(paths, dry_run=False, **options):
+            self.report_results(wait=True)
+            deferred = hasattr(self.storage, '_get_saved_name')
+            if deferred:
+                self.storage._save = self.get_deferred_save(self.storage._save)
+            try:
+                for processed in post_process(paths, dry_run=dry_run, **options):
+                    yield processed
+                    self.report_results()
+            finally:
+                if deferred:
+                    del self.storage._save
+
+        return deferred_post_process
+
+    def get_deferred_save(self, save):
+        def deferred_save(name, content):
+            # post-processing closes source files once saved, so the content is spooled first
+            spooled = tempfile.SpooledTemporaryFile(max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+            for chunk in content.chunks():
+                spooled.write(chunk)
+            spooled.seek(0)
+
+            def upload():
+                try:
+                    save(name, File(spooled, name))
+                finally:
+                    spooled.close()
+
+            self.submit(name, upload)
+            return self.storage._get_saved_name(name)
+
+        return deferred_save
+
+    def submit(self, path, function, *args):
+        """
+        Runs function on the thread pool, keeping at most two tasks per job queued.
+        """
+        self.submitted_paths.append(path)
+        self.pending.append((self.executor.submit(self.run_task, function, *args), path))
+        self.report_results()
+
+    def run_task(self, function, *args):
+        _task.messages = messages = []
+        try:
+            function(*args)
+        except Exception as e:
+            return messages, e
+        finally:
+            _task.messages = None
+        return messages, None
+
+    def report_results(self, wait=False):
+        """
+        Reports finished tasks in submission order, raising the first error.
+        """
+        while self.pending and (wait or self.pending[0][0].done() or len(self.pending) > self.jobs * 2):
+            future, path = self.pending.popleft()
+            messages, error = future.result()
+            for msg, level in messages:
+                super(Command, self).log(msg, level=level)
+            if error is not None:
+                self.stderr.write("Uploading '%s' failed!" % path)
+                self.stderr.write()
+                raise error
+
+    def log(self, msg, level=2):
+        messages = getattr(_task, 'messages', None)
+        if messages is not None:
+            messages.append((msg, level))
+        else:
+            super(Command, self).log(msg, level=level)
 
     def delete_file(self, path, prefixed_path, source_storage):
         """
         Override to prevent any deleting during command execution.
+        Files not modified since their upload are skipped, based on the local sync state
+        or, with --verify-remote, on Imagekit file details.
         """
+        if prefixed_path in self.unmodified_files:
+            return False
+        if hasattr(self.storage, 'sync_state') and not self.verify_remote:
+            with source_storage.open(path) as source_file:
+                synced = self.storage.is_synced(prefixed_path, source_file)
+            if synced:
+                self.unmodified_files.append(prefixed_path)
+                self.log("Skipping '%s' (not modified)" % path)
+            return not synced
+        try:
+            target_last_modified = self.storage.get_modified_time(prefixed_path)
+            source_last_modified = source_storage.get_modified_time(path)
+        except (OSError, NotImplementedError, AttributeError):
+            return True
+        if target_last_modified.replace(microsecond=0) >= source_last_modified.replace(microsecond=0):
+            self.unmodified_files.append(prefixed_path)
+            self.log("Skipping '%s' (not modified)" % path)
+            return False
         return True
 
     def copy_file(self, path, prefixed_path, source_storage):
@@ -25,4 +202,7 @@ class Command(collectstatic.Command):
         """
         if (settings.STATICFILES_STORAGE == 'imagekitio_storage.storage.StaticImagekitStorage' or
             self.upload_unhashed_files):
-            super(Command, self).copy_file(path, prefixed_path, source_storage)
+            if self.executor is not None:
+                self.submit(prefixed_path, super(Command, self).copy_file, path, prefixed_path, source_storage)
+            else:
+                super(Command, self).copy_file(path, prefixed_path, source_storage)
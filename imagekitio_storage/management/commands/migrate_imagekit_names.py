@@ -0,0 +1,68 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import models
+from imagekitio.exceptions.BadRequestException import BadRequestException
+from imagekitio.exceptions.UnknownException import UnknownException
+
+from imagekitio_storage import app_settings, ik_api
+from imagekitio_storage.helpers import is_file_id
+from imagekitio_storage.storage import MediaImagekitStorage, StaticImagekitStorage
+
+
+def get_imagekit_file_fields():
+    """
+    Yields (model, field) pairs of every file field kept in an Imagekit media storage.
+    """
+    for model in apps.get_models():
+        for field in model._meta.concrete_fields:
+            if not isinstance(field, models.FileField):
+                continue
+            storage = field.storage
+            if isinstance(storage, MediaImagekitStorage) and not isinstance(storage, StaticImagekitStorage):
+                yield model, field
+
+
+class Command(BaseCommand):
+    help = 'Rewrites Imagekit file ids kept in model file fields to Imagekit file paths, ' \
+           'to be used together with USE_FILE_PATH_AS_NAME setting.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', dest='dry_run',
+                            help='Only report values that would be rewritten.')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        if not app_settings.USE_FILE_PATH_AS_NAME:
+            self.stdout.write('USE_FILE_PATH_AS_NAME setting is disabled, new uploads will still be named by file id.')
+        migrated = 0
+        for model, field in get_imagekit_file_fields():
+            migrated += self.migrate_field(model, field, dry_run)
+        verb = 'would be rewritten' if dry_run else 'rewritten'
+        self.stdout.write('{} file names {}.'.format(migrated, verb))
+
+    def migrate_field(self, model, field, dry_run):
+        manager = model._default_manager
+        queryset = manager.exclude(**{field.attname: ''}).exclude(**{field.attname + '__contains': '/'})
+        migrated = 0
+        for pk, file_id in queryset.values_list('pk', field.attname).iterator():
+            if not is_file_id(file_id):
+                # file path of a file kept in the root folder
+                continue
+            try:
+                file_path = ik_api.get_file_details(file_id=file_id).file_path.lstrip('/')
+            except (BadRequestException, UnknownException) as e:
+                if isinstance(e, UnknownException) and \
+                        (e.response_metadata is None or e.response_metadata.http_status_code != 404):
+                    raise
+                self.stderr.write('{}.{} of {} refers to not existing file {}.'.format(
+                    model.__name__, field.name, pk, file_id))
+                continue
+            if field.max_length is not None and len(file_path) > field.max_length:
+                self.stderr.write('{}.{} of {} cannot keep {}, it is longer than {} characters.'.format(
+                    model.__name__, field.name, pk, file_path, field.max_length))
+                continue
+            if not dry_run:
+                manager.filter(pk=pk).update(**{field.attname: file_path})
+            self.stdout.write('{}.{} of {}: {} -> {}'.format(model.__name__, field.name, pk, file_id, file_path))
+            migrated += 1
+        return migrated
@@ -0,0 +1,245 @@
+import datetime
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+from imagekitio.models.ListAndSearchFileRequestOptions import ListAndSearchFileRequestOptions
+
+from imagekitio_storage import app_settings
+from imagekitio_storage.helpers import iter_list_files, walk_folders
+from imagekitio_storage.management.commands.migrate_imagekit_names import get_imagekit_file_fields
+from imagekitio_storage.storage import BULK_DELETE_MAX_FILES, MediaImagekitStorage, StaticImagekitStorage
+
+# maximum number of SQLite query parameters supported by all SQLite versions
+SQLITE_MAX_VARIABLES = 999
+
+# hours after upload files become candidates for removal, so that files of model instances
+# being saved, or spooled for upload, are left alone
+DEFAULT_MIN_AGE = 6
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class NameSet(object):
+    """
+    Set of names kept in a temporary on-disk SQLite database,
+    so that memory usage doesn't depend on the number of names.
+    """
+
+    def __init__(self):
+        # an empty file name makes SQLite create a private temporary file removed once closed
+        self.connection = sqlite3.connect('')
+        self.connection.execute('CREATE TABLE names (name TEXT PRIMARY KEY) WITHOUT ROWID')
+
+    def update(self, names):
+        for chunk in chunked(names, SQLITE_MAX_VARIABLES):
+            self.connection.executemany('INSERT OR IGNORE INTO names VALUES (?)', [(name,) for name in chunk])
+        self.connection.commit()
+
+    def intersection(self, names):
+        """
+        Returns set of the given names kept in the set.
+        """
+        found = set()
+        for chunk in chunked(set(names), SQLITE_MAX_VARIABLES):
+            query = 'SELECT name FROM names WHERE name IN ({})'.format(', '.join('?' * len(chunk)))
+            found.update(name for name, in self.connection.execute(query, chunk))
+        return found
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM names').fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class Command(BaseCommand):
+    help = 'Removes files kept in Imagekit media folders, which are not referenced by any model file field.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive',
+                            help='Do NOT prompt the user for input of any kind.')
+        parser.add_argument('--dry-run', action='store_true', dest='dry_run',
+                            help='Only report files that would be removed.')
+        parser.add_argument('--batch-size', type=int, default=BULK_DELETE_MAX_FILES, dest='batch_size',
+                            help='Number of files removed by one task, batches larger than {} files '
+                                 'take more than one request.'.format(BULK_DELETE_MAX_FILES))
+        parser.add_argument('--jobs', type=int, default=None, dest='jobs',
+                            help='Number of batches removed concurrently, BATCH_MAX_WORKERS by default.')
+        parser.add_argument('--min-age', type=float, default=DEFAULT_MIN_AGE, dest='min_age',
+                            help='Only remove files uploaded at least this many hours ago, '
+                                 '{} by default.'.format(DEFAULT_MIN_AGE))
+
+    def set_options(self, **options):
+        self.interactive = options['interactive']
+        self.dry_run = options['dry_run']
+        self.verbosity = options['verbosity']
+        self.batch_size = options['batch_size']
+        self.jobs = options['jobs'] or app_settings.BATCH_MAX_WORKERS
+        if self.batch_size < 1 or self.jobs < 1:
+            raise CommandError('--batch-size and --jobs must be positive numbers.')
+        if options['min_age'] < 0:
+            raise CommandError('--min-age cannot be negative.')
+        self.created_before = (datetime.datetime.now(datetime.timezone.utc) -
+                               datetime.timedelta(hours=options['min_age']))
+
+    def handle(self, *args, **options):
+        self.set_options(**options)
+        fields = list(get_imagekit_file_fields())
+        folders = self.get_folders(fields)
+        if not folders:
+            self.stdout.write('There are no model file fields kept in Imagekit media storages.')
+            return
+        self.static_folder = self.get_static_folder()
+        if self.static_folder is not None and any(self.is_within(folder, self.static_folder) for folder in folders):
+            raise CommandError('Static files are kept in Imagekit folder {} together with media files, so orphaned '
+                               'media cannot be told apart from them. Set STATIC_TAG or MEDIA_TAG setting to keep '
+                               'them in separate folders.'.format(self.static_folder))
+        if self.interactive and not self.dry_run:
+            message = ('This will permanently remove files from Imagekit folders {}, which are not referenced '
+                       'by any model file field.\nAre you sure you want to do this?\n\n'
+                       "Type 'yes' to continue, or 'no' to cancel: ".format(', '.join(folders)))
+            if input(message) != 'yes':
+                raise CommandError('Removing orphaned media cancelled.')
+
+        start = time.monotonic()
+        with NameSet() as referenced:
+            for model, field in fields:
+                referenced.update(self.get_referenced_names(model, field))
+            self.log('{} referenced file names found.'.format(len(referenced)), level=2)
+            listed, removed = self.remove_orphans(self.get_orphans(folders, referenced))
+        elapsed = time.monotonic() - start
+
+        verb = 'would be removed' if self.dry_run else 'removed'
+        self.stdout.write('{} of {} files {} in {:.2f}s ({:.1f} files/s).'.format(
+            removed, listed, verb, elapsed, listed / elapsed if elapsed else 0))
+
+    @staticmethod
+    def get_referenced_names(model, field):
+        """
+        Streams names kept in the field, Imagekit file ids or file paths.
+        """
+        queryset = model._default_manager.exclude(**{field.attname: ''}).exclude(**{field.attname: None})
+        return queryset.values_list(field.attname, flat=True).iterator()
+
+    @staticmethod
+    def get_folders(fields):
+        """
+        Returns Imagekit folders of storages used by the fields, without folders nested in other ones.
+        """
+        folders = sorted({field.storage._get_folder_path('') for model, field in fields})
+        return [folder for folder in folders
+                if not any(folder != parent and folder.startswith(parent.rstrip('/') + '/') for parent in folders)]
+
+    @staticmethod
+    def get_static_folder():
+        """
+        Returns Imagekit folder of static files, None when they are not kept in Imagekit.
+        """
+        if not isinstance(staticfiles_storage, StaticImagekitStorage):
+            return None
+        return staticfiles_storage._get_folder_path('')
+
+    @staticmethod
+    def is_within(folder, parent):
+        return folder == parent or folder.startswith(parent.rstrip('/') + '/')
+
+    def iter_files(self, folders):
+        """
+        Streams files within the folders and their subfolders page by page, leaving out static files
+        when they are kept under a media folder.
+        """
+        for path in folders:
+            for folder, subfolders, files in walk_folders(path, with_files=False):
+                if self.static_folder is not None and self.is_within(folder, self.static_folder):
+                    continue
+                options = ListAndSearchFileRequestOptions(type='file', sort='ASC_CREATED', path=folder,
+                                                          file_type='all')
+                yield from iter_list_files(options)
+
+    def is_old_enough(self, resource):
+        """
+        Returns whether the file was uploaded at least --min-age hours ago,
+        files without upload time are left alone, as their age is unknown.
+        """
+        created_at = parse_datetime(resource.created_at) if resource.created_at else None
+        if created_at is None:
+            return False
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=datetime.timezone.utc)
+        return created_at <= self.created_before
+
+    def get_orphans(self, folders, referenced):
+        self.listed = 0
+        for page in chunked(self.iter_files(folders), app_settings.LIST_FILES_PAGE_SIZE):
+            self.listed += len(page)
+            found = referenced.intersection([resource.file_id for resource in page] +
+                                            [resource.file_path.lstrip('/') for resource in page])
+            for resource in page:
+                if resource.file_id not in found and resource.file_path.lstrip('/') not in found and \
+                        self.is_old_enough(resource):
+                    yield resource
+
+    def remove_orphans(self, orphans):
+        """
+        Removes orphans in batches of --batch-size files, --jobs batches at a time.
+        Returns numbers of listed and removed files.
+        """
+        removed = 0
+        if self.dry_run:
+            for resource in orphans:
+                self.log('Would remove {}'.format(resource.file_path))
+                removed += 1
+            return self.listed, removed
+
+        storage = MediaImagekitStorage()
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            try:
+                for batch in chunked(orphans, self.batch_size):
+                    pending.append((executor.submit(self.remove_batch, storage, batch), batch))
+                    while len(pending) > self.jobs * 2 or (pending and pending[0][0].done()):
+                        removed += self.report_batch(*pending.popleft())
+                while pending:
+                    removed += self.report_batch(*pending.popleft())
+            except BaseException:
+                for future, batch in pending:
+                    future.cancel()
+                raise
+        return self.listed, removed
+
+    @staticmethod
+    def remove_batch(storage, batch):
+        return storage.delete_many(resource.file_id for resource in batch)
+
+    def report_batch(self, future, batch):
+        """
+        Reports removed files of the batch, files removed meanwhile by someone else are not counted.
+        """
+        deleted = set(future.result())
+        for resource in batch:
+            if resource.file_id in deleted:
+                self.log('Removed {}'.format(resource.file_path))
+        return len(deleted)
+
+    def log(self, msg, level=2):
+        if self.verbosity >= level:
+            self.stdout.write(msg)
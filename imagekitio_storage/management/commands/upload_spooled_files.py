@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from imagekitio_storage.spool import upload_queue
+
+
+class Command(BaseCommand):
+    help = 'Uploads files left in ASYNC_UPLOAD_SPOOL_DIR by stopped processes and waits until they are uploaded.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--timeout', type=float, default=None, dest='timeout',
+                            help='Maximum number of seconds to wait for the uploads.')
+
+    def handle(self, *args, **options):
+        futures = upload_queue.replay()
+        if not upload_queue.join(timeout=options['timeout']):
+            raise CommandError('Uploads of spooled files did not finish in time.')
+        failed = sum(1 for future in futures if future.exception() is not None)
+        uploaded = sum(1 for future in futures if future.exception() is None and future.result() is not None)
+        self.stdout.write('{} spooled files uploaded, {} failed.'.format(uploaded, failed))
+        if failed:
+            raise CommandError('{} spooled files could not be uploaded, they are kept in {}.'.format(
+                failed, upload_queue.spool.directory))
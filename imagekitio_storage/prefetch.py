@@ -0,0 +1,42 @@
+from imagekitio_storage.storage import MediaImagekitStorage
+
+
+def prefetch_imagekit(queryset, fields):
+    """
+    Evaluates the queryset (or any iterable of model instances) and resolves metadata
+    of all files kept in Imagekit storages under given fields in bulk, so that accessing
+    url or size of those files, e.g. in ModelSerializer, doesn't hit the network.
+    Resolved metadata warms the storage metadata cache and is also attached
+    to every FieldFile as imagekit_metadata attribute. FieldFiles are given a copy
+    of their storage which reads the attached metadata first, see
+    MediaImagekitStorage.with_prefetched_metadata, so no calls are made even when
+    the metadata cache is disabled or too small to keep all resolved files.
+    Returns list of evaluated instances.
+
+    Usage in a viewset:
+
+        def list(self, request, *args, **kwargs):
+            page = prefetch_imagekit(self.paginate_queryset(self.get_queryset()), fields=['file', 'image'])
+            ...
+    """
+    instances = list(queryset)
+    storages = {}
+    field_files = []
+    for instance in instances:
+        for field in fields:
+            field_file = getattr(instance, field)
+            if not field_file or not isinstance(field_file.storage, MediaImagekitStorage):
+                continue
+            storage_names = storages.setdefault(id(field_file.storage), (field_file.storage, []))[1]
+            storage_names.append(field_file.name)
+            field_files.append(field_file)
+
+    prefetched_storages = {}
+    for storage_id, (storage, names) in storages.items():
+        prefetched_storages[storage_id] = storage.with_prefetched_metadata(storage._get_metadata_many(names))
+
+    for field_file in field_files:
+        prefetched_storage = prefetched_storages[id(field_file.storage)]
+        field_file.imagekit_metadata = prefetched_storage._prefetched_metadata.get(str(field_file.name))
+        field_file.storage = prefetched_storage
+    return instances
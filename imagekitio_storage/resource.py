@@ -2,13 +2,19 @@ import base64
 from datetime import datetime as dt
 from typing import Dict
 
-import requests
+from imagekitio.constants.url import URL
+from imagekitio.file import File as ImageKitFile
+from imagekitio.models.UploadFileRequestOptions import UploadFileRequestOptions
+from imagekitio.models.results.UploadFileResult import UploadFileResult
+from imagekitio.utils.utils import convert_to_response_object, general_api_throw_exception
 from requests import Response
+from requests_toolbelt import MultipartEncoder
 
 from imagekitio_storage import USER_CREDENTIALS
 from imagekitio_storage.app_settings import UPLOAD_OPTIONS
 from imagekitio_storage.defaults import Default
 from imagekitio_storage.errors import ERRORS
+from imagekitio_storage.session import get_session
 
 
 class ImageKitResource(object):
@@ -61,7 +67,7 @@ class ImageKitResource(object):
     @staticmethod
     def request(method, url, headers, params=None, files=None, data=None) -> Response:
         """Requests from ImageKit server used,by internal methods"""
-        resp = requests.request(
+        resp = get_session().request(
             method=method,
             url=url,
             params=params,
@@ -72,6 +78,40 @@ class ImageKitResource(object):
 
         return resp
 
+    @staticmethod
+    def get_upload_fields(file_name: str, options: UploadFileRequestOptions = None) -> Dict:
+        """Validates upload options and returns them as multipart form fields"""
+        fields = ImageKitFile.validate_upload(dict(options.__dict__)) if options is not None else {}
+        if fields is False:
+            raise ValueError("Invalid upload options")
+        if "overwriteAiTags" in fields:
+            fields["overwriteAITags"] = fields.pop("overwriteAiTags")
+        fields["fileName"] = file_name
+        return fields
+
+    @staticmethod
+    def get_upload_result(resp) -> UploadFileResult:
+        """Converts upload response to UploadFileResult or raises matching ImageKit exception"""
+        if resp.status_code == 200:
+            return convert_to_response_object(resp, UploadFileResult)
+        general_api_throw_exception(resp)
+
+    def upload(self, file, file_name: str, options: UploadFileRequestOptions = None) -> UploadFileResult:
+        """
+        Uploads file object to ImageKit server as binary multipart body, streamed
+        from the file in chunks, so neither base64 encoding nor an in-memory copy is needed.
+        The file object must know its size, like django File objects do.
+        """
+        fields = self.get_upload_fields(file_name, options)
+        fields["file"] = (file_name, file, "application/octet-stream")
+        multipart_data = MultipartEncoder(fields=fields)
+        headers = self.create_headers()
+        headers.update({"Content-Type": multipart_data.content_type})
+        resp = self.request(
+            "POST", url="{}/api/v1/files/upload".format(URL.UPLOAD_BASE_URL), headers=headers, data=multipart_data
+        )
+        return self.get_upload_result(resp)
+
     def extend_url_options(self, options: Dict) -> Dict:
         """
         adds data to the options from the object, so that
@@ -0,0 +1,87 @@
+import os
+import threading
+
+import requests
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+
+from imagekitio_storage import app_settings, ik_api
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+class ImagekitSession(requests.Session):
+    """
+    Keep-alive session applying HTTP_CONNECT_TIMEOUT and HTTP_READ_TIMEOUT
+    to every request which doesn't set its own timeout.
+    """
+
+    def request(self, method, url, *args, **kwargs):
+        kwargs.setdefault('timeout', (app_settings.HTTP_CONNECT_TIMEOUT, app_settings.HTTP_READ_TIMEOUT))
+        return super(ImagekitSession, self).request(method, url, *args, **kwargs)
+
+
+def create_session():
+    """
+    Default HTTP_SESSION_FACTORY, mounts adapter with connection pool of HTTP_POOL_SIZE connections.
+    """
+    session = ImagekitSession()
+    adapter = HTTPAdapter(pool_connections=app_settings.HTTP_POOL_SIZE, pool_maxsize=app_settings.HTTP_POOL_SIZE,
+                          max_retries=app_settings.HTTP_MAX_RETRIES)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session():
+    """
+    Returns HTTP session shared by all storage I/O in the current process.
+    The session is re-created in forked processes, so pooled connections are never shared with a parent.
+    """
+    global _session, _session_pid
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _session_lock:
+            if _session is None or _session_pid != pid:
+                factory = app_settings.HTTP_SESSION_FACTORY
+                if isinstance(factory, str):
+                    factory = import_string(factory)
+                _session = factory()
+                _session_pid = pid
+    return _session
+
+
+def reset_session():
+    global _session, _session_pid
+    with _session_lock:
+        if _session is not None and _session_pid == os.getpid():
+            _session.close()
+        _session = None
+        _session_pid = None
+
+
+def _forget_session():
+    """
+    Drops parent's session in a forked child without closing sockets still used by the parent.
+    """
+    global _session, _session_pid, _session_lock
+    _session = None
+    _session_pid = None
+    _session_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_session)
+
+
+def request(method, url, headers, params=None, files=None, data=None):
+    """
+    Drop-in replacement of Imagekit SDK request method using the shared session.
+    """
+    return get_session().request(method=method, url=url, params=params, files=files, data=data, headers=headers)
+
+
+# Imagekit SDK sends its API requests with module level requests.request, route them through the shared session
+ik_api.ik_request.request = request
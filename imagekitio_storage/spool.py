@@ -0,0 +1,307 @@
+import datetime
+import errno
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from django.core.files.base import File
+from django.utils.module_loading import import_string
+from imagekitio.models.UploadFileRequestOptions import UploadFileRequestOptions
+
+from imagekitio_storage import app_settings, logger
+from imagekitio_storage.cache import metadata_cache
+from imagekitio_storage.helpers import get_resource_metadata
+from imagekitio_storage.uploads import RETRIED_EXCEPTIONS
+
+# seconds between checks of uploads claimed by other processes
+CLAIM_POLL_INTERVAL = 0.1
+
+
+class UploadSpool(object):
+    """
+    Directory keeping files saved with ASYNC_UPLOAD setting until their upload finishes.
+    Every file is kept as <key>.data next to a <key>.json record of its name, upload options
+    and storage class, written once the data is complete, so that any process can replay
+    pending uploads after a restart. Keys are hashes of names, so files are looked up by name
+    without any listing. Uploads are claimed with <key>.lock files holding the uploading process id.
+
+    The spool is local to the host, so until their upload finishes spooled files exist only
+    for processes sharing ASYNC_UPLOAD_SPOOL_DIR, exists() and url() on other hosts find them
+    once they are uploaded.
+    """
+
+    def __init__(self, directory=None):
+        self._directory = directory
+
+    @property
+    def directory(self):
+        return self._directory or app_settings.ASYNC_UPLOAD_SPOOL_DIR
+
+    @staticmethod
+    def get_key(name):
+        return hashlib.sha256(name.encode('utf-8')).hexdigest()
+
+    def _get_path(self, key, extension):
+        return os.path.join(self.directory, '{}.{}'.format(key, extension))
+
+    def add(self, name, content, file_name, options, storage):
+        """
+        Writes content and its upload record, returns key of the spooled file.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        key = self.get_key(name)
+        temporary_path = '{}.{}.tmp'.format(self._get_path(key, 'data'), os.getpid())
+        size = 0
+        with open(temporary_path, 'wb') as data:
+            if hasattr(content, 'seek'):
+                content.seek(0)
+            for chunk in content.chunks():
+                data.write(chunk)
+                size += len(chunk)
+        os.replace(temporary_path, self._get_path(key, 'data'))
+        record = {
+            'name': name,
+            'file_name': file_name,
+            'options': options.__dict__,
+            'storage': '{}.{}'.format(storage.__class__.__module__, storage.__class__.__qualname__),
+            'size': size,
+            'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        }
+        temporary_path = '{}.{}.tmp'.format(self._get_path(key, 'json'), os.getpid())
+        with open(temporary_path, 'w') as record_file:
+            json.dump(record, record_file)
+        os.replace(temporary_path, self._get_path(key, 'json'))
+        return key
+
+    def get(self, name):
+        """
+        Returns upload record of a spooled file, None when it is not spooled.
+        """
+        return self.load(self.get_key(name))
+
+    def contains(self, name):
+        """
+        Returns whether the name is spooled, without reading its record.
+        """
+        return os.path.exists(self._get_path(self.get_key(name), 'json'))
+
+    def load(self, key):
+        try:
+            with open(self._get_path(key, 'json')) as record_file:
+                return json.load(record_file)
+        except (OSError, ValueError):
+            return None
+
+    def keys(self):
+        try:
+            file_names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(file_name[:-len('.json')] for file_name in file_names if file_name.endswith('.json'))
+
+    def get_data_path(self, name):
+        return self._get_path(self.get_key(name), 'data')
+
+    def open(self, name):
+        return File(open(self.get_data_path(name), 'rb'), name)
+
+    def claim(self, key):
+        """
+        Claims upload of the spooled file for the current process, returns False when
+        another running process has claimed it. Claims of processes which are gone are taken over.
+        """
+        lock_path = self._get_path(key, 'lock')
+        for attempt in range(2):
+            try:
+                descriptor = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                if attempt or self._is_claimed_by_running_process(lock_path):
+                    return False
+                self._remove(lock_path)
+                continue
+            with os.fdopen(descriptor, 'w') as lock:
+                lock.write(str(os.getpid()))
+            return True
+        return False
+
+    @staticmethod
+    def _is_claimed_by_running_process(lock_path):
+        try:
+            with open(lock_path) as lock:
+                pid = int(lock.read())
+        except (OSError, ValueError):
+            return False
+        if pid == os.getpid():
+            return True
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+    def release(self, key):
+        self._remove(self._get_path(key, 'lock'))
+
+    def remove(self, key):
+        """
+        Removes the spooled file, its record first so that it is never replayed without data.
+        """
+        for extension in ('json', 'data', 'lock'):
+            self._remove(self._get_path(key, extension))
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+
+
+class UploadQueue(object):
+    """
+    Uploads spooled files on a pool of ASYNC_UPLOAD_WORKERS threads, retrying transient failures
+    with exponential backoff. Uploaded files' metadata is cached under their names before they are
+    removed from the spool. Files left in the spool by previous processes are replayed once
+    the queue is first used. Failed uploads stay in the spool until the queue is replayed again.
+    """
+
+    def __init__(self, spool=None, max_workers=None):
+        self.spool = spool or UploadSpool()
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._futures = {}
+
+    def _get_executor(self):
+        """
+        Returns the worker pool of the current process and whether it has just been created.
+        """
+        with self._lock:
+            # threads don't survive fork, so forked workers start their own pool
+            if self._executor is not None and self._pid == os.getpid():
+                return self._executor, False
+            self._pid = os.getpid()
+            self._futures = {}
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers or app_settings.ASYNC_UPLOAD_WORKERS)
+            return self._executor, True
+
+    def _submit(self, executor, key):
+        with self._lock:
+            future = self._futures.get(key)
+            if future is None or future.done():
+                self._futures[key] = future = executor.submit(self._upload, key)
+        return future
+
+    def start(self):
+        """
+        Starts the worker pool of the current process, replaying files left in the spool.
+        """
+        executor, created = self._get_executor()
+        if created:
+            for key in self.spool.keys():
+                self._submit(executor, key)
+
+    def submit(self, key):
+        self.start()
+        return self._submit(self._executor, key)
+
+    def replay(self):
+        """
+        Submits uploads of all files in the spool, returns their futures.
+        """
+        executor, created = self._get_executor()
+        return [self._submit(executor, key) for key in self.spool.keys()]
+
+    def _upload(self, key):
+        if not self.spool.claim(key):
+            return None
+        try:
+            record = self.spool.load(key)
+            if record is None:
+                self.spool.release(key)
+                return None
+            storage = import_string(record['storage'])()
+            options = UploadFileRequestOptions(**record['options'])
+            with self.spool.open(record['name']) as file:
+                response = self._upload_with_retries(storage, file, record['file_name'], options)
+            metadata = get_resource_metadata(response)
+            metadata_cache.set(record['name'], metadata)
+            if response.file_path.lstrip('/') != record['name']:
+                logger.warning('%s was uploaded as %s, its name refers to a not existing file',
+                               record['name'], response.file_path)
+            if self.spool.load(key) != record:
+                # saved again during the upload, so the new content is uploaded too
+                self.spool.release(key)
+                with self._lock:
+                    self._futures[key] = self._executor.submit(self._upload, key)
+                return metadata
+            self.spool.remove(key)
+            return metadata
+        except Exception:
+            logger.exception('Upload of spooled file %s failed, it is kept in %s', key, self.spool.directory)
+            self.spool.release(key)
+            raise
+
+    def cancel(self, key, timeout=None):
+        """
+        Removes the spooled file unless its upload is already running, in this or another process,
+        in which case the upload is waited for, so that the uploaded file can be deleted afterwards.
+        Returns False when timeout passes first.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            if self.spool.claim(key):
+                self.spool.remove(key)
+                return True
+            if self.spool.load(key) is None:
+                # the upload has finished
+                return True
+            remaining = deadline - time.monotonic() if deadline is not None else None
+            if remaining is not None and remaining <= 0:
+                return False
+            with self._lock:
+                future = self._futures.get(key) if self._pid == os.getpid() else None
+            if future is not None and not future.done():
+                wait([future], timeout=remaining)
+            else:
+                time.sleep(min(CLAIM_POLL_INTERVAL, remaining) if remaining is not None else CLAIM_POLL_INTERVAL)
+
+    @staticmethod
+    def _upload_with_retries(storage, file, file_name, options):
+        attempt = 0
+        while True:
+            try:
+                return storage._upload(file=file, file_name=file_name, options=options)
+            except RETRIED_EXCEPTIONS as e:
+                if attempt >= app_settings.ASYNC_UPLOAD_MAX_RETRIES:
+                    raise
+                attempt += 1
+                logger.warning('Upload of %s failed (%s), retrying (%d/%d)', file_name, e, attempt,
+                               app_settings.ASYNC_UPLOAD_MAX_RETRIES)
+                time.sleep(app_settings.ASYNC_UPLOAD_RETRY_DELAY * 2 ** (attempt - 1))
+                file.seek(0)
+
+    def join(self, timeout=None):
+        """
+        Waits for submitted uploads, returns False when timeout passes first.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while True:
+            with self._lock:
+                futures = [future for future in self._futures.values() if not future.done()]
+            if not futures:
+                return True
+            remaining = deadline - time.monotonic() if deadline is not None else None
+            if remaining is not None and remaining <= 0:
+                return False
+            wait(futures, timeout=remaining)
+
+
+upload_queue = UploadQueue()
@@ -0,0 +1,63 @@
+import re
+from functools import lru_cache
+
+from django.core.signals import setting_changed
+
+from imagekitio_storage import app_settings
+from imagekitio_storage.url_builder import build_url
+
+
+def parse_widths(widths=None):
+    """
+    Returns sorted tuple of distinct widths given as integers or a string of integers separated
+    with commas or spaces, SRCSET_WIDTHS when they are not given.
+    """
+    if widths is None:
+        widths = app_settings.SRCSET_WIDTHS
+    if isinstance(widths, str):
+        widths = re.split(r'[\s,]+', widths.strip())
+    try:
+        widths = tuple(sorted({int(width) for width in widths if width != ''}))
+    except (TypeError, ValueError):
+        raise ValueError('Srcset widths must be integers, got {!r}.'.format(widths))
+    if not widths or widths[0] <= 0:
+        raise ValueError('Srcset widths must be positive integers, got {!r}.'.format(widths))
+    return widths
+
+
+def _build_srcset(url, widths, options, signed):
+    return ', '.join('{} {}w'.format(build_url({
+        'src': url,
+        'transformation': [dict(options, width=width)],
+        'transformation_position': 'query',
+        'signed': signed,
+    }), width) for width in widths)
+
+
+@lru_cache(maxsize=app_settings.SRCSET_CACHE_SIZE)
+def _get_cached_srcset(url, widths, options_items, signed):
+    return _build_srcset(url, widths, dict(options_items), signed)
+
+
+def get_srcset(url, widths=None, options=None, signed=False):
+    """
+    Returns srcset attribute value listing variants of the image url resized to the widths,
+    with other transformation options, like format, applied to all of them. Srcsets are memoized
+    in an LRU cache of SRCSET_CACHE_SIZE entries, srcsets with unhashable options are built every time.
+    """
+    widths = parse_widths(widths)
+    options = options or {}
+    options_items = tuple(sorted(options.items()))
+    try:
+        hash(options_items)
+    except TypeError:
+        return _build_srcset(url, widths, options, signed)
+    return _get_cached_srcset(url, widths, options_items, signed)
+
+
+def clear_srcset_cache(**kwargs):
+    _get_cached_srcset.cache_clear()
+
+
+# urls are built with credentials and url endpoint from the settings
+setting_changed.connect(clear_srcset_cache)
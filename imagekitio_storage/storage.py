@@ -1,22 +1,51 @@
-import base64
+import copy
 import errno
 import json
+import mimetypes
 import os
+import posixpath
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import unquote, urlsplit, urlunsplit
 
-import requests
+import django
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.staticfiles import finders
 from django.contrib.staticfiles.storage import HashedFilesMixin, ManifestFilesMixin
 from django.core.files.base import ContentFile, File
 from django.core.files.storage import Storage, FileSystemStorage
-from django.core.files.uploadedfile import UploadedFile
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from django.utils.deconstruct import deconstructible
+from django.utils.crypto import get_random_string
+from django.utils.functional import cached_property
 from imagekitio.exceptions.BadRequestException import BadRequestException
+from imagekitio.exceptions.NotFoundException import NotFoundException
+from imagekitio.exceptions.UnknownException import UnknownException
 from imagekitio.models.UploadFileRequestOptions import UploadFileRequestOptions
 
-from . import app_settings, ik_api
-from .helpers import get_resources
+from . import app_settings, ik_api, logger
+from .cache import MISSING, metadata_cache
+from .files import RemoteFile
+from .resource import ImageKitResource
+from .session import get_session
+from .spool import upload_queue
+from .srcset import get_srcset
+from .sync_state import SyncState
+from .uploads import RetriedUpload
+from .url_builder import build_url
+from .url_manifest import UrlManifest
+from .helpers import (
+    find_resource_by_path, get_resource_by_path, get_resource_by_path_options, get_resource_metadata,
+    get_remote_file_name, get_resources_by_paths, get_resources_index, is_file_id, list_folder,
+    walk_folders
+)
+
+# maximum number of files deleted by one Imagekit bulk delete request
+BULK_DELETE_MAX_FILES = 100
 
 RESOURCE_TYPES = {
     'IMAGE': 'image',
@@ -30,10 +59,13 @@ class MediaImagekitStorage(Storage):
     RESOURCE_TYPE = RESOURCE_TYPES['IMAGE']
     TAG = app_settings.MEDIA_TAG
     UPLOAD_OPTIONS = app_settings.UPLOAD_OPTIONS
+    # metadata resolved by prefetch_imagekit, see with_prefetched_metadata
+    _prefetched_metadata = None
 
     def __init__(self, tag=None, resource_type=None, root_folder=None):
         if root_folder is not None:
-            self.UPLOAD_OPTIONS['folder'] = root_folder
+            # copied, as class level options are shared by all storages
+            self.UPLOAD_OPTIONS = dict(self.UPLOAD_OPTIONS, folder=root_folder)
         if tag is not None:
             self.TAG = tag.strip('/') if tag is not None else None
         if resource_type is not None:
@@ -47,69 +79,543 @@ class MediaImagekitStorage(Storage):
         return self.RESOURCE_TYPE
 
     def _open(self, name, mode='rb'):
+        if self._get_spooled_metadata(name) is not None:
+            return upload_queue.spool.open(str(name))
         url = self._get_url(name)
-        response = requests.get(url)
+        response = get_session().get(url, headers={'Accept-Encoding': 'identity'}, stream=True)
         if response.status_code == 404:
+            response.close()
             raise IOError
         response.raise_for_status()
-        file = ContentFile(response.content)
-        file.name = name
-        file.mode = mode
-        return file
+        return RemoteFile(url, name, mode=mode, response=response)
 
-    def _upload(self, file, file_name, options):
-        return ik_api.upload(file=file, file_name=file_name, options=options)
+    def _get_resource(self):
+        return ImageKitResource(private_key=ik_api.ik_request.private_key, public_key=ik_api.ik_request.public_key,
+                                url_endpoint=ik_api.ik_request.url_endpoint)
 
-    def _save(self, name, content):
-
-        self.UPLOAD_OPTIONS['folder'] = self._get_upload_path(name)
+    def _upload(self, file, file_name, options):
+        return self._get_resource().upload(file=file, file_name=file_name, options=options)
 
-        options = UploadFileRequestOptions(**self.UPLOAD_OPTIONS)
+    @staticmethod
+    def _get_upload_file(content):
+        """
+        Returns file object to be streamed to Imagekit. Contents of unknown size,
+        like non-seekable streams, are spooled to a temporary file first.
+        """
+        try:
+            content.seek(0)
+            len(content)
+        except (AttributeError, OSError, TypeError, ValueError):
+            spooled = tempfile.TemporaryFile()
+            for chunk in content.chunks():
+                spooled.write(chunk)
+            spooled.seek(0)
+            return File(spooled, content.name)
+        return content
+
+    def _prepare_upload(self, name):
+        """
+        Returns Imagekit file name and upload options of a file to be saved under the name.
+        """
+        # built from a copy, as the options are shared by all storages and threads
+        options = UploadFileRequestOptions(**dict(self.UPLOAD_OPTIONS, folder=self._get_upload_path(name)))
 
         name = self._normalise_name(name)
         name = self._prepend_prefix(name)
+        return name, options
 
-        content = UploadedFile(content, name)
+    def _get_remote_path(self, name):
+        """
+        Returns Imagekit file path of a file saved under the name with use_unique_file_name disabled.
+        """
+        file_name, options = self._prepare_upload(name)
+        # Imagekit ignores empty folder names, which tags ending with a slash produce
+        return re.sub('/+', '/', '/{}/{}'.format(options.folder, self._get_remote_file_name(file_name)))
 
-        encoded = base64.b64encode(content.read())
+    @staticmethod
+    def _get_remote_file_name(file_name):
+        return get_remote_file_name(file_name)
 
-        response = self._upload(file=encoded, file_name=name, options=options)
+    def _save(self, name, content):
+        if app_settings.ASYNC_UPLOAD:
+            return self._spool_content(name, content)
+        return self._get_stored_name(self._upload_content(name, content))
 
+    def _spool_content(self, name, content):
+        """
+        Spools content to be uploaded in the background and returns the file path it is going to be stored under,
+        which is final, as the upload is sent with use_unique_file_name disabled. Unique file names are made
+        locally instead, the same way Imagekit makes them.
+        """
+        if self.UPLOAD_OPTIONS.get('use_unique_file_name'):
+            root, extension = os.path.splitext(name)
+            name = '{}_{}{}'.format(root, get_random_string(7), extension)
+        file_name, options = self._prepare_upload(name)
+        options.use_unique_file_name = False
+        stored_name = self._get_remote_path(name).lstrip('/')
+        key = upload_queue.spool.add(stored_name, content, file_name, options, self)
+        self._discard_prefetched_metadata(stored_name)
+        metadata_cache.delete(stored_name)
+        upload_queue.submit(key)
+        return stored_name
+
+    def _get_spooled_metadata(self, name):
+        """
+        Returns metadata of a file waiting in the spool for its upload, None for other files.
+        Until the upload finishes, the file is read from the local copy and its url is the one
+        the file is going to have, or the local copy's one with ASYNC_UPLOAD_SPOOL_URL setting.
+        The spool is per host, other hosts see the file only once it is uploaded.
+        """
+        if not app_settings.ASYNC_UPLOAD or not self._is_file_path(name):
+            return None
+        name = str(name)
+        # checked first, as records of the few spooled files are rarely there
+        if not upload_queue.spool.contains(name):
+            return None
+        record = upload_queue.spool.get(name)
+        if record is None:
+            return None
+        # uploads left by a previous process are replayed once spooled files are needed
+        upload_queue.start()
+        if app_settings.ASYNC_UPLOAD_SPOOL_URL:
+            url = app_settings.ASYNC_UPLOAD_SPOOL_URL + os.path.basename(upload_queue.spool.get_data_path(name))
+        else:
+            url = self._build_url(name)
+        return {
+            'file_id': None,
+            'name': posixpath.basename(name),
+            'file_path': '/' + name,
+            'url': url,
+            'size': record['size'],
+            'created_at': record['created_at'],
+            'updated_at': record['created_at'],
+        }
+
+    def _upload_content(self, name, content):
+        """
+        Uploads content to be saved under the name and caches metadata of the uploaded file.
+        Returns Imagekit upload result.
+        """
+        name, options = self._prepare_upload(name)
+
+        file = self._get_upload_file(content)
+        try:
+            response = self._upload(file=file, file_name=name, options=options)
+        finally:
+            if file is not content:
+                file.close()
+
+        stored_name = self._get_stored_name(response)
+        self._discard_prefetched_metadata(stored_name)
+        metadata_cache.set(stored_name, get_resource_metadata(response))
+        return response
+
+    def _get_stored_name(self, response):
+        """
+        Returns the name kept in model fields, Imagekit file path
+        with USE_FILE_PATH_AS_NAME setting or file id otherwise.
+        """
+        if app_settings.USE_FILE_PATH_AS_NAME:
+            return response.file_path.lstrip('/')
         return response.file_id
 
+    @staticmethod
+    def _is_file_path(name):
+        """
+        Imagekit file ids are 24 hexadecimal characters, anything else is a stored file path,
+        also of files kept in the root folder, so both naming modes can coexist in one database.
+        """
+        return not is_file_id(name)
+
+    @staticmethod
+    def _resolves_file_paths():
+        """
+        File paths are stored as names with USE_FILE_PATH_AS_NAME setting and for spooled
+        ASYNC_UPLOAD saves, other names which aren't file ids are legacy or malformed.
+        """
+        return app_settings.USE_FILE_PATH_AS_NAME or app_settings.ASYNC_UPLOAD
+
+    def _get_file_id(self, name):
+        if not self._is_file_path(name):
+            return str(name)
+        if not self._resolves_file_paths():
+            logger.warning('Skipped deletion of %s, it is not an Imagekit file id', name)
+            return None
+        metadata = self._get_metadata(name)
+        return metadata['file_id'] if metadata is not None else None
+
     def delete(self, name):
-        file_id = str(name)
+        if self._get_spooled_metadata(name) is not None:
+            # an upload which is already running is waited for and its file is deleted below
+            upload_queue.cancel(upload_queue.spool.get_key(str(name)))
+        file_id = self._get_file_id(name)
+        self._discard_prefetched_metadata(name)
+        metadata_cache.delete(name)
+        if file_id is None:
+            return False
 
         response = ik_api.delete_file(file_id=file_id)
+        metadata_cache.set_missing(name)
         if response:
             return response.response_metadata
         return super().delete(name)
 
-    def _get_url(self, name):
+    def _get_file_ids(self, names):
+        """
+        Returns dictionary of names mapped to file ids (None for not existing files),
+        file paths are resolved with batched search queries.
+        """
+        paths = [name for name in names if self._is_file_path(name)]
+        if paths and not self._resolves_file_paths():
+            logger.warning('Skipped deletion of %d files which names are not Imagekit file ids, e.g. %s',
+                           len(paths), paths[0])
+            return {name: None if name in paths else name for name in names}
+        metadata_per_name = self._get_metadata_many(paths)
+        file_ids = {}
+        for name in names:
+            if name in metadata_per_name:
+                metadata = metadata_per_name[name]
+                file_ids[name] = metadata['file_id'] if metadata is not None else None
+            else:
+                file_ids[name] = name
+        return file_ids
+
+    def delete_many(self, names):
+        """
+        Deletes files with Imagekit bulk delete requests of up to BULK_DELETE_MAX_FILES files each.
+        Returns list of names of deleted files.
+        """
+        names = list(dict.fromkeys(str(name) for name in names))
+        for name in names:
+            if self._get_spooled_metadata(name) is not None:
+                # running uploads are waited for, so that their files are resolved and deleted below
+                upload_queue.cancel(upload_queue.spool.get_key(name))
+                self._discard_prefetched_metadata(name)
+        file_ids = self._get_file_ids(names)
+        for name in names:
+            metadata_cache.delete(name)
+        ids = list(dict.fromkeys(file_id for file_id in file_ids.values() if file_id is not None))
+        deleted_ids = set()
+        for start in range(0, len(ids), BULK_DELETE_MAX_FILES):
+            deleted_ids.update(self._bulk_delete(ids[start:start + BULK_DELETE_MAX_FILES]))
+        deleted = [name for name in names if file_ids[name] in deleted_ids]
+        for name in names:
+            metadata_cache.set_missing(name)
+        return deleted
+
+    @staticmethod
+    def _bulk_delete(file_ids):
+        """
+        Imagekit deletes nothing when any of the files doesn't exist,
+        so the request is repeated without missing files.
+        """
         try:
-            response = ik_api.get_file_details(file_id=name)
-            return response.url
-        except BadRequestException:
+            response = ik_api.bulk_file_delete(file_ids=file_ids)
+        except NotFoundException as e:
+            raw = e.response_metadata.raw if e.response_metadata is not None else None
+            missing_ids = raw.get('missingFileIds') if isinstance(raw, dict) else None
+            if not missing_ids:
+                raise
+            file_ids = [file_id for file_id in file_ids if file_id not in missing_ids]
+            if not file_ids:
+                return []
+            response = ik_api.bulk_file_delete(file_ids=file_ids)
+        return response.successfully_deleted_file_ids or []
+
+    def _get_metadata(self, name):
+        """
+        Returns file metadata from the metadata cache, fetching and caching
+        file details on a miss. Returns None for not existing files,
+        which are cached too, so repeated probes don't hit the API.
+        """
+        spooled = self._get_spooled_metadata(name)
+        if spooled is not None:
+            return spooled
+        if self._prefetched_metadata is not None and str(name) in self._prefetched_metadata:
+            return self._prefetched_metadata[str(name)]
+        metadata = metadata_cache.get(name)
+        if metadata is MISSING:
+            return None
+        if metadata is None:
+            metadata = self._fetch_metadata(name)
+            if metadata is None:
+                metadata_cache.set_missing(name)
+            else:
+                metadata_cache.set(name, metadata)
+        return metadata
+
+    def with_prefetched_metadata(self, metadata_per_name):
+        """
+        Returns a copy of the storage which takes metadata of the given names (None for not existing files)
+        from the dictionary before the metadata cache, so that files resolved by prefetch_imagekit
+        don't hit the network even when caching is disabled or their cache entries were evicted.
+        """
+        storage = copy.copy(self)
+        storage._prefetched_metadata = dict(metadata_per_name)
+        return storage
+
+    def _discard_prefetched_metadata(self, name):
+        if self._prefetched_metadata is not None:
+            self._prefetched_metadata.pop(str(name), None)
+
+    def _fetch_metadata(self, name):
+        if self._is_file_path(name):
+            response = get_resource_by_path(name)
+            if response is None:
+                return None
+        else:
+            try:
+                response = ik_api.get_file_details(file_id=name)
+            except BadRequestException:
+                return None
+            except UnknownException as e:
+                if e.response_metadata is not None and e.response_metadata.http_status_code == 404:
+                    return None
+                raise
+        return get_resource_metadata(response)
+
+    def _get_metadata_many(self, names):
+        """
+        Returns dictionary of names mapped to their metadata (None for not existing files).
+        Cache misses are resolved concurrently, file paths with batched search queries
+        and file ids, which cannot be searched for, with file details requests.
+        """
+        names = list(dict.fromkeys(str(name) for name in names))
+        metadata_per_name = {}
+        missing_paths = []
+        missing_file_ids = []
+        for name in names:
+            if self._prefetched_metadata is not None and name in self._prefetched_metadata:
+                metadata_per_name[name] = self._prefetched_metadata[name]
+                continue
+            metadata = self._get_spooled_metadata(name) or metadata_cache.get(name)
+            if metadata is MISSING:
+                metadata_per_name[name] = None
+            elif metadata is not None:
+                metadata_per_name[name] = metadata
+            elif self._is_file_path(name):
+                missing_paths.append(name)
+            else:
+                missing_file_ids.append(name)
+
+        if missing_paths or missing_file_ids:
+            with ThreadPoolExecutor(max_workers=app_settings.BATCH_MAX_WORKERS) as executor:
+                file_ids_metadata = executor.map(self._fetch_metadata, missing_file_ids)
+                for name, resource in get_resources_by_paths(missing_paths, executor=executor).items():
+                    metadata_per_name[name] = get_resource_metadata(resource)
+                metadata_per_name.update(zip(missing_file_ids, file_ids_metadata))
+            for name in missing_paths + missing_file_ids:
+                if metadata_per_name.get(name) is None:
+                    metadata_cache.set_missing(name)
+                else:
+                    metadata_cache.set(name, metadata_per_name[name])
+
+        return {name: metadata_per_name.get(name) for name in names}
+
+    def urls_many(self, names):
+        """
+        Returns dictionary of names mapped to their urls, resolved with as few requests as possible.
+        """
+        names = [str(name) for name in names]
+        urls = {}
+        if app_settings.USE_FILE_PATH_AS_NAME:
+            urls = {name: self._build_url(name) for name in names
+                    if self._is_file_path(name) and self._get_spooled_metadata(name) is None}
+        metadata_per_name = self._get_metadata_many(name for name in names if name not in urls)
+        for name, metadata in metadata_per_name.items():
+            urls[name] = metadata['url'] if metadata is not None else name
+        return {name: urls[name] for name in names}
+
+    def exists_many(self, names):
+        """
+        Returns dictionary of names mapped to whether they exist in Imagekit.
+        """
+        return {name: metadata is not None for name, metadata in self._get_metadata_many(names).items()}
+
+    def sizes_many(self, names):
+        """
+        Returns dictionary of names mapped to their sizes, None for not existing files.
+        """
+        return {name: metadata['size'] if metadata is not None else None
+                for name, metadata in self._get_metadata_many(names).items()}
+
+    def _build_url(self, name):
+        """
+        Builds url of a stored file path locally, without any API call.
+        """
+        return build_url({
+            'path': name,
+            'signed': bool(self.UPLOAD_OPTIONS.get('is_private_file')),
+        })
+
+    def _get_url(self, name):
+        spooled = self._get_spooled_metadata(name)
+        if spooled is not None:
+            return spooled['url']
+        if app_settings.USE_FILE_PATH_AS_NAME and self._is_file_path(name):
+            return self._build_url(name)
+        metadata = self._get_metadata(name)
+        if metadata is None:
             return name
+        return metadata['url']
 
     def url(self, name):
         return self._get_url(name)
 
+    def srcset(self, name, widths=None, **options):
+        """
+        Returns srcset attribute value of the image resized to the widths, SRCSET_WIDTHS by default,
+        with other transformation options applied to all variants. The file url is resolved once
+        and variant urls are built locally, see get_srcset.
+        """
+        return get_srcset(self.url(name), widths, options, signed=bool(self.UPLOAD_OPTIONS.get('is_private_file')))
+
     def exists(self, name):
-        url = self._get_url(name)
-        response = requests.head(url)
-        if response.status_code == 404:
-            return False
-        response.raise_for_status()
-        return True
+        return self._get_metadata(name) is not None
 
     def size(self, name):
-        url = self._get_url(name)
-        response = requests.head(url)
-        if response.status_code == 200:
-            return int(response.headers['content-length'])
-        else:
+        metadata = self._get_metadata(name)
+        return metadata['size'] if metadata is not None else None
+
+    def _get_time(self, name, field):
+        """
+        Returns file details timestamp as datetime, aware when USE_TZ is enabled, like FileSystemStorage does.
+        Upload responses don't carry timestamps, so metadata cached on save is refreshed once.
+        """
+        metadata = self._get_metadata(name)
+        if metadata is not None and metadata.get(field) is None:
+            metadata = self._fetch_metadata(name)
+            if metadata is not None:
+                metadata_cache.set(name, metadata)
+        if metadata is None:
+            raise FileNotFoundError(errno.ENOENT, 'File does not exist in Imagekit', name)
+        value = parse_datetime(metadata[field])
+        if settings.USE_TZ:
+            return value
+        return timezone.make_naive(value)
+
+    def get_created_time(self, name):
+        return self._get_time(name, 'created_at')
+
+    def get_modified_time(self, name):
+        return self._get_time(name, 'updated_at')
+
+    def get_accessed_time(self, name):
+        """
+        Imagekit doesn't track file access, so the last modification time is returned.
+        """
+        return self.get_modified_time(name)
+
+    def _get_async_resource(self):
+        # imported lazily, as the async client is an optional dependency
+        from .aio import AsyncImageKitResource
+        return AsyncImageKitResource(private_key=ik_api.ik_request.private_key,
+                                     public_key=ik_api.ik_request.public_key,
+                                     url_endpoint=ik_api.ik_request.url_endpoint)
+
+    async def _aupload(self, file, file_name, options):
+        return await self._get_async_resource().aupload(file=file, file_name=file_name, options=options)
+
+    async def asave(self, name, content, max_length=None):
+        """
+        Coroutine counterpart of save, built on an async HTTP client with its own connection pool,
+        so that async views can run many storage calls concurrently with asyncio.gather.
+        Requires httpx, install it with the async extra.
+        """
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.get_available_name(name, max_length=max_length)
+        name = await self._asave(name, content)
+        return name.replace('\\', '/')
+
+    async def _asave(self, name, content):
+        name, options = self._prepare_upload(name)
+
+        file = self._get_upload_file(content)
+        try:
+            response = await self._aupload(file=file, file_name=name, options=options)
+        finally:
+            if file is not content:
+                file.close()
+
+        name = self._get_stored_name(response)
+        await metadata_cache.aset(name, get_resource_metadata(response))
+        return name
+
+    async def aopen(self, name, mode='rb'):
+        """
+        Downloads the file into a temporary file, kept in memory up to FILE_UPLOAD_MAX_MEMORY_SIZE bytes.
+        """
+        from .aio import adownload
+        file = await adownload(await self.aurl(name))
+        if file is None:
+            raise IOError
+        file.name = name
+        file.mode = mode
+        return file
+
+    async def _aget_metadata(self, name):
+        if self._prefetched_metadata is not None and str(name) in self._prefetched_metadata:
+            return self._prefetched_metadata[str(name)]
+        metadata = await metadata_cache.aget(name)
+        if metadata is MISSING:
             return None
+        if metadata is None:
+            metadata = await self._afetch_metadata(name)
+            if metadata is None:
+                await metadata_cache.aset_missing(name)
+            else:
+                await metadata_cache.aset(name, metadata)
+        return metadata
+
+    async def _afetch_metadata(self, name):
+        resource = self._get_async_resource()
+        if self._is_file_path(name):
+            file_path, options = get_resource_by_path_options(name)
+            response = find_resource_by_path((await resource.alist_files(options)).list, file_path)
+            if response is None:
+                return None
+        else:
+            try:
+                response = await resource.aget_file_details(name)
+            except BadRequestException:
+                return None
+            except UnknownException as e:
+                if e.response_metadata is not None and e.response_metadata.http_status_code == 404:
+                    return None
+                raise
+        return get_resource_metadata(response)
+
+    async def aurl(self, name):
+        if app_settings.USE_FILE_PATH_AS_NAME and self._is_file_path(name):
+            return self._build_url(name)
+        metadata = await self._aget_metadata(name)
+        if metadata is None:
+            return name
+        return metadata['url']
+
+    async def aexists(self, name):
+        return await self._aget_metadata(name) is not None
+
+    async def asize(self, name):
+        metadata = await self._aget_metadata(name)
+        return metadata['size'] if metadata is not None else None
+
+    async def adelete(self, name):
+        if self._is_file_path(name):
+            metadata = await self._aget_metadata(name)
+            file_id = metadata['file_id'] if metadata is not None else None
+        else:
+            file_id = str(name)
+        await metadata_cache.adelete(name)
+        if file_id is None:
+            return False
+
+        response = await self._get_async_resource().adelete_file(file_id)
+        await metadata_cache.aset_missing(name)
+        return response.response_metadata
 
     def get_available_name(self, name, max_length=None):
         if max_length is None:
@@ -132,20 +638,43 @@ class MediaImagekitStorage(Storage):
             name = prefix + name
         return name
 
+    def _get_folder_path(self, path):
+        """
+        Returns Imagekit folder path of files saved within the directory path.
+        """
+        path = self._normalise_name(path).strip('/')
+        return re.sub('/+', '/', '/{}'.format(self._get_upload_path(path + '/' if path else '')).rstrip('/')) or '/'
+
+    def _get_listed_name(self, path, file_name):
+        """
+        Returns name of a file listed in the directory path, which is Imagekit file name
+        without the prefix and the directory path joined into it on save.
+        """
+        saved_prefix = self._get_remote_file_name(self._prepend_prefix(posixpath.join(path, '')))
+        if file_name.startswith(saved_prefix):
+            return file_name[len(saved_prefix):]
+        return file_name
+
+    def walk(self, path=''):
+        """
+        Yields (directory path, subdirectory names, file names) of the directory path and
+        all its subdirectories, top-down, like os.walk. Sibling directories are listed
+        concurrently by up to WALK_MAX_WORKERS threads and yielded in the order they are listed.
+        """
+        path = self._normalise_name(path).strip('/')
+        folder_path = self._get_folder_path(path)
+        for folder, subfolders, files in walk_folders(folder_path):
+            relative_path = posixpath.relpath(folder, folder_path)
+            directory = path if relative_path == '.' else posixpath.join(path, relative_path).lstrip('/')
+            yield directory, subfolders, self._get_listed_names(directory, files)
+
     def listdir(self, path):
-        path = self._normalize_path(path)
-        print(path)
-        resources = get_resources(path)
-        directories = set()
-        files = []
-        for resource in resources:
-            resource_tail = resource.replace(path, '', 1)
-            if '/' in resource_tail:
-                directory = resource_tail.split('/', 1)[0]
-                directories.add(directory)
-            else:
-                files.append(resource_tail)
-        return list(directories), files
+        path = self._normalise_name(path).strip('/')
+        subfolders, files = list_folder(self._get_folder_path(path))
+        return subfolders, self._get_listed_names(path, files)
+
+    def _get_listed_names(self, path, resources):
+        return [self._get_listed_name(path, resource.name) for resource in resources]
 
     def _normalise_name(self, name):
         return name.replace('\\', '/')
@@ -175,6 +704,29 @@ class RawMediaImagekitStorage(MediaImagekitStorage):
 class VideoMediaImagekitStorage(MediaImagekitStorage):
     RESOURCE_TYPE = RESOURCE_TYPES['VIDEO']
 
+    def _upload(self, file, file_name, options):
+        """
+        Uploads videos of at least RETRIED_UPLOAD_THRESHOLD bytes with retries, see RetriedUpload.
+        """
+        threshold = app_settings.RETRIED_UPLOAD_THRESHOLD
+        if threshold is None or len(file) < threshold:
+            return super(VideoMediaImagekitStorage, self)._upload(file=file, file_name=file_name, options=options)
+        upload = super(VideoMediaImagekitStorage, self)._upload
+        return RetriedUpload(upload, file, file_name, options).run()
+
+    async def _aupload(self, file, file_name, options):
+        """
+        Retried uploads keep a local checkpoint and sleep between retries, so they run in a worker thread.
+        """
+        threshold = app_settings.RETRIED_UPLOAD_THRESHOLD
+        if threshold is None or len(file) < threshold:
+            return await super(VideoMediaImagekitStorage, self)._aupload(file=file, file_name=file_name,
+                                                                        options=options)
+        return await sync_to_async(self._upload, thread_sensitive=False)(file=file, file_name=file_name,
+                                                                          options=options)
+
+
+_inventory_lock = threading.Lock()
 
 storages_per_type = {
     RESOURCE_TYPES['IMAGE']: MediaImagekitStorage(),
@@ -193,6 +745,10 @@ class StaticImagekitStorage(MediaImagekitStorage):
     RESOURCE_TYPE = RESOURCE_TYPES['RAW']
     TAG = app_settings.STATIC_TAG
     UPLOAD_OPTIONS = app_settings.UPLOAD_OPTIONS
+    # set by collectstatic --verify-remote to check uploaded files with Imagekit instead of the local sync state
+    verify_remote = False
+    _inventory_enabled = False
+    _inventory = None
 
     def _get_resource_type(self, name):
         """
@@ -221,16 +777,17 @@ class StaticImagekitStorage(MediaImagekitStorage):
     def url(self, name):
         if settings.DEBUG:
             return settings.STATIC_URL + name
+        url = self.get_manifest_url(name)
+        if url is not None:
+            return url
         return super(StaticImagekitStorage, self).url(name)
 
     def _upload(self, file, file_name, options=None):
         name = self._remove_extension_for_non_raw_file(file_name)
         if options is None:
-            self.UPLOAD_OPTIONS['folder'] = self._get_upload_path(name)
+            options = UploadFileRequestOptions(**dict(self.UPLOAD_OPTIONS, folder=self._get_upload_path(name)))
 
-            options = UploadFileRequestOptions(**self.UPLOAD_OPTIONS)
-
-        return ik_api.upload_file(file=file, file_name=name, options=options)
+        return super(StaticImagekitStorage, self)._upload(file=file, file_name=name, options=options)
 
     def _remove_extension_for_non_raw_file(self, name):
         """
@@ -246,44 +803,236 @@ class StaticImagekitStorage(MediaImagekitStorage):
             extension = self._get_file_extension(name)
             return name[:-len(extension) - 1]
 
+    def _get_listed_names(self, path, resources):
+        """
+        Images and videos are stored without extensions, see _remove_extension_for_non_raw_file,
+        so their names are taken from the sync state, or get the extension of their mime type
+        when the sync state doesn't know them.
+        """
+        names = super(StaticImagekitStorage, self)._get_listed_names(path, resources)
+        synced_names = None
+        listed_names = []
+        for name, resource in zip(names, resources):
+            extension = self._get_mime_extension(getattr(resource, 'mime', None))
+            if extension is not None and self._get_resource_type(name) == self.RESOURCE_TYPE:
+                if synced_names is None:
+                    synced_names = {self._get_remote_path(synced): synced for synced in self.sync_state.files}
+                synced_name = synced_names.get(resource.file_path)
+                name = posixpath.basename(synced_name) if synced_name is not None else '{}.{}'.format(name, extension)
+            listed_names.append(name)
+        return listed_names
+
+    @staticmethod
+    def _get_mime_extension(mime):
+        """
+        Returns extension of images and videos of the mime type, None for other files.
+        """
+        extension = mimetypes.guess_extension(mime) if mime else None
+        if extension is None:
+            return None
+        extension = extension.lstrip('.')
+        if extension in app_settings.STATIC_IMAGES_EXTENSIONS or extension in app_settings.STATIC_VIDEOS_EXTENSIONS:
+            return extension
+        return None
+
     # we only need 2 methods of HashedFilesMixin, so we just copy them as function objects to avoid MRO complexities
     file_hash = HashedFilesMixin.file_hash
     clean_name = HashedFilesMixin.clean_name
 
+    def _get_remote_file_name(self, file_name):
+        return super(StaticImagekitStorage, self)._get_remote_file_name(
+            self._remove_extension_for_non_raw_file(file_name))
+
+    def _build_url(self, name):
+        return super(StaticImagekitStorage, self)._build_url(self._get_remote_path(name))
+
+    def prefetch_inventory(self):
+        """
+        Makes metadata lookups, so exists, url, size, modification times and ETag checks, answer
+        from an index of the whole static folder until clear_inventory is called. The index is fetched
+        on the first lookup with one list request per LIST_FILES_PAGE_SIZE files. Used by collectstatic.
+        """
+        with _inventory_lock:
+            self._inventory_enabled = True
+            self._inventory = None
+
+    def clear_inventory(self):
+        with _inventory_lock:
+            self._inventory_enabled = False
+            self._inventory = None
+
+    def _get_inventory(self):
+        if not self._inventory_enabled:
+            return None
+        with _inventory_lock:
+            if self._inventory is None:
+                self._inventory = get_resources_index('/' + self._get_upload_path('').strip('/'))
+            return self._inventory
+
+    def _fetch_metadata(self, name):
+        """
+        Static names differ from Imagekit file paths, so files are looked up by their remote paths.
+        """
+        remote_path = self._get_remote_path(name)
+        inventory = self._get_inventory()
+        if inventory is not None:
+            return inventory.get(remote_path)
+        return super(StaticImagekitStorage, self)._fetch_metadata(remote_path)
+
     def _exists_with_etag(self, name, content):
         """
         Checks whether a file with a name and a content is already uploaded to Imagekit.
-        Uses ETAG header and MD5 hash for the content comparison.
+        Uses ETAG header and MD5 hash for the content comparison, only sent for existing files of the same size.
         """
+        metadata = self._get_metadata(name)
+        if metadata is None or metadata['size'] not in (None, content.size):
+            return False
         url = self._get_url(name)
-        response = requests.head(url)
+        response = get_session().head(url)
         if response.status_code == 404:
             return False
         etag = response.headers['ETAG'].split('"')[1]
         hash = self.file_hash(name, content)
         return etag.startswith(hash)
 
+    def _get_manifest_target(self):
+        return [ik_api.ik_request.url_endpoint, self._get_root_folder(), self.TAG]
+
+    @cached_property
+    def sync_state(self):
+        return SyncState(ManifestImagekitStorage(), app_settings.STATICFILES_SYNC_STATE_NAME,
+                         self._get_manifest_target())
+
+    def save_sync_state(self):
+        self.sync_state.save()
+
+    @cached_property
+    def url_manifest(self):
+        return UrlManifest(ManifestImagekitStorage(), app_settings.STATICFILES_URL_MANIFEST_NAME,
+                           self._get_manifest_target(), app_settings.STATIC_URL_TRANSFORMATIONS)
+
+    def save_url_manifest(self):
+        """
+        Writes urls of all files in the sync state to the url manifest. Urls the sync state doesn't
+        keep, of files uploaded by older versions, are looked up in Imagekit. Hashed storages map
+        original names to urls of their hashed files too.
+        """
+        urls = {}
+        for name in sorted(self.sync_state.files):
+            url = self.sync_state.get_url(name)
+            if url is None:
+                metadata = self._get_metadata(name)
+                url = metadata['url'] if metadata is not None else None
+            if url is not None:
+                urls[self._get_manifest_name(name)] = url
+        for name, hashed_name in getattr(self, 'hashed_files', {}).items():
+            hashed_name = self._get_manifest_name(hashed_name)
+            if hashed_name in urls:
+                urls[self._get_manifest_name(name)] = urls[hashed_name]
+        transformed_urls = {
+            transformation: {name: self._get_transformed_url(url, options) for name, url in urls.items()
+                             if self._get_resource_type(name) == RESOURCE_TYPES['IMAGE']}
+            for transformation, options in self.url_manifest.transformations.items()
+        }
+        self.url_manifest.save(urls, transformed_urls)
+
+    def _get_manifest_name(self, name):
+        """
+        Returns name of a file in the url manifest, without the prefix which hashed names
+        and names of post-processed files saved again carry.
+        """
+        name = self.clean_name(name)
+        prefix = self._normalize_path(self._get_prefix().lstrip('/'))
+        if prefix and name.startswith(prefix):
+            return name[len(prefix):]
+        return name
+
+    def get_manifest_url(self, name, transformation=None):
+        """
+        Returns url of the file kept in the url manifest, with the named transformation when given,
+        None when it is not kept.
+        """
+        return self.url_manifest.get(self._get_manifest_name(name), transformation)
+
+    @staticmethod
+    def _get_transformed_url(url, options):
+        return build_url({
+            'src': url,
+            'transformation': [options],
+            'transformation_position': 'query',
+        })
+
+    def is_synced(self, name, content):
+        """
+        Checks with the local sync state whether a file with a name and a content is already uploaded to Imagekit.
+        """
+        synced_hash = self.sync_state.get_hash(self.clean_name(name))
+        return synced_hash is not None and synced_hash == self.file_hash(name, content)
+
     def _save(self, name, content):
         """
         Saves only when a file with a name and a content is not already uploaded to Imagekit.
+        Uploaded files are looked up in the local sync state, or with Imagekit when verify_remote is set
+        or the sync state doesn't know the file, e.g. on fresh checkouts, so that unchanged files aren't
+        uploaded again.
         """
         name = self.clean_name(name)  # to change to UNIX style path on windows if necessary
-        if not self._exists_with_etag(name, content):
+        content_hash = self.file_hash(name, content)
+        synced_hash = self.sync_state.get_hash(name)
+        verify_remote = self.verify_remote or synced_hash is None
+        if verify_remote:
             content.seek(0)
-            super(StaticImagekitStorage, self)._save(name, content)
-        return self._prepend_prefix(name)
+            uploaded = self._exists_with_etag(name, content)
+        else:
+            uploaded = synced_hash == content_hash
+        if uploaded:
+            if verify_remote:
+                metadata = self._get_metadata(name) or {}
+                self.sync_state.set(name, content_hash, metadata.get('file_id'), metadata.get('url'))
+        else:
+            content.seek(0)
+            response = self._upload_content(name, content)
+            self.sync_state.set(name, content_hash, response.file_id, response.url)
+            metadata_cache.delete(name)
+            with _inventory_lock:
+                if self._inventory is not None:
+                    self._inventory[response.file_path] = get_resource_metadata(response)
+        return self._get_saved_name(name)
 
-    def _get_prefix(self):
-        return settings.STATIC_URL
+    def delete(self, name):
+        self.sync_state.discard(self.clean_name(name))
+        return super(StaticImagekitStorage, self).delete(name)
 
-    def listdir(self, path):
+    def _get_spooled_metadata(self, name):
+        # static files are uploaded by collectstatic, never spooled
+        return None
+
+    def _get_file_ids(self, names):
+        """
+        Static names differ from Imagekit file paths, so they are resolved one by one,
+        from the inventory when it is prefetched.
+        """
+        return {name: self._get_file_id(name) for name in names}
+
+    def _get_file_id(self, name):
+        metadata = self._get_metadata(name)
+        return metadata['file_id'] if metadata is not None else None
+
+    def delete_many(self, names):
+        names = [str(name) for name in names]
+        for name in names:
+            self.sync_state.discard(self.clean_name(name))
+        return super(StaticImagekitStorage, self).delete_many(names)
+
+    def _get_saved_name(self, name):
         """
-        Not implemented as static assets can be of different resource types
-        in contrast to media storages, which are specialized per given resource type.
-        That's why we cannot use parent's class listdir.
-        This method could be implemented in the future if there is a demand for it.
+        Returns name returned by _save, which doesn't depend on the upload,
+        so that uploads can be deferred.
         """
-        raise NotImplementedError()
+        return self._prepend_prefix(self.clean_name(name))
+
+    def _get_prefix(self):
+        return settings.STATIC_URL
 
     def stored_name(self, name):
         """
@@ -310,6 +1059,9 @@ class ManifestImagekitStorage(FileSystemStorage):
 class HashImagekitMixin(object):
     def __init__(self, *args, **kwargs):
         self.manifest_storage = ManifestImagekitStorage()
+        if django.VERSION >= (4, 0):
+            # ManifestFilesMixin keeps the manifest in the storage itself unless it is given another one
+            kwargs.setdefault('manifest_storage', self.manifest_storage)
         super(HashImagekitMixin, self).__init__(*args, **kwargs)
 
     def hashed_name(self, name, content=None, filename=None):
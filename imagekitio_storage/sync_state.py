@@ -0,0 +1,50 @@
+from imagekitio_storage.json_state import JSONState
+
+
+class SyncState(JSONState):
+    """
+    Local index of static files uploaded to Imagekit, mapping their stored names
+    to the hash of the uploaded content, Imagekit file id and url. It is kept in the storage
+    of the manifest, so that collectstatic can skip unchanged files without any network I/O.
+    The index is discarded when it was written for another Imagekit account or upload folder.
+    """
+
+    def __init__(self, storage, name, target):
+        super(SyncState, self).__init__(storage, name, target)
+        self.changed = False
+
+    def _load(self):
+        payload = self._read()
+        return payload.get('files', {}) if payload is not None else {}
+
+    @property
+    def files(self):
+        return self.state
+
+    def get_hash(self, name):
+        entry = self.files.get(name)
+        return entry['hash'] if entry is not None else None
+
+    def get_url(self, name):
+        entry = self.files.get(name)
+        return entry.get('url') if entry is not None else None
+
+    def set(self, name, content_hash, file_id, url=None):
+        files = self.files
+        with self._lock:
+            files[name] = {'hash': content_hash, 'file_id': file_id, 'url': url}
+            self.changed = True
+
+    def discard(self, name):
+        files = self.files
+        with self._lock:
+            if files.pop(name, None) is not None:
+                self.changed = True
+
+    def save(self):
+        if not self.changed:
+            return
+        with self._lock:
+            contents = self._dumps({'files': self._state})
+            self.changed = False
+        self._write(contents)
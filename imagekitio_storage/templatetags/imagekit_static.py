@@ -1,29 +1,186 @@
+from functools import lru_cache
+
 from django import template
 from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.signals import setting_changed
+from django.template.base import token_kwargs
+from django.utils.html import format_html
 from django.utils.safestring import mark_safe
 
-from imagekitio_storage import ik_api
+from imagekitio_storage import app_settings
 from imagekitio_storage.resource import ImageKitResource
+from imagekitio_storage.srcset import get_srcset
+from imagekitio_storage.url_builder import build_url
 
 register = template.Library()
 
 
-@register.simple_tag(name='imagekit_static', takes_context=True)
+def _build_static_url(static, options):
+    return build_url({
+        "path": staticfiles_storage.stored_name(static),
+        "transformation": [options],
+        "transformation_position": "query"
+    })
+
+
+@lru_cache(maxsize=app_settings.STATIC_URL_CACHE_SIZE)
+def _get_cached_static_url(static, options_items):
+    return _build_static_url(static, dict(options_items))
+
+
+def get_static_url(static, options):
+    """
+    Returns Imagekit url of the static file with transformation options, memoized in an LRU cache
+    of STATIC_URL_CACHE_SIZE urls, as neither stored names nor urls change while the process runs.
+    Urls with unhashable options are built every time.
+    """
+    options_items = tuple(sorted(options.items()))
+    try:
+        hash((static, options_items))
+    except TypeError:
+        return _build_static_url(static, options)
+    return _get_cached_static_url(static, options_items)
+
+
+def clear_static_url_cache(**kwargs):
+    _get_cached_static_url.cache_clear()
+
+
+# stored names depend on the static files storage, which is recreated when its settings change
+setting_changed.connect(clear_static_url_cache)
+
+
+def _is_secure(context):
+    try:
+        return context['request'].is_secure()
+    except KeyError:
+        return False
+
+
+def _get_manifest_url(static, options):
+    """
+    Returns url kept in the url manifest of the static files storage, when the options are empty
+    or name only one of STATIC_URL_TRANSFORMATIONS.
+    """
+    get_manifest_url = getattr(staticfiles_storage, 'get_manifest_url', None)
+    if get_manifest_url is None or set(options) - {'transformation', 'secure'}:
+        return None
+    return get_manifest_url(static, options.get('transformation'))
+
+
+def _expand_transformation(options):
+    """
+    Replaces transformation option with the options of the transformation named in STATIC_URL_TRANSFORMATIONS.
+    """
+    name = options.get('transformation')
+    if name is None:
+        return options
+    try:
+        transformation = app_settings.STATIC_URL_TRANSFORMATIONS[name]
+    except (KeyError, TypeError):
+        raise ValueError("Unknown static url transformation '{}'.".format(name))
+    options = {key: value for key, value in options.items() if key != 'transformation'}
+    return dict(transformation, **options)
+
+
+def imagekit_static_url(context, static, options):
+    if isinstance(static, ImageKitResource):
+        return mark_safe(static)
+    url = _get_manifest_url(static, options)
+    if url is not None:
+        return mark_safe(url)
+    options = _expand_transformation(options)
+    if 'secure' not in options and _is_secure(context):
+        options = dict(options, secure=True)
+    return mark_safe(get_static_url(static, options))
+
+
 def imagekit_static(context, static, options_dict=None, **options):
     if options_dict is None:
         options_dict = {}
-    options = dict(options_dict, **options)
+    return imagekit_static_url(context, static, dict(options_dict, **options))
 
-    try:
-        if context['request'].is_secure() and 'secure' not in options:
-            options['secure'] = True
-    except KeyError:
-        pass
-    if not isinstance(static, ImageKitResource):
-        static = staticfiles_storage.stored_name(static)
-        static = ik_api.url({
-            "path": static,
-            "transformation": [options],
-            "transformation_position": "query"
-        })
-    return mark_safe(static)
+
+def _is_literal(expression):
+    return not expression.is_var and not expression.filters
+
+
+class ImagekitStaticNode(template.Node):
+    """
+    Renders imagekit_static tag. Arguments which are literals are resolved once, when the template
+    is compiled, so that rendering is a dictionary lookup when all of them are.
+    """
+
+    def __init__(self, static, options_dict, options, target_var=None):
+        self.static = static
+        self.options_dict = options_dict
+        self.options = options
+        self.target_var = target_var
+        expressions = [static] + ([options_dict] if options_dict is not None else []) + list(options.values())
+        if all(_is_literal(expression) for expression in expressions):
+            self.compiled = (static.var, self._get_options(template.Context()))
+        else:
+            self.compiled = None
+
+    def _get_options(self, context):
+        options_dict = self.options_dict.resolve(context) if self.options_dict is not None else None
+        options = dict(options_dict or {})
+        options.update((key, value.resolve(context)) for key, value in self.options.items())
+        return options
+
+    def render(self, context):
+        if self.compiled is not None:
+            static, options = self.compiled
+        else:
+            static, options = self.static.resolve(context), self._get_options(context)
+        url = imagekit_static_url(context, static, options)
+        if self.target_var is not None:
+            context[self.target_var] = url
+            return ''
+        return url
+
+
+@register.tag(name='imagekit_static')
+def do_imagekit_static(parser, token):
+    """
+    {% imagekit_static path [options_dict] [option=value ...] [as variable] %}
+    """
+    bits = token.split_contents()
+    tag_name = bits.pop(0)
+    target_var = None
+    if len(bits) >= 2 and bits[-2] == 'as':
+        target_var = bits[-1]
+        bits = bits[:-2]
+    if not bits:
+        raise template.TemplateSyntaxError("'{}' tag requires the static file path.".format(tag_name))
+    static = parser.compile_filter(bits.pop(0))
+    options_dict = None
+    if bits and '=' not in bits[0]:
+        options_dict = parser.compile_filter(bits.pop(0))
+    options = token_kwargs(bits, parser, support_legacy=False)
+    if bits:
+        raise template.TemplateSyntaxError("'{}' tag received invalid arguments: {}.".format(tag_name, ' '.join(bits)))
+    return ImagekitStaticNode(static, options_dict, options, target_var)
+
+
+@register.simple_tag(name='imagekit_srcset', takes_context=True)
+def imagekit_srcset(context, image, widths=None, sizes=None, **options):
+    """
+    Renders srcset attribute, and sizes attribute when given, of a static file path
+    or a file kept in an Imagekit storage, like an ImageField value. Variants of secure
+    requests are secure, like imagekit_static urls.
+
+    {% imagekit_srcset 'images/hero.jpg' widths='320,640,1280' sizes='100vw' format='webp' %}
+    """
+    if 'secure' not in options and _is_secure(context):
+        options = dict(options, secure=True)
+    storage_srcset = getattr(getattr(image, 'storage', None), 'srcset', None)
+    if storage_srcset is not None:
+        srcset = storage_srcset(image.name, widths, **options)
+    else:
+        static = str(image)
+        url = _get_manifest_url(static, {}) or get_static_url(static, {})
+        srcset = get_srcset(url, widths, options)
+    if sizes:
+        return format_html('srcset="{}" sizes="{}"', srcset, sizes)
+    return format_html('srcset="{}"', srcset)
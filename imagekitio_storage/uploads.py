@@ -0,0 +1,165 @@
+import datetime
+import hashlib
+import json
+import os
+import posixpath
+import re
+import time
+
+import requests
+from imagekitio.exceptions.InternalServerException import InternalServerException
+from imagekitio.exceptions.TooManyRequestsException import TooManyRequestsException
+from imagekitio.models.ListAndSearchFileRequestOptions import ListAndSearchFileRequestOptions
+
+from imagekitio_storage import app_settings, ik_api, logger
+from imagekitio_storage.helpers import get_remote_file_name
+
+RETRIED_EXCEPTIONS = (requests.ConnectionError, requests.Timeout, InternalServerException, TooManyRequestsException)
+
+# bytes read at a time when hashing file content
+HASH_READ_SIZE = 1024 * 1024
+
+
+def get_content_hash(file, read_size=HASH_READ_SIZE):
+    """
+    Returns SHA-256 hex digest of the file content, read read_size bytes at a time.
+    """
+    content_hash = hashlib.sha256()
+    file.seek(0)
+    for part in iter(lambda: file.read(read_size), b''):
+        content_hash.update(part)
+    file.seek(0)
+    return content_hash.hexdigest()
+
+
+class UploadCheckpoint(object):
+    """
+    Upload state kept as a JSON file in RETRIED_UPLOAD_CHECKPOINT_DIR, keyed by content hash,
+    so that an upload interrupted in one process can be resumed by another one.
+    """
+
+    def __init__(self, content_hash, directory=None):
+        self.content_hash = content_hash
+        self.directory = directory or app_settings.RETRIED_UPLOAD_CHECKPOINT_DIR
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, '{}.json'.format(self.content_hash))
+
+    def load(self):
+        try:
+            with open(self.path) as checkpoint:
+                return json.load(checkpoint)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, state):
+        os.makedirs(self.directory, exist_ok=True)
+        temporary_path = '{}.{}.tmp'.format(self.path, os.getpid())
+        with open(temporary_path, 'w') as checkpoint:
+            json.dump(state, checkpoint)
+        os.replace(temporary_path, self.path)
+
+    def delete(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class RetriedUpload(object):
+    """
+    Uploads a large file as one streamed request, retrying transient failures with exponential backoff.
+
+    Imagekit upload API accepts a file only as one request, so a failed transfer cannot be
+    continued from the failed part. Instead, before sending the file again, Imagekit is searched
+    for a file of the same name and size stored since the upload started, as large uploads
+    usually fail while waiting for the response of an already stored file. The upload start
+    is kept in a checkpoint keyed by content hash, so an upload of the same content to the same
+    folder, interrupted together with its process, is resumed by the next save instead of sent again.
+    """
+
+    def __init__(self, upload, file, file_name, options, max_retries=None, retry_delay=None):
+        self.upload = upload
+        self.file = file
+        self.file_name = file_name
+        self.options = options
+        self.max_retries = max_retries if max_retries is not None else app_settings.RETRIED_UPLOAD_MAX_RETRIES
+        self.retry_delay = retry_delay if retry_delay is not None else app_settings.RETRIED_UPLOAD_RETRY_DELAY
+        self.size = len(file)
+        self.checkpoint = UploadCheckpoint(get_content_hash(file))
+
+    @property
+    def folder(self):
+        return '/' + (getattr(self.options, 'folder', None) or '').strip('/')
+
+    def _load_state(self):
+        state = self.checkpoint.load()
+        if state is None or state.get('folder') != self.folder or state.get('file_name') != self.file_name:
+            return None
+        return state
+
+    def _find_uploaded(self, started_at):
+        """
+        Returns the file stored by an earlier attempt, None when there isn't one.
+        """
+        search_query = 'size = {} AND updatedAt >= "{}"'.format(self.size, started_at)
+        options = ListAndSearchFileRequestOptions(type='file', path=self.folder, search_query=search_query,
+                                                  file_type='all')
+        try:
+            resources = ik_api.list_files(options=options).list
+        except RETRIED_EXCEPTIONS:
+            return None
+        for resource in resources:
+            if posixpath.dirname(resource.file_path) == self.folder and self._is_uploaded_name(resource.name):
+                return resource
+        return None
+
+    def _is_uploaded_name(self, name):
+        """
+        Returns whether Imagekit could have stored the file under the name, which is the file name itself
+        or, with use_unique_file_name option, the file name with a random suffix appended to its stem.
+        """
+        file_name = get_remote_file_name(posixpath.basename(self.file_name))
+        if name == file_name:
+            return True
+        if not getattr(self.options, 'use_unique_file_name', False):
+            return False
+        stem, extension = os.path.splitext(file_name)
+        return re.match(r'{}_[a-zA-Z0-9\-]+{}$'.format(re.escape(stem), re.escape(extension)), name) is not None
+
+    def run(self):
+        state = self._load_state()
+        if state is not None:
+            resource = self._find_uploaded(state['started_at'])
+            if resource is not None:
+                logger.info('Resumed upload of %s, the file is already stored in Imagekit', self.file_name)
+                self.checkpoint.delete()
+                return resource
+        else:
+            # a minute earlier to tolerate clock skew between this host and Imagekit
+            started_at = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(minutes=1)
+            state = {'folder': self.folder, 'file_name': self.file_name, 'size': self.size,
+                     'started_at': started_at.strftime('%Y-%m-%dT%H:%M:%S.000Z')}
+            self.checkpoint.save(state)
+
+        attempt = 0
+        while True:
+            self.file.seek(0)
+            try:
+                response = self.upload(file=self.file, file_name=self.file_name, options=self.options)
+            except RETRIED_EXCEPTIONS as e:
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                logger.warning('Upload of %s failed (%s), retrying (%d/%d)', self.file_name, e, attempt,
+                               self.max_retries)
+                time.sleep(self.retry_delay * 2 ** (attempt - 1))
+                resource = self._find_uploaded(state['started_at'])
+                if resource is not None:
+                    response = resource
+                    break
+            else:
+                break
+        self.checkpoint.delete()
+        return response
@@ -0,0 +1,162 @@
+import hashlib
+import hmac
+from datetime import datetime as dt
+from functools import lru_cache
+from urllib.parse import quote_plus, urlparse, urlunparse
+
+from imagekitio.url import Url
+
+from imagekitio_storage import app_settings, ik_api
+from imagekitio_storage.defaults import Default
+
+# options handled by build_url, urls with any other option are built by the SDK
+SUPPORTED_OPTIONS = frozenset(['path', 'src', 'transformation', 'transformation_position', 'signed', 'expire_seconds'])
+# characters which urlparse splits urls on or strips from them, the SDK round-trips urls through it
+UNSAFE_CHARACTERS = frozenset('?#;\t\r\n')
+
+PATH_POSITION = Default.DEFAULT_TRANSFORMATION_POSITION.value
+QUERY_POSITION = Default.QUERY_TRANSFORMATION_POSITION.value
+VALID_POSITIONS = tuple(Default.VALID_TRANSFORMATION_POSITION.value)
+TRANSFORMATION_PARAMETER = Default.TRANSFORMATION_PARAMETER.value
+SIGNATURE_PARAMETER = Default.SIGNATURE_PARAMETER.value
+TIMESTAMP_PARAMETER = Default.TIMESTAMP_PARAMETER.value
+DEFAULT_TIMESTAMP = Default.DEFAULT_TIMESTAMP.value
+
+# keyed HMAC objects per private key, copied for every signature
+_signers = {}
+# url endpoints per whether urlparse round-trips urls starting with them unchanged
+_safe_endpoints = {}
+
+
+def _get_transformation_key(transformation):
+    # types are part of the key, as equal values like 1 and True are formatted differently
+    return tuple(tuple((key, type(value), value) for key, value in step.items()) for step in transformation)
+
+
+def _compile(transformation_string):
+    return transformation_string, quote_plus(transformation_string)
+
+
+@lru_cache(maxsize=app_settings.URL_TRANSFORMATION_CACHE_SIZE)
+def _compile_transformation(transformation_key):
+    return _compile(Url.transformation_to_str(
+        [{key: value for key, value_type, value in step} for step in transformation_key]))
+
+
+def compile_transformation(transformation):
+    """
+    Returns transformation string of the list of transformation steps and its query string quoted form,
+    formatted by the SDK once per distinct transformation. Transformations with unhashable values
+    are formatted every time.
+    """
+    if not isinstance(transformation, list):
+        return '', ''
+    try:
+        transformation_key = _get_transformation_key(transformation)
+        hash(transformation_key)
+    except (AttributeError, TypeError):
+        return _compile(Url.transformation_to_str(transformation))
+    return _compile_transformation(transformation_key)
+
+
+def get_transformation_string(transformation):
+    return compile_transformation(transformation)[0]
+
+
+def get_signature(private_key, message):
+    """
+    Returns hex HMAC-SHA1 signature of the message, computed from a copy of the HMAC object
+    keyed with the private key, so that the key is processed once per process.
+    """
+    signer = _signers.get(private_key)
+    if signer is None:
+        signer = _signers[private_key] = hmac.new(private_key.encode(), digestmod=hashlib.sha1)
+    signature = signer.copy()
+    signature.update(message.encode())
+    return signature.hexdigest()
+
+
+def _is_safe_endpoint(url_endpoint):
+    safe = _safe_endpoints.get(url_endpoint)
+    if safe is None:
+        url = url_endpoint + '/path'
+        try:
+            parsed_url = urlparse(url)
+            safe = bool(parsed_url.scheme and parsed_url.netloc) and urlunparse(parsed_url) == url
+        except ValueError:
+            safe = False
+        safe = _safe_endpoints[url_endpoint] = safe and UNSAFE_CHARACTERS.isdisjoint(url_endpoint)
+    return safe
+
+
+def _build_url(options):
+    """
+    Returns url built like the SDK builds it, None when the options need the SDK.
+    """
+    request = ik_api.ik_request
+    if request.options or not SUPPORTED_OPTIONS.issuperset(options):
+        return None
+    if not isinstance(request.url_endpoint, str):
+        return None
+    url_endpoint = request.url_endpoint.strip('/')
+    path = options.get('path', '')
+    src = options.get('src', '')
+    if not isinstance(path, str) or not isinstance(src, str) or not _is_safe_endpoint(url_endpoint):
+        return None
+    path = path.strip('/')
+    src = src.strip('/')
+    transformation_position = options.get('transformation_position', request.transformation_position)
+    if transformation_position not in VALID_POSITIONS:
+        return None
+    transformation_string, quoted_transformation = compile_transformation(options.get('transformation'))
+
+    if path:
+        if transformation_position == PATH_POSITION and transformation_string:
+            url = '{}/{}:{}/{}'.format(url_endpoint, TRANSFORMATION_PARAMETER, transformation_string.strip('/'), path)
+        else:
+            url = '{}/{}'.format(url_endpoint, path)
+    elif src:
+        if not src.startswith(url_endpoint + '/'):
+            return None
+        url = src
+        transformation_position = QUERY_POSITION
+    else:
+        return ''
+    if not UNSAFE_CHARACTERS.isdisjoint(url):
+        return None
+
+    query = ''
+    if transformation_position == QUERY_POSITION and transformation_string:
+        query = '{}={}'.format(TRANSFORMATION_PARAMETER, quoted_transformation)
+        url = '{}?{}'.format(url, query)
+
+    if options.get('signed'):
+        if not isinstance(request.private_key, str):
+            return None
+        expire_seconds = options.get('expire_seconds')
+        if expire_seconds:
+            expiry_timestamp = int(dt.now().timestamp()) + expire_seconds
+        else:
+            expiry_timestamp = DEFAULT_TIMESTAMP
+        signed_timestamp = expiry_timestamp if expiry_timestamp >= 1 else DEFAULT_TIMESTAMP
+        signature = get_signature(request.private_key,
+                                  url.replace(url_endpoint + '/', '') + str(signed_timestamp))
+        signature_query = '{}={}'.format(SIGNATURE_PARAMETER, signature)
+        if expire_seconds:
+            signature_query = '{}={}&{}'.format(TIMESTAMP_PARAMETER, quote_plus(str(expiry_timestamp)),
+                                                signature_query)
+        url = '{}{}{}'.format(url, '&' if query else '?', signature_query)
+    return url
+
+
+def build_url(options):
+    """
+    Builds the same url as ik_api.url, without parsing it and with transformation strings
+    and HMAC keys reused between calls. Options it doesn't handle, like query parameters,
+    camel case names or sources outside of the url endpoint, are passed to ik_api.url.
+    """
+    url = _build_url(options)
+    if url is None:
+        return ik_api.url(options)
+    return url
+
@@ -0,0 +1,51 @@
+from imagekitio_storage.json_state import JSONState
+
+
+class UrlManifest(JSONState):
+    """
+    Map of static file names to their Imagekit CDN urls, written by collectstatic next to
+    the manifest of hashed names, so that static urls are resolved with a dictionary lookup
+    instead of a file details request. Urls with the transformations named in
+    STATIC_URL_TRANSFORMATIONS are kept for images too, as long as the setting doesn't change.
+    The manifest is ignored when it was written for another Imagekit account or upload folder.
+    """
+
+    def __init__(self, storage, name, target, transformations=None):
+        super(UrlManifest, self).__init__(storage, name, target)
+        self.transformations = transformations or {}
+
+    def _load(self):
+        payload = self._read()
+        if payload is None:
+            return {}, {}
+        if payload.get('transformations') != self.transformations:
+            return payload.get('urls', {}), {}
+        return payload.get('urls', {}), payload.get('transformed_urls', {})
+
+    @property
+    def manifest(self):
+        return self.state
+
+    def get(self, name, transformation=None):
+        """
+        Returns url of the file, with the named transformation when given, None when it is not kept.
+        """
+        urls, transformed_urls = self.manifest
+        if transformation is None:
+            return urls.get(name)
+        return transformed_urls.get(transformation, {}).get(name)
+
+    def save(self, urls, transformed_urls):
+        """
+        Replaces urls kept in the manifest, which is written only when they change.
+        """
+        if self.manifest == (urls, transformed_urls):
+            return
+        contents = self._dumps({
+            'transformations': self.transformations,
+            'urls': urls,
+            'transformed_urls': transformed_urls,
+        })
+        with self._lock:
+            self._state = (urls, transformed_urls)
+        self._write(contents)
@@ -36,10 +36,12 @@ setup(
     include_package_data=True,
     install_requires=[
         'requests>=2.28.1',
-        'imagekitio>=3.0.1'
+        'imagekitio>=3.0.1',
+        'requests-toolbelt>=0.9.1'
     ],
     extras_require={
-        'video': ['python-magic>=0.4.27']
+        'video': ['python-magic>=0.4.27'],
+        'async': ['httpx>=0.23']
     },
     classifiers=[
         'Environment :: Web Environment',
@@ -0,0 +1,127 @@
+import asyncio
+
+import httpx
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+from imagekitio.exceptions.InternalServerException import InternalServerException
+
+from imagekitio_storage import app_settings
+from imagekitio_storage.aio import get_async_client
+from imagekitio_storage.cache import MISSING, metadata_cache
+from imagekitio_storage.storage import MediaImagekitStorage
+from tests.tests.test_helpers import get_random_file_id, get_random_name, import_mock
+
+mock = import_mock()
+
+
+def get_file_json(file_id, size=7):
+    return {'fileId': file_id, 'name': 'name', 'filePath': '/folder/{}'.format(file_id), 'size': size,
+            'url': 'https://ik.imagekit.io/xxx/folder/{}'.format(file_id), 'AITags': [],
+            'versionInfo': {'id': file_id, 'name': 'Version 1'}}
+
+
+class FakeImagekit(object):
+    """
+    Async handler of httpx.MockTransport answering the Imagekit API calls made by storages.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def __call__(self, request):
+        self.requests.append(request)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.01)
+            return self.respond(request)
+        finally:
+            self.in_flight -= 1
+
+    def respond(self, request):
+        path = request.url.path
+        if request.method == 'POST' and path == '/api/v1/files/upload':
+            return httpx.Response(200, json=get_file_json('uploaded'))
+        if request.method == 'GET' and path.endswith('/details'):
+            file_id = path.split('/')[-2]
+            if file_id.startswith('missing'):
+                return httpx.Response(404, json={'message': 'The requested file does not exist.'})
+            return httpx.Response(200, json=get_file_json(file_id))
+        if request.method == 'GET' and path == '/v1/files':
+            return httpx.Response(200, json=[get_file_json('by-path')])
+        if request.method == 'DELETE':
+            return httpx.Response(204)
+        if request.method == 'GET' and request.url.host == 'ik.imagekit.io':
+            return httpx.Response(200, content=b'content')
+        return httpx.Response(500, json={'message': 'Unexpected request'})
+
+
+class AsyncStorageTests(SimpleTestCase):
+    def setUp(self):
+        metadata_cache.clear()
+        cache.clear()
+        self.storage = MediaImagekitStorage()
+        self.imagekit = FakeImagekit()
+        factory = lambda: httpx.AsyncClient(transport=httpx.MockTransport(self.imagekit))
+        patcher = mock.patch.object(app_settings, 'HTTP_ASYNC_CLIENT_FACTORY', factory)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.dict(MediaImagekitStorage.UPLOAD_OPTIONS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_client_is_shared_within_event_loop(self):
+        self.assertIs(get_async_client(), get_async_client())
+
+    async def test_save_streams_multipart_body(self):
+        name = await self.storage.asave(get_random_name(), ContentFile(b'file content'))
+        self.assertEqual(name, 'uploaded')
+        request = self.imagekit.requests[0]
+        self.assertTrue(request.headers['Content-Type'].startswith('multipart/form-data'))
+        self.assertIn(b'file content', request.read())
+        self.assertEqual((await metadata_cache.aget('uploaded'))['size'], 7)
+
+    async def test_url_exists_and_size_use_single_lookup(self):
+        file_id = get_random_file_id()
+        self.assertEqual(await self.storage.aurl(file_id), 'https://ik.imagekit.io/xxx/folder/{}'.format(file_id))
+        self.assertTrue(await self.storage.aexists(file_id))
+        self.assertEqual(await self.storage.asize(file_id), 7)
+        self.assertEqual(len(self.imagekit.requests), 1)
+
+    async def test_missing_file(self):
+        self.assertFalse(await self.storage.aexists('missing'))
+        self.assertIsNone(await self.storage.asize('missing'))
+        self.assertIs(await metadata_cache.aget('missing'), MISSING)
+        self.assertEqual(len(self.imagekit.requests), 1)
+
+    async def test_file_path_is_found_with_search_query(self):
+        self.assertTrue(await self.storage.aexists('folder/by-path'))
+        self.assertEqual(self.imagekit.requests[0].url.params['searchQuery'], 'name = "by-path"')
+        self.assertFalse(await self.storage.aexists('folder/other'))
+
+    async def test_open_reads_file(self):
+        file = await self.storage.aopen(get_random_file_id())
+        self.assertEqual(file.read(), b'content')
+        self.assertEqual(self.imagekit.requests[1].url.host, 'ik.imagekit.io')
+
+    async def test_delete_caches_missing_file(self):
+        file_id = get_random_file_id()
+        await self.storage.adelete(file_id)
+        self.assertEqual(self.imagekit.requests[0].method, 'DELETE')
+        self.assertFalse(await self.storage.aexists(file_id))
+        self.assertEqual(len(self.imagekit.requests), 1)
+
+    async def test_calls_run_concurrently(self):
+        file_ids = [get_random_file_id() for _ in range(10)]
+        sizes = await asyncio.gather(*(self.storage.asize(file_id) for file_id in file_ids))
+        self.assertEqual(sizes, [7] * 10)
+        self.assertGreater(self.imagekit.max_in_flight, 1)
+
+    async def test_api_error_is_raised(self):
+        self.imagekit.respond = lambda request: httpx.Response(
+            500, json={'message': 'Internal error'})
+        with self.assertRaises(InternalServerException):
+            await self.storage.aexists(get_random_file_id())
@@ -0,0 +1,144 @@
+from django.core.cache import cache
+from django.test import SimpleTestCase
+from imagekitio.exceptions.BadRequestException import BadRequestException
+from imagekitio.exceptions.NotFoundException import NotFoundException
+from imagekitio.models.results.ResponseMetadata import ResponseMetadata
+
+from imagekitio_storage import app_settings
+from imagekitio_storage.cache import MISSING, metadata_cache
+from imagekitio_storage.delete import delete_imagekit_files
+from imagekitio_storage.helpers import get_names_search_queries
+from imagekitio_storage.storage import MediaImagekitStorage, BULK_DELETE_MAX_FILES
+from tests.models import TestFileAndImageFieldModel
+from tests.tests.test_helpers import (get_random_file_id, import_mock, get_bulk_delete_result, get_file_details_result,
+                                      get_list_files_result)
+
+mock = import_mock()
+
+
+class GetNamesSearchQueriesTests(SimpleTestCase):
+    def test_names_fit_in_one_query(self):
+        queries = get_names_search_queries(['a', 'b'])
+        self.assertEqual(queries, [(['a', 'b'], 'name IN ["a", "b"]')])
+
+    def test_names_are_split_by_query_length(self):
+        queries = get_names_search_queries(['first', 'second', 'third'], max_length=30)
+        self.assertEqual([chunk for chunk, query in queries], [['first', 'second'], ['third']])
+        for chunk, query in queries:
+            self.assertLessEqual(len(query), 30)
+
+
+@mock.patch('imagekitio_storage.helpers.ik_api.list_files')
+@mock.patch('imagekitio_storage.storage.ik_api.get_file_details')
+class BatchResolutionTests(SimpleTestCase):
+    def setUp(self):
+        metadata_cache.clear()
+        cache.clear()
+        self.storage = MediaImagekitStorage()
+        self.paths = ['root/media/first', 'root/media/second', 'root/other/third']
+        self.resources = [get_file_details_result(get_random_file_id(), file_path='/' + path, size=index)
+                          for index, path in enumerate(self.paths)]
+
+    def list_files(self, options):
+        return get_list_files_result(resource for resource in self.resources
+                                     if resource.file_path.rsplit('/', 1)[0] == options.path)
+
+    def test_paths_are_resolved_with_one_query_per_folder(self, get_file_details_mock, list_files_mock):
+        list_files_mock.side_effect = self.list_files
+        urls = self.storage.urls_many(self.paths + ['root/media/missing'])
+        self.assertEqual(list_files_mock.call_count, 2)
+        self.assertFalse(get_file_details_mock.called)
+        self.assertEqual(list(urls), self.paths + ['root/media/missing'])
+        self.assertEqual(urls['root/media/first'], self.resources[0].url)
+
+    def test_file_ids_are_resolved_with_file_details(self, get_file_details_mock, list_files_mock):
+        file_id = get_random_file_id()
+        missing_file_id = get_random_file_id()
+
+        def get_file_details(file_id):
+            if file_id == missing_file_id:
+                raise BadRequestException('', '', None)
+            return get_file_details_result(file_id, size=10)
+
+        get_file_details_mock.side_effect = get_file_details
+        self.assertEqual(self.storage.exists_many([file_id, missing_file_id]),
+                         {file_id: True, missing_file_id: False})
+        self.assertEqual(self.storage.sizes_many([file_id]), {file_id: 10})
+        self.assertEqual(get_file_details_mock.call_count, 2)
+        self.assertFalse(list_files_mock.called)
+
+    def test_resolved_names_warm_metadata_cache(self, get_file_details_mock, list_files_mock):
+        list_files_mock.side_effect = self.list_files
+        self.storage.sizes_many(self.paths)
+        list_files_mock.reset_mock()
+        self.assertEqual(self.storage.size(self.paths[1]), 1)
+        self.assertFalse(list_files_mock.called)
+
+    @mock.patch.object(app_settings, 'USE_FILE_PATH_AS_NAME', True)
+    def test_urls_of_paths_are_built_locally_in_file_path_mode(self, get_file_details_mock, list_files_mock):
+        urls = self.storage.urls_many(self.paths)
+        self.assertFalse(list_files_mock.called)
+        self.assertTrue(urls['root/media/first'].endswith('/root/media/first'))
+
+
+@mock.patch('imagekitio_storage.helpers.ik_api.list_files')
+@mock.patch('imagekitio_storage.storage.ik_api')
+class BulkDeleteTests(SimpleTestCase):
+    def setUp(self):
+        metadata_cache.clear()
+        cache.clear()
+        self.storage = MediaImagekitStorage()
+
+    def test_files_are_deleted_in_chunks(self, ik_api_mock, list_files_mock):
+        ik_api_mock.bulk_file_delete.side_effect = get_bulk_delete_result
+        file_ids = ['{:024x}'.format(index) for index in range(BULK_DELETE_MAX_FILES + 1)]
+        self.assertEqual(self.storage.delete_many(file_ids + file_ids[:1]), file_ids)
+        chunks = [call[1]['file_ids'] for call in ik_api_mock.bulk_file_delete.call_args_list]
+        self.assertEqual(chunks, [file_ids[:BULK_DELETE_MAX_FILES], file_ids[BULK_DELETE_MAX_FILES:]])
+        self.assertFalse(ik_api_mock.delete_file.called)
+        self.assertIs(metadata_cache.get(file_ids[0]), MISSING)
+
+    @mock.patch.object(app_settings, 'USE_FILE_PATH_AS_NAME', True)
+    def test_paths_are_resolved_to_file_ids(self, ik_api_mock, list_files_mock):
+        file_id, path_id = get_random_file_id(), get_random_file_id()
+        ik_api_mock.bulk_file_delete.side_effect = get_bulk_delete_result
+        list_files_mock.return_value = get_list_files_result(
+            [get_file_details_result(path_id, file_path='/root/media/file')])
+        deleted = self.storage.delete_many([file_id, 'root/media/file', 'root/media/missing'])
+        self.assertEqual(deleted, [file_id, 'root/media/file'])
+        ik_api_mock.bulk_file_delete.assert_called_once_with(file_ids=[file_id, path_id])
+
+    def test_names_which_are_not_file_ids_are_skipped_without_file_paths(self, ik_api_mock, list_files_mock):
+        file_id = get_random_file_id()
+        ik_api_mock.bulk_file_delete.side_effect = get_bulk_delete_result
+        with self.assertLogs('imagekit-storage', 'WARNING') as logs:
+            deleted = self.storage.delete_many([file_id, 'legacy/first', 'legacy/second'])
+        self.assertEqual(deleted, [file_id])
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn('2 files', logs.output[0])
+        self.assertFalse(list_files_mock.called)
+        ik_api_mock.bulk_file_delete.assert_called_once_with(file_ids=[file_id])
+
+    def test_missing_files_are_left_out(self, ik_api_mock, list_files_mock):
+        first, missing, second = get_random_file_id(), get_random_file_id(), get_random_file_id()
+
+        def bulk_file_delete_missing(file_ids):
+            if missing in file_ids:
+                raise NotFoundException('', '', ResponseMetadata({'missingFileIds': [missing]}, 404, {}))
+            return get_bulk_delete_result(file_ids)
+
+        ik_api_mock.bulk_file_delete.side_effect = bulk_file_delete_missing
+        with mock.patch('imagekitio_storage.storage.NotFoundException', NotFoundException):
+            self.assertEqual(self.storage.delete_many([first, missing, second]), [first, second])
+        self.assertEqual(ik_api_mock.bulk_file_delete.call_count, 2)
+
+
+@mock.patch('imagekitio_storage.storage.ik_api')
+class DeleteImagekitFilesTests(SimpleTestCase):
+    def test_all_fields_are_deleted_with_one_request(self, ik_api_mock):
+        ik_api_mock.bulk_file_delete.side_effect = get_bulk_delete_result
+        file_id, image_id = get_random_file_id(), get_random_file_id()
+        instance = TestFileAndImageFieldModel(name='with file and image', file=file_id, image=image_id)
+        delete_imagekit_files(instance=instance, fields=['file', 'image'])
+        ik_api_mock.bulk_file_delete.assert_called_once_with(file_ids=[file_id, image_id])
+        self.assertFalse(ik_api_mock.delete_file.called)
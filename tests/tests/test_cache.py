@@ -0,0 +1,136 @@
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+from imagekitio.exceptions.BadRequestException import BadRequestException
+from imagekitio.exceptions.UnknownException import UnknownException
+from imagekitio.models.results.ResponseMetadata import ResponseMetadata
+
+from imagekitio_storage import app_settings
+from imagekitio_storage.cache import LocalLRUCache, MISSING, metadata_cache
+from imagekitio_storage.storage import MediaImagekitStorage
+from tests.tests.test_helpers import get_random_file_id, get_random_name, import_mock, get_file_details_result
+
+mock = import_mock()
+
+
+class LocalLRUCacheTests(SimpleTestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        lru = LocalLRUCache(max_entries=2)
+        lru.set('a', 1, 60)
+        lru.set('b', 2, 60)
+        lru.get('a')
+        lru.set('c', 3, 60)
+        self.assertEqual(lru.get('a'), 1)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('c'), 3)
+
+    @mock.patch('imagekitio_storage.cache.time.monotonic')
+    def test_expired_entry_is_not_returned(self, monotonic_mock):
+        lru = LocalLRUCache(max_entries=2)
+        monotonic_mock.return_value = 100
+        lru.set('a', 1, 10)
+        monotonic_mock.return_value = 111
+        self.assertIsNone(lru.get('a'))
+        self.assertEqual(len(lru), 0)
+
+
+@mock.patch('imagekitio_storage.storage.ik_api')
+class MetadataCacheStorageTests(SimpleTestCase):
+    def setUp(self):
+        metadata_cache.clear()
+        cache.clear()
+        self.storage = MediaImagekitStorage()
+        self.file_id = get_random_file_id()
+        patcher = mock.patch.object(MediaImagekitStorage, '_upload')
+        self.upload_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_url_is_fetched_once(self, ik_api_mock):
+        ik_api_mock.get_file_details.return_value = get_file_details_result(self.file_id)
+        first_url = self.storage.url(self.file_id)
+        self.assertEqual(self.storage.url(self.file_id), first_url)
+        ik_api_mock.get_file_details.assert_called_once_with(file_id=self.file_id)
+
+    def test_shared_cache_is_used_when_local_cache_is_empty(self, ik_api_mock):
+        ik_api_mock.get_file_details.return_value = get_file_details_result(self.file_id)
+        self.storage.url(self.file_id)
+        metadata_cache.clear()
+        self.storage.url(self.file_id)
+        self.assertEqual(ik_api_mock.get_file_details.call_count, 1)
+
+    def test_exists_and_size_make_no_calls_after_warm_up(self, ik_api_mock):
+        ik_api_mock.get_file_details.return_value = get_file_details_result(self.file_id, size=15)
+        self.storage.url(self.file_id)
+        with mock.patch('imagekitio_storage.storage.get_session') as get_session_mock:
+            self.assertTrue(self.storage.exists(self.file_id))
+            self.assertEqual(self.storage.size(self.file_id), 15)
+        self.assertFalse(get_session_mock.called)
+        self.assertEqual(ik_api_mock.get_file_details.call_count, 1)
+
+    def test_save_refreshes_entry(self, ik_api_mock):
+        self.upload_mock.return_value = get_file_details_result(self.file_id)
+        name = self.storage.save(get_random_name(), ContentFile(b'content'))
+        self.storage.url(name)
+        self.assertFalse(ik_api_mock.get_file_details.called)
+
+    def test_delete_invalidates_entry(self, ik_api_mock):
+        ik_api_mock.get_file_details.return_value = get_file_details_result(self.file_id)
+        self.storage.url(self.file_id)
+        self.storage.delete(self.file_id)
+        self.assertIs(metadata_cache.get(self.file_id), MISSING)
+
+    def test_cache_can_be_disabled(self, ik_api_mock):
+        ik_api_mock.get_file_details.return_value = get_file_details_result(self.file_id)
+        with mock.patch.object(app_settings, 'METADATA_CACHE_TIMEOUT', 0):
+            self.storage.url(self.file_id)
+            self.storage.url(self.file_id)
+        self.assertEqual(ik_api_mock.get_file_details.call_count, 2)
+
+    def test_exists_and_size_use_single_lookup(self, ik_api_mock):
+        ik_api_mock.get_file_details.return_value = get_file_details_result(self.file_id, size=15)
+        with mock.patch('imagekitio_storage.storage.get_session') as get_session_mock:
+            self.assertTrue(self.storage.exists(self.file_id))
+            self.assertEqual(self.storage.size(self.file_id), 15)
+        self.assertFalse(get_session_mock.called)
+        ik_api_mock.get_file_details.assert_called_once_with(file_id=self.file_id)
+
+    def test_missing_file_is_cached(self, ik_api_mock):
+        ik_api_mock.get_file_details.side_effect = BadRequestException('', '', None)
+        self.assertFalse(self.storage.exists(self.file_id))
+        self.assertFalse(self.storage.exists(self.file_id))
+        self.assertIsNone(self.storage.size(self.file_id))
+        self.assertEqual(ik_api_mock.get_file_details.call_count, 1)
+        self.assertIs(metadata_cache.get(self.file_id), MISSING)
+
+    @mock.patch('imagekitio_storage.storage.UnknownException', UnknownException)
+    def test_not_found_response_means_missing_file(self, ik_api_mock):
+        ik_api_mock.get_file_details.side_effect = UnknownException('', '', ResponseMetadata(None, 404, {}))
+        self.assertFalse(self.storage.exists(self.file_id))
+
+    @mock.patch('imagekitio_storage.storage.UnknownException', UnknownException)
+    def test_api_error_is_raised_and_not_cached(self, ik_api_mock):
+        ik_api_mock.get_file_details.side_effect = UnknownException('', '', ResponseMetadata(None, 500, {}))
+        with mock.patch('imagekitio_storage.storage.get_session') as get_session_mock:
+            with self.assertRaises(UnknownException):
+                self.storage.exists(self.file_id)
+        self.assertFalse(get_session_mock.called)
+        self.assertIsNone(metadata_cache.get(self.file_id))
+
+    def test_missing_file_can_be_saved(self, ik_api_mock):
+        ik_api_mock.get_file_details.side_effect = BadRequestException('', '', None)
+        self.upload_mock.return_value = get_file_details_result(self.file_id)
+        self.assertFalse(self.storage.exists(self.file_id))
+        self.storage.save(get_random_name(), ContentFile(b'content'))
+        self.assertTrue(self.storage.exists(self.file_id))
+
+    def test_deleted_file_is_cached_as_missing(self, ik_api_mock):
+        self.storage.delete(self.file_id)
+        self.assertFalse(self.storage.exists(self.file_id))
+        self.assertFalse(ik_api_mock.get_file_details.called)
+
+    def test_negative_caching_can_be_disabled(self, ik_api_mock):
+        ik_api_mock.get_file_details.side_effect = BadRequestException('', '', None)
+        with mock.patch.object(app_settings, 'METADATA_CACHE_NEGATIVE_TIMEOUT', 0):
+            self.storage.exists(self.file_id)
+            self.storage.exists(self.file_id)
+        self.assertEqual(ik_api_mock.get_file_details.call_count, 2)
@@ -1,17 +1,24 @@
+import datetime
 import os
+import threading
+import time
 
 from django.core.files.base import ContentFile
 from django.core.files.images import ImageFile
-from django.test import SimpleTestCase, override_settings
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, TestCase, override_settings
 from django.utils import version
+from imagekitio.exceptions.UnknownException import UnknownException
+from imagekitio.models.results.ResponseMetadata import ResponseMetadata
 
 from imagekitio_storage import app_settings
 from imagekitio_storage.storage import (MediaImagekitStorage, RawMediaImagekitStorage, StaticImagekitStorage,
                                         StaticHashedImagekitStorage)
 from tests.models import TestFileFieldModel, TestFileAndImageFieldModel, TestWithoutMediaModel
-from tests.tests.test_helpers import (get_random_name, set_media_tag, execute_command,
+from tests.tests.test_helpers import (get_random_file_id, get_random_name, set_media_tag, execute_command,
                                       get_save_calls_counter_in_postprocess_of_adjustable_file,
-                                      get_postprocess_counter_of_adjustable_file, import_mock)
+                                      get_postprocess_counter_of_adjustable_file, import_mock,
+                                      get_bulk_delete_result, get_fake_list_files, get_file_details_result)
 
 mock = import_mock()
 
@@ -78,6 +85,70 @@ class CollectStaticCommandTests(SimpleTestCase):
             self.assertIn('2 static files copied.', output)
 
 
+@override_settings(STATICFILES_STORAGE='imagekitio_storage.storage.StaticImagekitStorage')
+@mock.patch.object(StaticImagekitStorage, 'get_modified_time', side_effect=FileNotFoundError)
+class CollectStaticCommandWithJobsTests(SimpleTestCase):
+    @staticmethod
+    def get_copied_files(output):
+        return [line for line in output.splitlines() if line.startswith('Copying')]
+
+    @mock.patch.object(StaticImagekitStorage, 'save')
+    def test_files_are_saved_concurrently_and_reported_in_order(self, save_mock, get_modified_time_mock):
+        threads = set()
+
+        def save(name, content):
+            threads.add(threading.current_thread())
+            # the first found file is saved last
+            time.sleep(0.05 if name == STATIC_FILES[0] else 0)
+
+        save_mock.side_effect = save
+        output = execute_command('collectstatic', '--noinput', '--jobs', '4', '-v', '2')
+        self.assertNotIn(threading.current_thread(), threads)
+        sequential_output = execute_command('collectstatic', '--noinput', '-v', '2')
+        self.assertEqual(save_mock.call_count, 2 * len(self.get_copied_files(output)))
+        self.assertEqual(self.get_copied_files(output), self.get_copied_files(sequential_output))
+        self.assertEqual(output.splitlines()[-1], sequential_output.splitlines()[-1])
+
+    @mock.patch.object(StaticImagekitStorage, 'save', side_effect=ValueError('Upload failed'))
+    def test_first_error_stops_command(self, save_mock, get_modified_time_mock):
+        with self.assertRaisesMessage(ValueError, 'Upload failed'):
+            execute_command('collectstatic', '--noinput', '--jobs', '2')
+
+    def test_jobs_must_be_positive(self, get_modified_time_mock):
+        with self.assertRaises(CommandError):
+            execute_command('collectstatic', '--noinput', '--jobs', '0')
+
+
+@override_settings(STATICFILES_STORAGE='imagekitio_storage.storage.StaticHashedImagekitStorage')
+@mock.patch.object(StaticImagekitStorage, 'url', side_effect=lambda name: '/static/' + name)
+@mock.patch.object(StaticHashedImagekitStorage, 'save_manifest')
+class CollectStaticCommandWithHashedStorageAndJobsTests(SimpleTestCase):
+    @mock.patch.object(StaticHashedImagekitStorage, '_save')
+    def test_post_processed_files_are_uploaded_on_thread_pool(self, save_mock, save_manifest_mock, url_mock):
+        threads = set()
+        contents = []
+
+        def save(name, content):
+            threads.add(threading.current_thread())
+            contents.append(content.read())
+            return name
+
+        save_mock.side_effect = save
+        output = execute_command('collectstatic', '--noinput', '--jobs', '4')
+        self.assertNotIn(threading.current_thread(), threads)
+        self.assertTrue(all(contents))
+        save_calls_count = save_mock.call_count
+        sequential_output = execute_command('collectstatic', '--noinput')
+        self.assertEqual(save_mock.call_count, 2 * save_calls_count)
+        self.assertEqual(output, sequential_output)
+
+    @mock.patch.object(StaticHashedImagekitStorage, '_save', side_effect=ValueError('Upload failed'))
+    def test_upload_error_is_raised(self, save_mock, save_manifest_mock, url_mock):
+        with self.assertRaisesMessage(ValueError, 'Upload failed'):
+            execute_command('collectstatic', '--noinput', '--jobs', '2')
+        self.assertNotIn('_save', StaticHashedImagekitStorage().__dict__)
+
+
 @override_settings(STATICFILES_STORAGE='imagekitio_storage.storage.StaticHashedImagekitStorage')
 @mock.patch.object(StaticHashedImagekitStorage, '_save')
 class CollectStaticCommandWithHashedStorageTests(SimpleTestCase):
@@ -113,3 +184,126 @@ class CollectStaticCommandWithHashedStorageWithoutMockTests(SimpleTestCase):
             os.remove(manifest_path)
         finally:
             StaticHashedImagekitStorage.manifest_name = 'staticfiles.json'
+
+
+@mock.patch('imagekitio_storage.management.commands.migrate_imagekit_names.ik_api.get_file_details')
+class MigrateImagekitNamesCommandTests(TestCase):
+    def setUp(self):
+        self.file_id = get_random_file_id()
+        self.model = TestFileFieldModel.objects.create(name='with file', file=self.file_id)
+        self.migrated_model = TestFileFieldModel.objects.create(name='with path', file='root/media/file')
+        self.empty_model = TestFileFieldModel.objects.create(name='without file')
+
+    def test_file_ids_are_rewritten_to_paths(self, get_file_details_mock):
+        get_file_details_mock.return_value = get_file_details_result(self.file_id, file_path='/root/media/name')
+        output = execute_command('migrate_imagekit_names')
+        self.model.refresh_from_db()
+        self.assertEqual(self.model.file.name, 'root/media/name')
+        get_file_details_mock.assert_called_once_with(file_id=self.file_id)
+        self.assertIn('1 file names rewritten.', output)
+
+    def test_dry_run_leaves_file_ids_intact(self, get_file_details_mock):
+        get_file_details_mock.return_value = get_file_details_result(self.file_id, file_path='/root/media/name')
+        output = execute_command('migrate_imagekit_names', '--dry-run')
+        self.model.refresh_from_db()
+        self.assertEqual(self.model.file.name, self.file_id)
+        self.assertIn('1 file names would be rewritten.', output)
+
+    @mock.patch('imagekitio_storage.management.commands.migrate_imagekit_names.UnknownException', UnknownException)
+    def test_rows_of_deleted_files_are_skipped(self, get_file_details_mock):
+        get_file_details_mock.side_effect = UnknownException('', '', ResponseMetadata(None, 404, {}))
+        output = execute_command('migrate_imagekit_names')
+        self.model.refresh_from_db()
+        self.assertEqual(self.model.file.name, self.file_id)
+        self.assertIn('0 file names rewritten.', output)
+
+    def test_names_of_files_in_root_folder_are_left_intact(self, get_file_details_mock):
+        TestFileFieldModel.objects.filter(pk=self.model.pk).update(file='photo.jpg')
+        output = execute_command('migrate_imagekit_names')
+        self.model.refresh_from_db()
+        self.assertEqual(self.model.file.name, 'photo.jpg')
+        self.assertFalse(get_file_details_mock.called)
+        self.assertIn('0 file names rewritten.', output)
+
+
+@mock.patch('imagekitio_storage.storage.ik_api')
+@mock.patch('imagekitio_storage.helpers.ik_api')
+class RemoveOrphanedMediaCommandTests(TestCase):
+    def setUp(self):
+        folder = MediaImagekitStorage()._get_folder_path('')
+        static_folder = StaticImagekitStorage()._get_folder_path('')
+        created_at = '2022-12-01T10:00:00.000Z'
+        self.referenced = get_file_details_result(get_random_file_id(), created_at=created_at,
+                                                  file_path=folder + '/raw-file-tests/referenced')
+        self.referenced_by_path = get_file_details_result(get_random_file_id(), created_at=created_at,
+                                                          file_path=folder + '/image-file-tests/by-path')
+        self.orphans = [
+            get_file_details_result(get_random_file_id(), file_path=folder + '/orphan', created_at=created_at),
+            get_file_details_result(get_random_file_id(), file_path=folder + '/raw-file-tests/nested/orphan',
+                                    created_at=created_at),
+        ]
+        self.recent = get_file_details_result(get_random_file_id(), file_path=folder + '/recent',
+                                              created_at=datetime.datetime.now(datetime.timezone.utc).isoformat())
+        self.static = get_file_details_result(get_random_file_id(), file_path=static_folder + '/style.css',
+                                              created_at=created_at)
+        TestFileFieldModel.objects.create(name='with file id', file=self.referenced.file_id)
+        TestFileAndImageFieldModel.objects.create(name='with file path',
+                                                  image=self.referenced_by_path.file_path.lstrip('/'))
+        TestFileFieldModel.objects.create(name='without file')
+        self.files = [self.referenced, self.referenced_by_path, self.static, self.recent] + self.orphans
+
+    def get_removed(self, storage_ik_api_mock):
+        return sorted(file_id for call in storage_ik_api_mock.bulk_file_delete.call_args_list
+                      for file_id in call[1]['file_ids'])
+
+    def test_only_orphans_are_removed(self, helpers_ik_api_mock, storage_ik_api_mock):
+        helpers_ik_api_mock.list_files.side_effect = get_fake_list_files(self.files)
+        storage_ik_api_mock.bulk_file_delete.side_effect = get_bulk_delete_result
+        output = execute_command('remove_orphaned_media', '--noinput', '--batch-size', '1', '--jobs', '2')
+        self.assertEqual(self.get_removed(storage_ik_api_mock), sorted(orphan.file_id for orphan in self.orphans))
+        self.assertIn('2 of 5 files removed in', output)
+        self.assertIn('files/s', output)
+
+    def test_dry_run_removes_nothing(self, helpers_ik_api_mock, storage_ik_api_mock):
+        helpers_ik_api_mock.list_files.side_effect = get_fake_list_files(self.files)
+        output = execute_command('remove_orphaned_media', '--dry-run', '-v', '2')
+        self.assertFalse(storage_ik_api_mock.bulk_file_delete.called)
+        self.assertIn('Would remove {}'.format(self.orphans[0].file_path), output)
+        self.assertNotIn(self.referenced.file_path, output)
+        self.assertIn('2 of 5 files would be removed', output)
+
+    def test_files_are_listed_page_by_page(self, helpers_ik_api_mock, storage_ik_api_mock):
+        helpers_ik_api_mock.list_files.side_effect = get_fake_list_files(self.files)
+        storage_ik_api_mock.bulk_file_delete.side_effect = get_bulk_delete_result
+        with mock.patch.object(app_settings, 'LIST_FILES_PAGE_SIZE', 1):
+            execute_command('remove_orphaned_media', '--noinput')
+        self.assertEqual(self.get_removed(storage_ik_api_mock), sorted(orphan.file_id for orphan in self.orphans))
+        limits = {call[1]['options'].limit for call in helpers_ik_api_mock.list_files.call_args_list}
+        self.assertEqual(limits, {1})
+
+    def test_removal_error_is_raised(self, helpers_ik_api_mock, storage_ik_api_mock):
+        helpers_ik_api_mock.list_files.side_effect = get_fake_list_files(self.files)
+        storage_ik_api_mock.bulk_file_delete.side_effect = ValueError('Removal failed')
+        with self.assertRaisesMessage(ValueError, 'Removal failed'):
+            execute_command('remove_orphaned_media', '--noinput')
+
+    def test_recent_files_are_removed_only_without_min_age(self, helpers_ik_api_mock, storage_ik_api_mock):
+        helpers_ik_api_mock.list_files.side_effect = get_fake_list_files(self.files)
+        storage_ik_api_mock.bulk_file_delete.side_effect = get_bulk_delete_result
+        execute_command('remove_orphaned_media', '--noinput', '--min-age', '0')
+        self.assertEqual(self.get_removed(storage_ik_api_mock),
+                         sorted(orphan.file_id for orphan in self.orphans + [self.recent]))
+
+    @mock.patch.object(StaticImagekitStorage, 'TAG', None)
+    @mock.patch.object(MediaImagekitStorage, 'TAG', None)
+    def test_static_files_in_media_folder_are_refused(self, helpers_ik_api_mock, storage_ik_api_mock):
+        with self.assertRaisesMessage(CommandError, 'together with media files'):
+            execute_command('remove_orphaned_media', '--noinput')
+        self.assertFalse(helpers_ik_api_mock.list_files.called)
+        self.assertFalse(storage_ik_api_mock.bulk_file_delete.called)
+
+    @mock.patch('imagekitio_storage.management.commands.remove_orphaned_media.input', return_value='no')
+    def test_removal_can_be_cancelled(self, input_mock, helpers_ik_api_mock, storage_ik_api_mock):
+        with self.assertRaises(CommandError):
+            execute_command('remove_orphaned_media')
+        self.assertFalse(helpers_ik_api_mock.list_files.called)
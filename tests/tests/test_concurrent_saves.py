@@ -0,0 +1,85 @@
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+
+from imagekitio_storage import app_settings
+from imagekitio_storage.cache import metadata_cache
+from imagekitio_storage.resource import ImageKitResource
+from imagekitio_storage.storage import MediaImagekitStorage, StaticImagekitStorage
+from tests.tests.test_helpers import get_random_file_id, import_mock, get_file_details_result
+
+mock = import_mock()
+
+SAVES_COUNT = 64
+
+
+@mock.patch.object(ImageKitResource, 'upload')
+class ConcurrentSavesTests(SimpleTestCase):
+    def setUp(self):
+        metadata_cache.clear()
+        cache.clear()
+        self.barrier = threading.Barrier(8, timeout=5)
+
+    def upload(self, file, file_name, options):
+        folder = options.folder
+        try:
+            # makes threads interleave between building options and uploading
+            self.barrier.wait()
+        except threading.BrokenBarrierError:
+            pass
+        time.sleep(0.001)
+        file_path = re.sub('/+', '/', '/{}/{}'.format(folder, file_name.replace('/', '_')))
+        return get_file_details_result(get_random_file_id(), file_path=file_path)
+
+    def save_concurrently(self, save, names):
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            return list(executor.map(save, names))
+
+    def assert_saved_in_folders(self, upload_mock, storage, names):
+        uploaded = {call[1]['file_name']: call[1]['options'].folder for call in upload_mock.call_args_list}
+        self.assertEqual(len(uploaded), len(names))
+        for name in names:
+            file_name, options = storage._prepare_upload(name)
+            self.assertEqual(uploaded[file_name], options.folder)
+            self.assertTrue(options.folder.endswith('/' + name.rsplit('/', 1)[0]))
+
+    def test_concurrent_saves_land_in_their_folders(self, upload_mock):
+        upload_mock.side_effect = self.upload
+        storage = MediaImagekitStorage()
+        names = ['upload-to-{}/file-{}.txt'.format(index % 8, index) for index in range(SAVES_COUNT)]
+        options = dict(app_settings.UPLOAD_OPTIONS)
+        saved = self.save_concurrently(lambda name: storage.save(name, ContentFile(name.encode())), names)
+        self.assert_saved_in_folders(upload_mock, storage, names)
+        self.assertEqual(len(set(saved)), SAVES_COUNT)
+        self.assertEqual(app_settings.UPLOAD_OPTIONS, options)
+
+    def test_storages_with_different_root_folders_save_concurrently(self, upload_mock):
+        upload_mock.side_effect = self.upload
+        storages = [MediaImagekitStorage(root_folder='root-{}'.format(index)) for index in range(4)]
+        default_root_folder = MediaImagekitStorage()._get_root_folder()
+
+        def save(index):
+            storage = storages[index % len(storages)]
+            return storage.save('folder/file-{}.txt'.format(index), ContentFile(b'content'))
+
+        self.save_concurrently(save, range(SAVES_COUNT))
+        for call in upload_mock.call_args_list:
+            index = int(call[1]['file_name'].rsplit('-', 1)[1].split('.')[0])
+            self.assertTrue(call[1]['options'].folder.startswith('root-{}/'.format(index % len(storages))))
+        self.assertEqual(MediaImagekitStorage()._get_root_folder(), default_root_folder)
+
+    def test_static_uploads_without_options_land_in_their_folders(self, upload_mock):
+        upload_mock.side_effect = self.upload
+        storage = StaticImagekitStorage()
+        names = ['folder-{}/file-{}.txt'.format(index % 8, index) for index in range(SAVES_COUNT)]
+        self.save_concurrently(lambda name: storage._upload(ContentFile(b'content'), name), names)
+        for call in upload_mock.call_args_list:
+            folder = call[1]['file_name'].rsplit('/', 1)[0]
+            self.assertEqual(call[1]['options'].folder, storage._get_upload_path(call[1]['file_name']))
+            self.assertTrue(call[1]['options'].folder.endswith(folder))
+        self.assertEqual(storage.UPLOAD_OPTIONS, app_settings.UPLOAD_OPTIONS)
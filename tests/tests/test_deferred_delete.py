@@ -0,0 +1,71 @@
+from django.db import transaction
+from django.test import TestCase
+from imagekitio.exceptions.InternalServerException import InternalServerException
+
+from imagekitio_storage import app_settings
+from imagekitio_storage.delete import DeferredDeleteQueue
+from tests.models import TestFileAndImageFieldModel, TestFileFieldModel
+from tests.tests.test_helpers import import_mock, get_bulk_delete_result, get_random_file_id
+
+mock = import_mock()
+
+
+@mock.patch.object(app_settings, 'DEFERRED_DELETE', True)
+@mock.patch('imagekitio_storage.storage.ik_api')
+class DeferredDeleteTests(TestCase):
+    def setUp(self):
+        self.queue = DeferredDeleteQueue(linger=0.2)
+        patcher = mock.patch('imagekitio_storage.delete.delete_queue', self.queue)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.file_ids = [get_random_file_id() for _ in range(4)]
+        self.image_ids = [get_random_file_id() for _ in range(3)]
+        for file_id, image_id in zip(self.file_ids, self.image_ids):
+            TestFileAndImageFieldModel.objects.create(name='model', file=file_id, image=image_id)
+        TestFileFieldModel.objects.create(name='model', file=self.file_ids[3])
+
+    def test_files_are_deleted_with_bulk_request_after_commit(self, ik_api_mock):
+        ik_api_mock.bulk_file_delete.side_effect = get_bulk_delete_result
+        with self.captureOnCommitCallbacks() as callbacks:
+            TestFileAndImageFieldModel.objects.all().delete()
+            TestFileFieldModel.objects.all().delete()
+        self.assertFalse(ik_api_mock.bulk_file_delete.called)
+        for callback in callbacks:
+            callback()
+        self.assertTrue(self.queue.join(timeout=5))
+        file_ids = ik_api_mock.bulk_file_delete.call_args[1]['file_ids']
+        ik_api_mock.bulk_file_delete.assert_called_once()
+        self.assertEqual(sorted(file_ids), sorted(self.file_ids + self.image_ids))
+        self.assertFalse(ik_api_mock.delete_file.called)
+
+    def test_files_are_kept_when_transaction_is_rolled_back(self, ik_api_mock):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    TestFileFieldModel.objects.all().delete()
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertTrue(self.queue.join(timeout=5))
+        self.assertFalse(ik_api_mock.bulk_file_delete.called)
+
+    @mock.patch('imagekitio_storage.delete.time.sleep')
+    def test_transient_failures_are_retried(self, sleep_mock, ik_api_mock):
+        ik_api_mock.bulk_file_delete.side_effect = [InternalServerException('', '', None),
+                                                    get_bulk_delete_result(self.file_ids[3:])]
+        with mock.patch('imagekitio_storage.delete.RETRIED_EXCEPTIONS', (InternalServerException,)):
+            with self.assertLogs('imagekit-storage', level='WARNING'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    TestFileFieldModel.objects.all().delete()
+                self.assertTrue(self.queue.join(timeout=5))
+        self.assertEqual(ik_api_mock.bulk_file_delete.call_count, 2)
+        sleep_mock.assert_called_once_with(app_settings.DEFERRED_DELETE_RETRY_DELAY)
+
+    def test_failed_files_are_logged(self, ik_api_mock):
+        ik_api_mock.bulk_file_delete.side_effect = ValueError('Deletion failed')
+        with self.assertLogs('imagekit-storage', level='ERROR') as logs:
+            with self.captureOnCommitCallbacks(execute=True):
+                TestFileFieldModel.objects.all().delete()
+            self.assertTrue(self.queue.join(timeout=5))
+        self.assertIn(self.file_ids[3], logs.output[0])
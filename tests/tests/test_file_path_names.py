@@ -0,0 +1,47 @@
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+
+from imagekitio_storage import app_settings
+from imagekitio_storage.cache import metadata_cache
+from imagekitio_storage.storage import MediaImagekitStorage
+from tests.tests.test_helpers import get_random_file_id, import_mock, get_file_details_result, get_list_files_result
+
+mock = import_mock()
+
+
+@mock.patch.object(app_settings, 'USE_FILE_PATH_AS_NAME', True)
+class FilePathNamesTests(SimpleTestCase):
+    def setUp(self):
+        metadata_cache.clear()
+        cache.clear()
+        self.storage = MediaImagekitStorage()
+        self.file_id = get_random_file_id()
+        self.file_path = '/root/media/images/{}'.format(self.file_id)
+
+    @mock.patch.object(MediaImagekitStorage, '_upload')
+    def test_save_returns_file_path(self, upload_mock):
+        upload_mock.return_value = get_file_details_result(self.file_id, file_path=self.file_path)
+        name = self.storage.save('images/name', ContentFile(b'content'))
+        self.assertEqual(name, self.file_path.lstrip('/'))
+
+    @mock.patch('imagekitio_storage.storage.ik_api.get_file_details')
+    def test_url_is_built_without_api_call(self, get_file_details_mock):
+        url = self.storage.url(self.file_path.lstrip('/'))
+        self.assertEqual(url, '{}{}'.format(app_settings.USER_CREDENTIALS['url_endpoint'], self.file_path))
+        self.assertFalse(get_file_details_mock.called)
+
+    @mock.patch('imagekitio_storage.storage.ik_api.get_file_details')
+    def test_url_of_legacy_file_id_is_still_resolved(self, get_file_details_mock):
+        get_file_details_mock.return_value = get_file_details_result(self.file_id, file_path=self.file_path)
+        url = self.storage.url(self.file_id)
+        self.assertTrue(url.endswith(self.file_path))
+        get_file_details_mock.assert_called_once_with(file_id=self.file_id)
+
+    @mock.patch('imagekitio_storage.storage.ik_api.delete_file')
+    @mock.patch('imagekitio_storage.helpers.ik_api.list_files')
+    def test_delete_resolves_file_id_by_path(self, list_files_mock, delete_file_mock):
+        list_files_mock.return_value = get_list_files_result(
+            [get_file_details_result(self.file_id, file_path=self.file_path)])
+        self.storage.delete(self.file_path.lstrip('/'))
+        delete_file_mock.assert_called_once_with(file_id=self.file_id)
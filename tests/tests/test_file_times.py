@@ -0,0 +1,83 @@
+import datetime
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, override_settings
+from imagekitio.exceptions.BadRequestException import BadRequestException
+
+from imagekitio_storage.cache import metadata_cache
+from imagekitio_storage.management.commands.collectstatic import Command
+from imagekitio_storage.storage import MediaImagekitStorage
+from tests.tests.test_helpers import get_random_file_id, get_random_name, import_mock, get_file_details_result
+
+mock = import_mock()
+
+CREATED_AT = '2022-12-01T10:00:00.000Z'
+UPDATED_AT = '2022-12-02T11:30:00.000Z'
+
+
+@mock.patch('imagekitio_storage.storage.ik_api')
+class FileTimesTests(SimpleTestCase):
+    def setUp(self):
+        metadata_cache.clear()
+        cache.clear()
+        self.storage = MediaImagekitStorage()
+        self.file_id = get_random_file_id()
+        patcher = mock.patch.object(MediaImagekitStorage, '_upload')
+        self.upload_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_modified_and_created_times(self, ik_api_mock):
+        ik_api_mock.get_file_details.return_value = get_file_details_result(
+            self.file_id, created_at=CREATED_AT, updated_at=UPDATED_AT)
+        self.assertEqual(self.storage.get_created_time(self.file_id),
+                         datetime.datetime(2022, 12, 1, 10, 0, tzinfo=datetime.timezone.utc))
+        self.assertEqual(self.storage.get_modified_time(self.file_id),
+                         datetime.datetime(2022, 12, 2, 11, 30, tzinfo=datetime.timezone.utc))
+        self.assertEqual(self.storage.get_accessed_time(self.file_id),
+                         self.storage.get_modified_time(self.file_id))
+        self.assertEqual(ik_api_mock.get_file_details.call_count, 1)
+
+    @override_settings(USE_TZ=False)
+    def test_naive_time_without_timezone_support(self, ik_api_mock):
+        ik_api_mock.get_file_details.return_value = get_file_details_result(self.file_id, updated_at=UPDATED_AT)
+        self.assertIsNone(self.storage.get_modified_time(self.file_id).tzinfo)
+
+    def test_metadata_cached_on_save_is_refreshed_once(self, ik_api_mock):
+        self.upload_mock.return_value = get_file_details_result(self.file_id)
+        ik_api_mock.get_file_details.return_value = get_file_details_result(self.file_id, updated_at=UPDATED_AT)
+        name = self.storage.save(get_random_name(), ContentFile(b'content'))
+        self.storage.get_modified_time(name)
+        self.storage.get_modified_time(name)
+        ik_api_mock.get_file_details.assert_called_once_with(file_id=self.file_id)
+
+    def test_missing_file_raises_error(self, ik_api_mock):
+        ik_api_mock.get_file_details.side_effect = BadRequestException('', '', None)
+        with self.assertRaises(FileNotFoundError):
+            self.storage.get_modified_time(self.file_id)
+
+
+class CollectStaticDeleteFileTests(SimpleTestCase):
+    def setUp(self):
+        self.command = Command()
+        self.command.unmodified_files = []
+        self.command.verbosity = 0
+        self.command.verify_remote = True
+        self.command.storage = mock.Mock()
+        self.source_storage = mock.Mock()
+        self.time = datetime.datetime(2022, 12, 2, 11, 30, tzinfo=datetime.timezone.utc)
+
+    def test_unmodified_file_is_skipped(self):
+        self.command.storage.get_modified_time.return_value = self.time
+        self.source_storage.get_modified_time.return_value = self.time - datetime.timedelta(days=1)
+        self.assertFalse(self.command.delete_file('path', 'path', self.source_storage))
+        self.assertEqual(self.command.unmodified_files, ['path'])
+
+    def test_modified_file_is_copied(self):
+        self.command.storage.get_modified_time.return_value = self.time
+        self.source_storage.get_modified_time.return_value = self.time + datetime.timedelta(days=1)
+        self.assertTrue(self.command.delete_file('path', 'path', self.source_storage))
+
+    def test_not_uploaded_file_is_copied(self):
+        self.command.storage.get_modified_time.side_effect = FileNotFoundError
+        self.assertTrue(self.command.delete_file('path', 'path', self.source_storage))
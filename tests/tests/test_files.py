@@ -0,0 +1,93 @@
+import io
+
+from django.test import SimpleTestCase
+
+from imagekitio_storage import app_settings
+from imagekitio_storage.files import RemoteFile
+from imagekitio_storage.storage import MediaImagekitStorage
+from tests.tests.test_helpers import import_mock
+
+mock = import_mock()
+
+URL = 'https://ik.imagekit.io/xxx/file'
+
+
+class FakeRemoteServer(object):
+    """
+    Serves content like a CDN honouring Range headers, counting bytes read by clients.
+    """
+
+    def __init__(self, content):
+        self.content = content
+        self.bytes_read = 0
+        self.requests = []
+
+    def get(self, url, headers=None, stream=False):
+        headers = headers or {}
+        self.requests.append(headers)
+        start = 0
+        status_code = 200
+        if 'Range' in headers:
+            start = int(headers['Range'].split('=')[1].rstrip('-'))
+            status_code = 206
+        response = mock.Mock(status_code=status_code, headers={'content-length': str(len(self.content) - start)})
+        body = io.BytesIO(self.content[start:])
+
+        def read(size):
+            data = body.read(size)
+            self.bytes_read += len(data)
+            return data
+
+        response.raw.read.side_effect = read
+        return response
+
+
+class RemoteFileTests(SimpleTestCase):
+    def setUp(self):
+        self.content = bytes(range(256)) * 4096
+        self.server = FakeRemoteServer(self.content)
+        patcher = mock.patch('imagekitio_storage.files.get_session')
+        patcher.start().return_value.get.side_effect = self.server.get
+        self.addCleanup(patcher.stop)
+
+    def open(self):
+        return RemoteFile(URL, 'file', response=self.server.get(URL))
+
+    def test_read_returns_whole_content(self):
+        self.assertEqual(self.open().read(), self.content)
+
+    def test_partial_read_is_bounded_by_read_ahead_buffer(self):
+        file = self.open()
+        self.assertEqual(file.read(10), self.content[:10])
+        self.assertLessEqual(self.server.bytes_read, app_settings.OPEN_READ_AHEAD_SIZE)
+
+    def test_seek_uses_range_request(self):
+        file = self.open()
+        file.seek(len(self.content) - 5)
+        self.assertEqual(file.read(), self.content[-5:])
+        self.assertEqual(self.server.requests[-1]['Range'], 'bytes={}-'.format(len(self.content) - 5))
+        self.assertLessEqual(self.server.bytes_read, 5)
+
+    def test_seek_back_reopens_stream(self):
+        file = self.open()
+        file.read(10)
+        file.seek(0)
+        self.assertEqual(file.read(10), self.content[:10])
+
+    def test_size_is_taken_from_response(self):
+        file = self.open()
+        self.assertEqual(file.size, len(self.content))
+        file.seek(0, io.SEEK_END)
+        self.assertEqual(file.tell(), len(self.content))
+
+    def test_chunks(self):
+        self.assertEqual(b''.join(self.open().chunks(chunk_size=1000)), self.content)
+
+    def test_storage_open_returns_remote_file(self):
+        storage = MediaImagekitStorage()
+        with mock.patch('imagekitio_storage.storage.get_session') as get_session_mock, \
+                mock.patch.object(storage, '_get_url', return_value=URL):
+            get_session_mock.return_value.get.side_effect = self.server.get
+            file = storage.open('name')
+        self.assertIsInstance(file, RemoteFile)
+        self.assertEqual(file.read(3), self.content[:3])
@@ -6,6 +6,9 @@ from uuid import uuid4
 from django.core.files import File
 from django.core.management import call_command
 from django.utils import version
+from imagekitio.models.results.BulkDeleteFileResult import BulkDeleteFileResult
+from imagekitio.models.results.FileResult import FileResult
+from imagekitio.models.results.ListFileResult import ListFileResult
 
 from imagekitio_storage import app_settings
 from imagekitio_storage.storage import MediaImagekitStorage, StaticHashedImagekitStorage, HashedFilesMixin
@@ -15,6 +18,11 @@ def get_random_name():
     return str(uuid4())
 
 
+def get_random_file_id():
+    # Imagekit file ids are 24 hexadecimal characters
+    return uuid4().hex[:24]
+
+
 def set_media_tag(tag):
     MediaImagekitStorage.TAG = tag
     app_settings.MEDIA_TAG = tag
@@ -84,3 +92,50 @@ def get_postprocess_counter_of_adjustable_file():
     if version.get_complete_version() >= (1, 11):
         return 2
     return 1
+
+
+def get_file_details_result(file_id, file_path=None, size=None, created_at=None, updated_at=None, mime=None):
+    """
+    Builds Imagekit file details result the same way the SDK does for API responses.
+    """
+    file_path = file_path if file_path is not None else '/folder/{}'.format(file_id)
+    return FileResult(
+        type='file',
+        name=file_path.rsplit('/', 1)[-1],
+        file_id=file_id,
+        file_path=file_path,
+        url='https://ik.imagekit.io/xxx{}'.format(file_path),
+        size=size,
+        created_at=created_at,
+        updated_at=updated_at,
+        mime=mime,
+    )
+
+
+def get_list_files_result(resources):
+    return ListFileResult(list(resources))
+
+
+def get_bulk_delete_result(file_ids):
+    return BulkDeleteFileResult(successfully_deleted_file_ids=list(file_ids))
+
+
+def get_fake_list_files(resources):
+    """
+    Returns fake list_files listing the given file details results within their folders,
+    with folders derived from their file paths.
+    """
+    def list_files(options):
+        path = '/' + getattr(options, 'path', '/').strip('/')
+        if getattr(options, 'type', None) == 'folder':
+            names = set()
+            for resource in resources:
+                folder = resource.file_path.rsplit('/', 1)[0]
+                if folder.startswith(path.rstrip('/') + '/'):
+                    names.add(folder[len(path.rstrip('/')) + 1:].split('/')[0])
+            listed = [FileResult(type='folder', name=name) for name in sorted(names)]
+        else:
+            listed = [resource for resource in resources if resource.file_path.rsplit('/', 1)[0] == path]
+        skip = getattr(options, 'skip', 0)
+        return get_list_files_result(listed[skip:skip + getattr(options, 'limit', 1000)])
+    return list_files
@@ -0,0 +1,91 @@
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+
+from imagekitio_storage.cache import metadata_cache
+from imagekitio_storage.helpers import get_resources_index
+from imagekitio_storage.storage import StaticImagekitStorage
+from tests.tests.test_helpers import import_mock, get_fake_list_files, get_file_details_result
+
+mock = import_mock()
+
+UPDATED_AT = '2022-12-02T11:30:00.000Z'
+
+
+@mock.patch('imagekitio_storage.helpers.ik_api')
+class ResourcesIndexTests(SimpleTestCase):
+    def test_all_pages_are_listed(self, ik_api_mock):
+        file_paths = ['/folder/1', '/folder/2', '/folder/3', '/folder/sub/4', '/folder/sub/deeper/5']
+        ik_api_mock.list_files.side_effect = get_fake_list_files(
+            [get_file_details_result(file_path.rsplit('/', 1)[1], file_path=file_path) for file_path in file_paths])
+        index = get_resources_index('/folder', page_size=2)
+        self.assertEqual(sorted(index), file_paths)
+        self.assertEqual(index['/folder/3']['file_id'], '3')
+        skips = [call[1]['options'].skip for call in ik_api_mock.list_files.call_args_list
+                 if call[1]['options'].type == 'file' and call[1]['options'].path == '/folder']
+        self.assertEqual(skips, [0, 2])
+
+
+@mock.patch('imagekitio_storage.helpers.ik_api')
+class StaticInventoryTests(SimpleTestCase):
+    def setUp(self):
+        metadata_cache.clear()
+        cache.clear()
+        self.storage = StaticImagekitStorage()
+        self.storage.prefetch_inventory()
+        self.addCleanup(self.storage.clear_inventory)
+        self.style_path = self.storage._get_remote_path('css/style.css')
+        self.image_path = self.storage._get_remote_path('images/logo.png')
+
+    def set_inventory(self, ik_api_mock):
+        ik_api_mock.list_files.side_effect = get_fake_list_files([
+            get_file_details_result('style', file_path=self.style_path, size=7, updated_at=UPDATED_AT),
+            get_file_details_result('logo', file_path=self.image_path, size=10, updated_at=UPDATED_AT),
+        ])
+
+    def test_remote_path_follows_upload_folder_and_file_name(self, ik_api_mock):
+        folder = '/' + self.storage._get_upload_path('').strip('/')
+        self.assertEqual(self.style_path, '{}/css/static_css_style.css'.format(folder))
+        self.assertEqual(self.image_path, '{}/images/static_images_logo'.format(folder))
+
+    def test_lookups_are_answered_from_one_listing(self, ik_api_mock):
+        self.set_inventory(ik_api_mock)
+        self.assertTrue(self.storage.exists('css/style.css'))
+        self.assertEqual(self.storage.size('images/logo.png'), 10)
+        self.assertEqual(self.storage.get_modified_time('css/style.css').year, 2022)
+        self.assertFalse(self.storage.exists('css/missing.css'))
+        calls_count = ik_api_mock.list_files.call_count
+        self.assertFalse(self.storage.exists('images/missing.png'))
+        self.assertEqual(ik_api_mock.list_files.call_count, calls_count)
+        options = ik_api_mock.list_files.call_args_list[0][1]['options']
+        self.assertEqual(options.path, '/' + self.storage._get_upload_path('').strip('/'))
+
+    @mock.patch('imagekitio_storage.storage.get_session')
+    def test_etag_is_checked_only_for_existing_files_of_same_size(self, get_session_mock, ik_api_mock):
+        self.set_inventory(ik_api_mock)
+        self.assertFalse(self.storage._exists_with_etag('css/missing.css', ContentFile(b'content')))
+        self.assertFalse(self.storage._exists_with_etag('css/style.css', ContentFile(b'longer content')))
+        self.assertFalse(get_session_mock.called)
+
+        get_session_mock.return_value.head.return_value.status_code = 200
+        get_session_mock.return_value.head.return_value.headers = {
+            'ETAG': '"{}"'.format(self.storage.file_hash('css/style.css', ContentFile(b'content')))}
+        self.assertTrue(self.storage._exists_with_etag('css/style.css', ContentFile(b'content')))
+
+    @mock.patch.object(StaticImagekitStorage, '_upload')
+    def test_uploaded_file_is_added_to_inventory(self, upload_mock, ik_api_mock):
+        ik_api_mock.list_files.side_effect = get_fake_list_files([])
+        self.assertFalse(self.storage.exists('css/style.css'))
+        calls_count = ik_api_mock.list_files.call_count
+        upload_mock.return_value = get_file_details_result('style', file_path=self.style_path, size=7)
+        with mock.patch.object(self.storage, 'sync_state'):
+            self.storage.save('css/style.css', ContentFile(b'content'))
+        self.assertTrue(self.storage.exists('css/style.css'))
+        self.assertEqual(ik_api_mock.list_files.call_count, calls_count)
+
+    def test_file_is_searched_by_remote_path_without_inventory(self, ik_api_mock):
+        self.storage.clear_inventory()
+        self.set_inventory(ik_api_mock)
+        self.assertTrue(self.storage.exists('css/style.css'))
+        self.assertEqual(ik_api_mock.list_files.call_args[1]['options'].search_query,
+                         'name = "static_css_style.css"')
@@ -0,0 +1,77 @@
+import threading
+
+from django.test import SimpleTestCase
+
+from imagekitio_storage.helpers import get_resources, get_resources_query, iter_list_files, iter_resources
+from imagekitio.models.ListAndSearchFileRequestOptions import ListAndSearchFileRequestOptions
+from tests.tests.test_helpers import import_mock, get_file_details_result, get_list_files_result
+
+mock = import_mock()
+
+
+def list_files(count):
+    """
+    Returns fake list_files listing count files.
+    """
+    def fake_list_files(options):
+        files = [get_file_details_result(str(i)) for i in range(count)]
+        return get_list_files_result(files[options.skip:options.skip + options.limit])
+    return fake_list_files
+
+
+@mock.patch('imagekitio_storage.helpers.ik_api')
+class ListFilesPaginationTests(SimpleTestCase):
+    def get_pages(self, ik_api_mock):
+        return [(call[1]['options'].skip, call[1]['options'].limit) for call in ik_api_mock.list_files.call_args_list]
+
+    def test_all_pages_are_listed(self, ik_api_mock):
+        ik_api_mock.list_files.side_effect = list_files(5)
+        for prefetch in (False, True):
+            ik_api_mock.reset_mock()
+            options = ListAndSearchFileRequestOptions(path='/folder')
+            file_ids = [resource.file_id for resource in iter_list_files(options, page_size=2, prefetch=prefetch)]
+            self.assertEqual(file_ids, ['0', '1', '2', '3', '4'])
+            self.assertEqual(self.get_pages(ik_api_mock), [(0, 2), (2, 2), (4, 2)])
+        self.assertFalse(hasattr(options, 'skip'))
+
+    def test_full_last_page_needs_one_more_request(self, ik_api_mock):
+        ik_api_mock.list_files.side_effect = list_files(4)
+        options = ListAndSearchFileRequestOptions(path='/folder')
+        self.assertEqual(len(list(iter_list_files(options, page_size=2, prefetch=False))), 4)
+        self.assertEqual(self.get_pages(ik_api_mock), [(0, 2), (2, 2), (4, 2)])
+
+    def test_limit_and_skip_bound_listing(self, ik_api_mock):
+        ik_api_mock.list_files.side_effect = list_files(10)
+        options = ListAndSearchFileRequestOptions(path='/folder', skip=1, limit=5)
+        file_ids = [resource.file_id for resource in iter_list_files(options, page_size=2)]
+        self.assertEqual(file_ids, ['1', '2', '3', '4', '5'])
+        self.assertEqual(self.get_pages(ik_api_mock), [(1, 2), (3, 2), (5, 1)])
+
+    def test_next_page_is_prefetched(self, ik_api_mock):
+        requested = threading.Event()
+        fake_list_files = list_files(4)
+
+        def side_effect(options):
+            if options.skip:
+                requested.set()
+            return fake_list_files(options)
+
+        ik_api_mock.list_files.side_effect = side_effect
+        resources = iter_list_files(ListAndSearchFileRequestOptions(path='/folder'), page_size=2, prefetch=True)
+        next(resources)
+        self.assertTrue(requested.wait(5))
+        resources.close()
+
+    def test_files_are_yielded_lazily(self, ik_api_mock):
+        ik_api_mock.list_files.side_effect = list_files(10)
+        resources = iter_resources('/folder')
+        self.assertFalse(ik_api_mock.list_files.called)
+        next(resources)
+        self.assertEqual(ik_api_mock.list_files.call_count, 1)
+
+    def test_list_helpers_return_all_pages(self, ik_api_mock):
+        ik_api_mock.list_files.side_effect = list_files(3)
+        with mock.patch('imagekitio_storage.app_settings.LIST_FILES_PAGE_SIZE', 2):
+            self.assertEqual(len(get_resources('/folder')), 3)
+            self.assertEqual([resource['file_id'] for resource in get_resources_query(path='/folder', skip=1)],
+                             ['1', '2'])
@@ -0,0 +1,47 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from imagekitio_storage import app_settings
+from imagekitio_storage.cache import metadata_cache
+from imagekitio_storage.prefetch import prefetch_imagekit
+from tests.models import TestFileAndImageFieldModel
+from tests.serializer import TestFileAndImageFieldSerializer
+from tests.tests.test_helpers import get_random_file_id, import_mock, get_file_details_result
+
+mock = import_mock()
+
+
+@mock.patch('imagekitio_storage.storage.ik_api.get_file_details')
+class PrefetchImagekitTests(TestCase):
+    def setUp(self):
+        metadata_cache.clear()
+        cache.clear()
+        for index in range(3):
+            TestFileAndImageFieldModel.objects.create(name=str(index), file=get_random_file_id(),
+                                                      image=get_random_file_id())
+        TestFileAndImageFieldModel.objects.create(name='without files')
+
+    def test_serializer_makes_no_calls_after_prefetch(self, get_file_details_mock):
+        get_file_details_mock.side_effect = lambda file_id: get_file_details_result(file_id, size=1)
+        instances = prefetch_imagekit(TestFileAndImageFieldModel.objects.all(), fields=['file', 'image'])
+        self.assertEqual(get_file_details_mock.call_count, 6)
+        get_file_details_mock.reset_mock()
+        data = TestFileAndImageFieldSerializer(instances, many=True).data
+        self.assertFalse(get_file_details_mock.called)
+        self.assertTrue(data[0]['image'].endswith(instances[0].image.name))
+        self.assertIsNone(data[3]['image'])
+
+    def test_metadata_is_attached_to_field_files(self, get_file_details_mock):
+        get_file_details_mock.side_effect = lambda file_id: get_file_details_result(file_id, size=1)
+        instance = prefetch_imagekit(TestFileAndImageFieldModel.objects.filter(name='0'), fields=['file'])[0]
+        self.assertEqual(instance.file.imagekit_metadata['file_id'], instance.file.name)
+
+    def test_attached_metadata_is_used_without_cache(self, get_file_details_mock):
+        get_file_details_mock.side_effect = lambda file_id: get_file_details_result(file_id, size=1)
+        with mock.patch.object(app_settings, 'METADATA_CACHE_TIMEOUT', 0):
+            instances = prefetch_imagekit(TestFileAndImageFieldModel.objects.all(), fields=['file', 'image'])
+            get_file_details_mock.reset_mock()
+            data = TestFileAndImageFieldSerializer(instances, many=True).data
+            self.assertEqual(instances[0].file.size, 1)
+        self.assertFalse(get_file_details_mock.called)
+        self.assertTrue(data[0]['file'].endswith(instances[0].file.name))
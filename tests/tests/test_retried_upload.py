@@ -0,0 +1,121 @@
+import shutil
+import tempfile
+
+import requests
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+from imagekitio.exceptions.BadRequestException import BadRequestException
+
+from imagekitio_storage import app_settings
+from imagekitio_storage.cache import metadata_cache
+from imagekitio_storage.storage import MediaImagekitStorage, VideoMediaImagekitStorage
+from imagekitio_storage.uploads import UploadCheckpoint, get_content_hash
+from tests.tests.test_helpers import get_random_file_id, import_mock, get_file_details_result, get_list_files_result
+
+mock = import_mock()
+
+CONTENT = b'video content'
+
+
+@mock.patch('imagekitio_storage.uploads.time.sleep')
+@mock.patch('imagekitio_storage.uploads.ik_api')
+class RetriedUploadTests(SimpleTestCase):
+    def setUp(self):
+        metadata_cache.clear()
+        cache.clear()
+        self.checkpoint_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.checkpoint_dir)
+        for name, value in (('RETRIED_UPLOAD_THRESHOLD', 1), ('RETRIED_UPLOAD_MAX_RETRIES', 2),
+                            ('RETRIED_UPLOAD_CHECKPOINT_DIR', self.checkpoint_dir)):
+            patcher = mock.patch.object(app_settings, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.dict(MediaImagekitStorage.UPLOAD_OPTIONS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(MediaImagekitStorage, '_upload')
+        self.upload_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.storage = VideoMediaImagekitStorage()
+        self.file_id = get_random_file_id()
+        self.folder = '/' + self.storage._get_upload_path('video.mp4').strip('/')
+        file_path = '{}/video.mp4'.format(self.folder)
+        self.result = get_file_details_result(self.file_id, file_path=file_path, size=len(CONTENT))
+        self.checkpoint = UploadCheckpoint(get_content_hash(ContentFile(CONTENT)), self.checkpoint_dir)
+
+    def test_small_video_is_uploaded_without_checkpoint(self, ik_api_mock, sleep_mock):
+        self.upload_mock.return_value = self.result
+        with mock.patch.object(app_settings, 'RETRIED_UPLOAD_THRESHOLD', len(CONTENT) + 1), \
+                mock.patch('imagekitio_storage.storage.RetriedUpload') as retried_upload_mock:
+            self.assertEqual(self.storage.save('video.mp4', ContentFile(CONTENT)), self.file_id)
+        self.assertFalse(retried_upload_mock.called)
+
+    def test_transient_failure_is_retried(self, ik_api_mock, sleep_mock):
+        self.upload_mock.side_effect = [requests.ConnectionError(), self.result]
+        ik_api_mock.list_files.return_value = get_list_files_result([])
+        self.assertEqual(self.storage.save('video.mp4', ContentFile(CONTENT)), self.file_id)
+        self.assertEqual(self.upload_mock.call_count, 2)
+        sleep_mock.assert_called_once_with(1)
+        self.assertIsNone(self.checkpoint.load())
+
+    def test_file_stored_by_failed_attempt_is_not_sent_again(self, ik_api_mock, sleep_mock):
+        self.upload_mock.side_effect = requests.ReadTimeout()
+        ik_api_mock.list_files.return_value = get_list_files_result([self.result])
+        self.assertEqual(self.storage.save('video.mp4', ContentFile(CONTENT)), self.file_id)
+        self.assertEqual(self.upload_mock.call_count, 1)
+        search_query = ik_api_mock.list_files.call_args[1]['options'].search_query
+        self.assertTrue(search_query.startswith('size = {} AND updatedAt >= '.format(len(CONTENT))))
+
+    def test_error_is_raised_after_max_retries(self, ik_api_mock, sleep_mock):
+        self.upload_mock.side_effect = requests.ConnectionError()
+        ik_api_mock.list_files.return_value = get_list_files_result([])
+        with self.assertRaises(requests.ConnectionError):
+            self.storage.save('video.mp4', ContentFile(CONTENT))
+        self.assertEqual(self.upload_mock.call_count, 3)
+        self.assertEqual([call[0][0] for call in sleep_mock.call_args_list], [1, 2])
+        self.assertIsNotNone(self.checkpoint.load())
+
+    def test_client_error_is_not_retried(self, ik_api_mock, sleep_mock):
+        self.upload_mock.side_effect = BadRequestException('', '', None)
+        with self.assertRaises(BadRequestException):
+            self.storage.save('video.mp4', ContentFile(CONTENT))
+        self.assertEqual(self.upload_mock.call_count, 1)
+
+    def test_interrupted_upload_is_resumed_from_checkpoint(self, ik_api_mock, sleep_mock):
+        started_at = '2022-12-01T10:00:00.000Z'
+        self.checkpoint.save({'folder': self.folder, 'file_name': 'video.mp4', 'size': len(CONTENT),
+                              'started_at': started_at})
+        ik_api_mock.list_files.return_value = get_list_files_result([self.result])
+        self.assertEqual(self.storage.save('video.mp4', ContentFile(CONTENT)), self.file_id)
+        self.assertFalse(self.upload_mock.called)
+        self.assertIn(started_at, ik_api_mock.list_files.call_args[1]['options'].search_query)
+        self.assertIsNone(self.checkpoint.load())
+
+    def test_file_with_similar_name_is_not_taken_for_resumed_upload(self, ik_api_mock, sleep_mock):
+        self.checkpoint.save({'folder': self.folder, 'file_name': 'video.mp4', 'size': len(CONTENT),
+                              'started_at': '2022-12-01T10:00:00.000Z'})
+        other = get_file_details_result(get_random_file_id(), file_path='{}/video_final.mp4'.format(self.folder),
+                                        size=len(CONTENT))
+        ik_api_mock.list_files.return_value = get_list_files_result([other])
+        self.upload_mock.return_value = self.result
+        self.assertEqual(self.storage.save('video.mp4', ContentFile(CONTENT)), self.file_id)
+        self.assertEqual(self.upload_mock.call_count, 1)
+
+    def test_file_with_unique_name_is_taken_for_resumed_upload(self, ik_api_mock, sleep_mock):
+        self.checkpoint.save({'folder': self.folder, 'file_name': 'video.mp4', 'size': len(CONTENT),
+                              'started_at': '2022-12-01T10:00:00.000Z'})
+        unique = get_file_details_result(self.file_id, file_path='{}/video_a1B2c3D4e.mp4'.format(self.folder),
+                                         size=len(CONTENT))
+        ik_api_mock.list_files.return_value = get_list_files_result([unique])
+        with mock.patch.dict(MediaImagekitStorage.UPLOAD_OPTIONS, use_unique_file_name=True):
+            self.assertEqual(self.storage.save('video.mp4', ContentFile(CONTENT)), self.file_id)
+        self.assertFalse(self.upload_mock.called)
+
+    def test_checkpoint_of_other_destination_is_ignored(self, ik_api_mock, sleep_mock):
+        self.checkpoint.save({'folder': '/other', 'file_name': 'video.mp4', 'size': len(CONTENT),
+                              'started_at': '2022-12-01T10:00:00.000Z'})
+        self.upload_mock.return_value = self.result
+        self.assertEqual(self.storage.save('video.mp4', ContentFile(CONTENT)), self.file_id)
+        self.assertEqual(self.upload_mock.call_count, 1)
+        self.assertFalse(ik_api_mock.list_files.called)
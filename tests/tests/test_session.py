@@ -0,0 +1,60 @@
+import os
+
+from django.test import SimpleTestCase
+from requests.exceptions import HTTPError
+
+from imagekitio_storage import app_settings, ik_api, session
+from imagekitio_storage.session import get_session, reset_session, ImagekitSession
+from imagekitio_storage.storage import MediaImagekitStorage
+from tests.tests.test_helpers import import_mock
+
+mock = import_mock()
+
+
+class SessionTests(SimpleTestCase):
+    def setUp(self):
+        reset_session()
+        self.addCleanup(reset_session)
+
+    def test_session_is_shared(self):
+        self.assertIs(get_session(), get_session())
+
+    def test_pool_size_is_configurable(self):
+        with mock.patch.object(app_settings, 'HTTP_POOL_SIZE', 3):
+            adapter = get_session().get_adapter('https://api.imagekit.io')
+        self.assertEqual(adapter._pool_maxsize, 3)
+
+    def test_session_is_recreated_in_another_process(self):
+        first_session = get_session()
+        with mock.patch.object(os, 'getpid', return_value=os.getpid() + 1):
+            self.assertIsNot(get_session(), first_session)
+
+    @mock.patch('requests.Session.request')
+    def test_default_timeouts_are_applied(self, request_mock):
+        ImagekitSession().request('GET', 'https://ik.imagekit.io')
+        self.assertEqual(request_mock.call_args[1]['timeout'],
+                         (app_settings.HTTP_CONNECT_TIMEOUT, app_settings.HTTP_READ_TIMEOUT))
+
+    def test_imagekit_sdk_uses_shared_session(self):
+        self.assertIs(ik_api.ik_request.request, session.request)
+        with mock.patch.object(ImagekitSession, 'request') as request_mock:
+            ik_api.ik_request.request('GET', 'https://api.imagekit.io/v1/files', headers={})
+        request_mock.assert_called_once_with(method='GET', url='https://api.imagekit.io/v1/files', params=None,
+                                             files=None, data=None, headers={})
+
+
+@mock.patch.object(MediaImagekitStorage, '_get_url', return_value='https://ik.imagekit.io/xxx/name')
+@mock.patch('imagekitio_storage.storage.get_session')
+class StorageSessionTests(SimpleTestCase):
+    def test_file_is_opened_with_shared_session(self, get_session_mock, get_url_mock):
+        response = get_session_mock.return_value.get.return_value
+        response.status_code = 200
+        MediaImagekitStorage().open('name')
+        self.assertEqual(get_session_mock.return_value.get.call_args[0], ('https://ik.imagekit.io/xxx/name',))
+
+    def test_opening_when_imagekit_fails_raises_error(self, get_session_mock, get_url_mock):
+        response = get_session_mock.return_value.get.return_value
+        response.status_code = 500
+        response.raise_for_status.side_effect = HTTPError
+        with self.assertRaises(IOError):
+            MediaImagekitStorage().open('name')
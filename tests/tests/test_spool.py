@@ -0,0 +1,213 @@
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase
+
+from imagekitio_storage import app_settings
+from imagekitio_storage.cache import metadata_cache
+from imagekitio_storage.helpers import get_resource_metadata
+from imagekitio_storage.spool import UploadQueue, UploadSpool
+from imagekitio_storage.storage import MediaImagekitStorage
+from tests.tests.test_helpers import (execute_command, import_mock, get_bulk_delete_result, get_file_details_result,
+                                      get_list_files_result)
+
+mock = import_mock()
+
+
+class SpoolTestsMixin(object):
+    def setUp(self):
+        super(SpoolTestsMixin, self).setUp()
+        metadata_cache.clear()
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.queue = UploadQueue(spool=UploadSpool(directory), max_workers=2)
+        for patcher in (mock.patch.object(app_settings, 'ASYNC_UPLOAD', True),
+                        mock.patch('imagekitio_storage.storage.upload_queue', self.queue),
+                        mock.patch('imagekitio_storage.management.commands.upload_spooled_files.upload_queue',
+                                   self.queue),
+                        mock.patch.object(MediaImagekitStorage, '_upload', side_effect=self.upload)):
+            self.upload_mock = patcher.start()
+            self.addCleanup(patcher.stop)
+        self.storage = MediaImagekitStorage()
+        self.uploaded = []
+
+    def upload(self, file, file_name, options):
+        content = file.read()
+        file_path = re.sub('/+', '/', '/{}/{}'.format(options.folder, file_name.replace('/', '_')))
+        self.uploaded.append((file_name, options, content))
+        return get_file_details_result('id-{}'.format(len(self.uploaded)), file_path=file_path, size=len(content))
+
+
+class AsyncUploadTests(SpoolTestsMixin, SimpleTestCase):
+    def test_save_returns_final_path_before_upload(self):
+        started = threading.Event()
+        finish = threading.Event()
+        upload = self.upload
+
+        def blocked_upload(**kwargs):
+            started.set()
+            finish.wait(5)
+            return upload(**kwargs)
+
+        self.upload_mock.side_effect = blocked_upload
+        name = self.storage.save('folder/file.txt', ContentFile(b'content'))
+        self.assertEqual(name, self.storage._get_remote_path('folder/file.txt').lstrip('/'))
+        self.assertTrue(started.wait(5))
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(self.storage.size(name), 7)
+        with self.storage.open(name) as file:
+            self.assertEqual(file.read(), b'content')
+        self.assertTrue(self.storage.url(name).endswith('/' + name))
+        self.assertIsNotNone(self.storage.get_created_time(name))
+
+        finish.set()
+        self.assertTrue(self.queue.join(timeout=5))
+        self.assertEqual(self.queue.spool.keys(), [])
+        file_name, options, content = self.uploaded[0]
+        self.assertFalse(options.use_unique_file_name)
+        self.assertEqual(content, b'content')
+        self.assertEqual(metadata_cache.get(name)['file_id'], 'id-1')
+
+    def test_spooled_file_is_served_from_spool_url(self):
+        finish = threading.Event()
+        upload = self.upload
+        self.upload_mock.side_effect = lambda **kwargs: finish.wait(5) and upload(**kwargs)
+        with mock.patch.object(app_settings, 'ASYNC_UPLOAD_SPOOL_URL', '/spool/'):
+            name = self.storage.save('file.txt', ContentFile(b'content'))
+            self.assertEqual(self.storage.url(name), '/spool/{}.data'.format(self.queue.spool.get_key(name)))
+        finish.set()
+        self.assertTrue(self.queue.join(timeout=5))
+
+    def test_unique_file_names_are_made_locally(self):
+        with mock.patch.dict(self.storage.UPLOAD_OPTIONS, use_unique_file_name=True):
+            first_name = self.storage.save('file.txt', ContentFile(b'first'))
+            second_name = self.storage.save('file.txt', ContentFile(b'second'))
+        self.assertNotEqual(first_name, second_name)
+        self.assertTrue(self.queue.join(timeout=5))
+        self.assertEqual(sorted(options.use_unique_file_name for file_name, options, content in self.uploaded),
+                         [False, False])
+
+    @mock.patch('imagekitio_storage.storage.ik_api')
+    def test_delete_waits_for_running_upload(self, ik_api_mock):
+        started = threading.Event()
+        finish = threading.Event()
+        upload = self.upload
+
+        def blocked_upload(**kwargs):
+            started.set()
+            finish.wait(5)
+            return upload(**kwargs)
+
+        self.upload_mock.side_effect = blocked_upload
+        name = self.storage.save('file.txt', ContentFile(b'content'))
+        self.assertTrue(started.wait(5))
+        threading.Timer(0.2, finish.set).start()
+        self.assertTrue(self.storage.delete(name))
+        ik_api_mock.delete_file.assert_called_once_with(file_id='id-1')
+        self.assertEqual(self.queue.spool.keys(), [])
+
+    @mock.patch('imagekitio_storage.storage.ik_api')
+    def test_bulk_delete_waits_for_running_upload(self, ik_api_mock):
+        started = threading.Event()
+        finish = threading.Event()
+        upload = self.upload
+
+        def blocked_upload(**kwargs):
+            started.set()
+            finish.wait(5)
+            return upload(**kwargs)
+
+        self.upload_mock.side_effect = blocked_upload
+        ik_api_mock.bulk_file_delete.side_effect = get_bulk_delete_result
+        name = self.storage.save('file.txt', ContentFile(b'content'))
+        self.assertTrue(started.wait(5))
+        threading.Timer(0.2, finish.set).start()
+        self.assertEqual(self.storage.delete_many([name]), [name])
+        ik_api_mock.bulk_file_delete.assert_called_once_with(file_ids=['id-1'])
+        self.assertEqual(self.queue.spool.keys(), [])
+
+    @mock.patch('imagekitio_storage.helpers.ik_api')
+    @mock.patch('imagekitio_storage.storage.ik_api')
+    def test_delete_cancels_pending_upload(self, ik_api_mock, helpers_ik_api_mock):
+        helpers_ik_api_mock.list_files.return_value = get_list_files_result([])
+        with mock.patch.object(self.queue, '_submit'):
+            name = self.storage.save('file.txt', ContentFile(b'content'))
+            self.assertFalse(self.storage.delete(name))
+        self.queue.replay()
+        self.assertTrue(self.queue.join(timeout=5))
+        self.assertEqual(self.uploaded, [])
+        self.assertFalse(ik_api_mock.delete_file.called)
+        self.assertEqual(self.queue.spool.keys(), [])
+
+    def test_records_are_read_only_for_spooled_files(self):
+        name = self.storage._get_remote_path('file.txt').lstrip('/')
+        metadata_cache.set(name, get_resource_metadata(get_file_details_result('id', file_path='/' + name)))
+        with mock.patch.object(self.queue.spool, 'load') as load_mock:
+            self.assertTrue(self.storage.exists(name))
+            with mock.patch.object(app_settings, 'ASYNC_UPLOAD', False), \
+                    mock.patch.object(self.queue.spool, 'contains') as contains_mock:
+                self.assertTrue(self.storage.exists(name))
+        self.assertFalse(load_mock.called)
+        self.assertFalse(contains_mock.called)
+
+    @mock.patch('imagekitio_storage.spool.time.sleep')
+    def test_failed_upload_is_kept_in_spool(self, sleep_mock):
+        self.upload_mock.side_effect = ValueError('Upload failed')
+        with self.assertLogs('imagekit-storage', level='ERROR'):
+            name = self.storage.save('file.txt', ContentFile(b'content'))
+            self.assertTrue(self.queue.join(timeout=5))
+        self.assertTrue(self.storage.exists(name))
+        key = self.queue.spool.get_key(name)
+        self.assertEqual(self.queue.spool.keys(), [key])
+        self.assertTrue(self.queue.spool.claim(key))
+
+
+class SpoolReplayTests(SpoolTestsMixin, SimpleTestCase):
+    def spool(self, name, content):
+        file_name, options = self.storage._prepare_upload(name)
+        stored_name = self.storage._get_remote_path(name).lstrip('/')
+        return self.queue.spool.add(stored_name, ContentFile(content), file_name, options, self.storage)
+
+    def test_files_left_by_stopped_process_are_uploaded(self):
+        key = self.spool('left.txt', b'left')
+        # claimed by a process which is gone
+        process = subprocess.Popen([sys.executable, '-c', ''])
+        process.wait()
+        with open(os.path.join(self.queue.spool.directory, key + '.lock'), 'w') as lock:
+            lock.write(str(process.pid))
+        self.storage.save('new.txt', ContentFile(b'new'))
+        self.assertTrue(self.queue.join(timeout=5))
+        self.assertEqual(sorted(content for file_name, options, content in self.uploaded), [b'left', b'new'])
+        self.assertEqual(self.queue.spool.keys(), [])
+
+    def test_files_claimed_by_running_process_are_skipped(self):
+        key = self.spool('claimed.txt', b'claimed')
+        with open(os.path.join(self.queue.spool.directory, key + '.lock'), 'w') as lock:
+            lock.write(str(os.getppid()))
+        self.queue.replay()
+        self.assertTrue(self.queue.join(timeout=5))
+        self.assertEqual(self.uploaded, [])
+        self.assertEqual(self.queue.spool.keys(), [key])
+
+    def test_command_uploads_spooled_files(self):
+        self.spool('first.txt', b'first')
+        self.spool('second.txt', b'second')
+        output = execute_command('upload_spooled_files')
+        self.assertIn('2 spooled files uploaded, 0 failed.', output)
+        self.assertEqual(self.queue.spool.keys(), [])
+
+    def test_command_reports_failed_uploads(self):
+        self.spool('first.txt', b'first')
+        self.upload_mock.side_effect = ValueError('Upload failed')
+        with self.assertLogs('imagekit-storage', level='ERROR'):
+            with self.assertRaises(CommandError):
+                execute_command('upload_spooled_files')
@@ -0,0 +1,117 @@
+from django.template import Context, Template
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from imagekitio_storage.srcset import clear_srcset_cache, get_srcset, parse_widths
+from imagekitio_storage.storage import MediaImagekitStorage
+from imagekitio_storage.templatetags.imagekit_static import clear_static_url_cache
+from tests.tests.test_helpers import import_mock
+
+mock = import_mock()
+
+URL = 'https://ik.imagekit.io/xxx/images/hero.jpg'
+
+
+def fake_url(options):
+    url = options.get('src') or 'https://ik.imagekit.io/xxx/' + options['path']
+    transformation = ','.join('{}-{}'.format(key, value) for key, value in options['transformation'][0].items())
+    return '{}?tr={}'.format(url, transformation) if transformation else url
+
+
+class ParseWidthsTests(SimpleTestCase):
+    def test_widths_are_parsed(self):
+        self.assertEqual(parse_widths('640, 320 960'), (320, 640, 960))
+        self.assertEqual(parse_widths([640, 320, 640]), (320, 640))
+
+    @mock.patch('imagekitio_storage.srcset.app_settings.SRCSET_WIDTHS', [480, 240])
+    def test_default_widths_are_used(self):
+        self.assertEqual(parse_widths(), (240, 480))
+
+    def test_invalid_widths_are_rejected(self):
+        for widths in ('320, wide', [], [0, 320]):
+            with self.assertRaises(ValueError):
+                parse_widths(widths)
+
+
+@mock.patch('imagekitio_storage.srcset.build_url', side_effect=fake_url)
+class SrcsetTests(SimpleTestCase):
+    def setUp(self):
+        clear_srcset_cache()
+        self.addCleanup(clear_srcset_cache)
+
+    def test_srcset_lists_variants(self, url_mock):
+        self.assertEqual(get_srcset(URL, [320, 640], {'format': 'webp'}),
+                         '{0}?tr=format-webp,width-320 320w, {0}?tr=format-webp,width-640 640w'.format(URL))
+
+    def test_srcset_is_memoized(self, url_mock):
+        for _ in range(10):
+            get_srcset(URL, '320,640,960', {'format': 'webp'})
+        self.assertEqual(url_mock.call_count, 3)
+        get_srcset(URL, '320,640,960', {'format': 'avif'})
+        self.assertEqual(url_mock.call_count, 6)
+
+    def test_unhashable_options_are_not_memoized(self, url_mock):
+        get_srcset(URL, [320], {'overlay': ['a']})
+        get_srcset(URL, [320], {'overlay': ['a']})
+        self.assertEqual(url_mock.call_count, 2)
+
+    def test_storage_resolves_file_url_once(self, url_mock):
+        storage = MediaImagekitStorage()
+        with mock.patch.object(MediaImagekitStorage, '_get_metadata', return_value={'url': URL}) as get_metadata_mock:
+            srcset = storage.srcset('images/hero.jpg', widths=[320, 640, 960])
+        self.assertEqual(get_metadata_mock.call_count, 1)
+        self.assertEqual(srcset.count(URL), 3)
+        self.assertFalse(url_mock.call_args[0][0]['signed'])
+
+
+@mock.patch('imagekitio_storage.srcset.build_url', side_effect=fake_url)
+class SrcsetTagTests(SimpleTestCase):
+    def setUp(self):
+        clear_srcset_cache()
+        clear_static_url_cache()
+        self.addCleanup(clear_srcset_cache)
+        self.addCleanup(clear_static_url_cache)
+
+    def render(self, source, **context):
+        return Template('{% load imagekit_static %}' + source).render(Context(context))
+
+    @override_settings(STATICFILES_STORAGE='imagekitio_storage.storage.StaticImagekitStorage')
+    @mock.patch('imagekitio_storage.storage.StaticImagekitStorage.stored_name', return_value='images/hero.jpg')
+    @mock.patch('imagekitio_storage.templatetags.imagekit_static.build_url', side_effect=fake_url)
+    def test_static_srcset_is_rendered(self, static_url_mock, stored_name_mock, url_mock):
+        source = "{% imagekit_srcset 'images/hero.jpg' widths='320 640' sizes='(max-width: 640px) 100vw' %}"
+        outputs = {self.render(source) for _ in range(5)}
+        self.assertEqual(outputs, {'srcset="{0}?tr=width-320 320w, {0}?tr=width-640 640w" '
+                                   'sizes="(max-width: 640px) 100vw"'.format(URL)})
+        self.assertEqual(stored_name_mock.call_count, 1)
+        self.assertEqual(static_url_mock.call_count, 1)
+        self.assertEqual(url_mock.call_count, 2)
+
+    def test_storage_file_srcset_is_rendered(self, url_mock):
+        image = mock.Mock()
+        image.name = 'images/hero.jpg'
+        image.storage.srcset.return_value = URL + ' 320w'
+        output = self.render("{% imagekit_srcset image widths='320' format='webp' as srcset %}<img {{ srcset }}>",
+                             image=image)
+        self.assertEqual(output, '<img srcset="{} 320w">'.format(URL))
+        image.storage.srcset.assert_called_once_with('images/hero.jpg', '320', format='webp')
+
+    @override_settings(STATICFILES_STORAGE='imagekitio_storage.storage.StaticImagekitStorage')
+    @mock.patch('imagekitio_storage.storage.StaticImagekitStorage.stored_name', return_value='images/hero.jpg')
+    @mock.patch('imagekitio_storage.templatetags.imagekit_static.build_url', side_effect=fake_url)
+    def test_secure_requests_get_secure_variants(self, static_url_mock, stored_name_mock, url_mock):
+        source = "{% imagekit_srcset 'images/hero.jpg' widths='320' %}"
+        self.render(source, request=RequestFactory().get('/', secure=True))
+        self.render(source, request=RequestFactory().get('/'))
+        self.render("{% imagekit_srcset 'images/hero.jpg' widths='320' secure=False %}",
+                    request=RequestFactory().get('/', secure=True))
+        transformations = [call[0][0]['transformation'] for call in url_mock.call_args_list]
+        self.assertEqual(transformations, [[{'secure': True, 'width': 320}], [{'width': 320}],
+                                           [{'secure': False, 'width': 320}]])
+
+    def test_storage_file_srcset_of_secure_request_is_secure(self, url_mock):
+        image = mock.Mock()
+        image.name = 'images/hero.jpg'
+        image.storage.srcset.return_value = URL + ' 320w'
+        self.render("{% imagekit_srcset image widths='320' %}", image=image,
+                    request=RequestFactory().get('/', secure=True))
+        image.storage.srcset.assert_called_once_with('images/hero.jpg', '320', secure=True)
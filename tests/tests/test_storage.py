@@ -4,7 +4,6 @@ import os.path
 from django.conf import settings
 from django.core.files.base import ContentFile
 from django.test import SimpleTestCase, override_settings
-from requests.exceptions import HTTPError
 
 from imagekitio_storage import app_settings, imagekit
 from imagekitio_storage.storage import (MediaImagekitStorage, ManifestImagekitStorage, StaticImagekitStorage,
@@ -43,14 +42,6 @@ class ImagekitMediaStorageTests(SimpleTestCase):
         self.storage.delete(file_name)
         self.assertFalse(self.storage.exists(file_name))
 
-    @mock.patch('imagekitio_storage.storage.requests.head')
-    def test_exists_raises_http_error(self, head_mock):
-        response = head_mock.return_value
-        response.status_code = 500
-        response.raise_for_status.side_effect = HTTPError
-        with self.assertRaises(HTTPError):
-            self.storage.exists(get_random_name())
-
     def test_delete_returns_true_when_file_existed(self):
         file_name, file = self.upload_file()
         self.assertTrue(self.storage.delete(file_name))
@@ -80,14 +71,6 @@ class ImagekitMediaStorageTests(SimpleTestCase):
         with self.assertRaises(IOError):
             self.storage.open('name')
 
-    @mock.patch('imagekitio_storage.storage.requests.get')
-    def test_opening_when_imagekit_fails_raises_error(self, get_mock):
-        response = get_mock.return_value
-        response.status_code = 500
-        response.raise_for_status.side_effect = HTTPError
-        with self.assertRaises(IOError):
-            self.storage.open('name')
-
     def test_get_available_name(self):
         name = 'name'
         available_name = self.storage.get_available_name(name)
@@ -104,14 +87,12 @@ class ImagekitMediaStorageTests(SimpleTestCase):
         self.assertEqual(name, available_name)
 
     def test_list_dir(self):
-        file_2_name, file_2 = self.upload_file(prefix='folder/')
+        name = get_random_name()
+        file_2_name = self.storage.save('folder/' + name, ContentFile(self.file_content))
         try:
-            self.assertEqual(self.storage.listdir(''), (['media'], []))
-            file_1_tail = self.file_name.replace('media/', '', 1)
-            self.assertEqual(self.storage.listdir('media/'), (['folder'], [file_1_tail]))
-            file_2_tail = file_2_name.replace('media/folder/', '', 1)
-            self.assertEqual(self.storage.listdir('media/folder'),
-                             ([], [file_2_tail]))
+            directories, files = self.storage.listdir('')
+            self.assertIn('folder', directories)
+            self.assertEqual(self.storage.listdir('folder/'), ([], [name]))
         finally:
             self.storage.delete(file_2_name)
 
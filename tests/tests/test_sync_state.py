@@ -0,0 +1,140 @@
+import os
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, override_settings
+
+from imagekitio_storage import app_settings
+from imagekitio_storage.helpers import get_resource_metadata
+from imagekitio_storage.management.commands.collectstatic import Command
+from imagekitio_storage.storage import ManifestImagekitStorage, StaticImagekitStorage
+from imagekitio_storage.sync_state import SyncState
+from tests.tests.test_helpers import execute_command, get_random_file_id, import_mock, get_file_details_result
+
+mock = import_mock()
+
+
+class SyncStateTests(SimpleTestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        self.storage = ManifestImagekitStorage(location=self.location)
+
+    def test_state_is_saved_and_loaded(self):
+        state = SyncState(self.storage, 'state.json', ['endpoint', 'folder', None])
+        state.set('css/style.css', 'hash', 'file-id')
+        state.save()
+        state = SyncState(self.storage, 'state.json', ['endpoint', 'folder', None])
+        self.assertEqual(state.get_hash('css/style.css'), 'hash')
+        self.assertEqual(state.files['css/style.css']['file_id'], 'file-id')
+
+    def test_state_of_other_target_is_ignored(self):
+        state = SyncState(self.storage, 'state.json', ['endpoint', 'folder', None])
+        state.set('css/style.css', 'hash', 'file-id')
+        state.save()
+        state = SyncState(self.storage, 'state.json', ['other-endpoint', 'folder', None])
+        self.assertIsNone(state.get_hash('css/style.css'))
+
+    def test_invalid_state_is_ignored(self):
+        with open(os.path.join(self.location, 'state.json'), 'w') as state_file:
+            state_file.write('{invalid')
+        self.assertEqual(SyncState(self.storage, 'state.json', None).files, {})
+
+    def test_unchanged_state_is_not_written(self):
+        SyncState(self.storage, 'state.json', None).save()
+        self.assertFalse(self.storage.exists('state.json'))
+
+
+@mock.patch.object(StaticImagekitStorage, '_upload')
+@mock.patch.object(StaticImagekitStorage, '_exists_with_etag')
+class StaticStorageSyncStateTests(SimpleTestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        patcher = mock.patch('imagekitio_storage.storage.ManifestImagekitStorage',
+                             return_value=ManifestImagekitStorage(location=self.location))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.storage = StaticImagekitStorage()
+        self.file_id = get_random_file_id()
+
+    def test_unchanged_file_is_skipped_without_network(self, exists_with_etag_mock, upload_mock):
+        exists_with_etag_mock.return_value = False
+        upload_mock.return_value = get_file_details_result(self.file_id)
+        self.storage.save('css/style.css', ContentFile(b'body {}'))
+        self.storage.save_sync_state()
+
+        storage = StaticImagekitStorage()
+        with mock.patch('imagekitio_storage.storage.get_session') as get_session_mock:
+            self.assertTrue(storage.is_synced('css/style.css', ContentFile(b'body {}')))
+            storage.save('css/style.css', ContentFile(b'body {}'))
+        self.assertEqual(upload_mock.call_count, 1)
+        self.assertEqual(exists_with_etag_mock.call_count, 1)
+        self.assertFalse(get_session_mock.called)
+        self.assertEqual(storage.sync_state.files['css/style.css']['file_id'], self.file_id)
+
+    def test_changed_file_is_uploaded(self, exists_with_etag_mock, upload_mock):
+        exists_with_etag_mock.return_value = False
+        upload_mock.return_value = get_file_details_result(self.file_id)
+        self.storage.save('css/style.css', ContentFile(b'body {}'))
+        self.assertFalse(self.storage.is_synced('css/style.css', ContentFile(b'body { margin: 0; }')))
+        self.storage.save('css/style.css', ContentFile(b'body { margin: 0; }'))
+        self.assertEqual(upload_mock.call_count, 2)
+
+    def test_remote_is_verified_on_demand(self, exists_with_etag_mock, upload_mock):
+        exists_with_etag_mock.return_value = True
+        self.storage.verify_remote = True
+        with mock.patch.object(StaticImagekitStorage, '_get_metadata', return_value={'file_id': self.file_id}):
+            self.storage.save('css/style.css', ContentFile(b'body {}'))
+        self.assertTrue(exists_with_etag_mock.called)
+        self.assertFalse(upload_mock.called)
+        self.assertEqual(self.storage.sync_state.files['css/style.css']['file_id'], self.file_id)
+
+
+@override_settings(STATICFILES_STORAGE='imagekitio_storage.storage.StaticImagekitStorage')
+@mock.patch.object(StaticImagekitStorage, '_upload')
+@mock.patch.object(StaticImagekitStorage, '_exists_with_etag', return_value=True)
+class CollectStaticWithoutSyncStateTests(SimpleTestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        patcher = mock.patch('imagekitio_storage.storage.ManifestImagekitStorage',
+                             return_value=ManifestImagekitStorage(location=self.location))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(StaticImagekitStorage, '_get_metadata',
+                                    side_effect=lambda name: get_resource_metadata(
+                                        get_file_details_result(get_random_file_id(), file_path='/' + name)))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_files_already_in_imagekit_are_not_uploaded_again(self, exists_with_etag_mock, upload_mock):
+        with open(os.path.join(self.location, app_settings.STATICFILES_SYNC_STATE_NAME), 'w') as state_file:
+            state_file.write('{}')
+        execute_command('collectstatic', '--noinput')
+        self.assertTrue(exists_with_etag_mock.called)
+        self.assertFalse(upload_mock.called)
+        state = StaticImagekitStorage().sync_state
+        self.assertEqual(len(state.files), exists_with_etag_mock.call_count)
+
+
+class CollectStaticSyncStateTests(SimpleTestCase):
+    def setUp(self):
+        self.command = Command()
+        self.command.unmodified_files = []
+        self.command.verbosity = 0
+        self.command.verify_remote = False
+        self.command.storage = mock.Mock()
+        self.source_storage = mock.MagicMock()
+
+    def test_synced_file_is_skipped(self):
+        self.command.storage.is_synced.return_value = True
+        self.assertFalse(self.command.delete_file('path', 'path', self.source_storage))
+        self.assertEqual(self.command.unmodified_files, ['path'])
+        self.assertFalse(self.command.storage.get_modified_time.called)
+
+    def test_not_synced_file_is_copied(self):
+        self.command.storage.is_synced.return_value = False
+        self.assertTrue(self.command.delete_file('path', 'path', self.source_storage))
+        self.assertFalse(self.command.storage.get_modified_time.called)
@@ -0,0 +1,63 @@
+from django.template import Context, Template, TemplateSyntaxError
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from imagekitio_storage.templatetags.imagekit_static import clear_static_url_cache
+from tests.tests.test_helpers import import_mock
+
+mock = import_mock()
+
+
+@override_settings(STATICFILES_STORAGE='imagekitio_storage.storage.StaticImagekitStorage')
+@mock.patch('imagekitio_storage.templatetags.imagekit_static.build_url',
+            side_effect=lambda options: 'https://ik.imagekit.io/{path}?{transformation}'.format(**options))
+class ImagekitStaticTagTests(SimpleTestCase):
+    def setUp(self):
+        clear_static_url_cache()
+        self.addCleanup(clear_static_url_cache)
+
+    def render(self, source, **context):
+        return Template('{% load imagekit_static %}' + source).render(Context(context))
+
+    def test_url_is_built_once_for_literal_arguments(self, url_mock):
+        template = Template("{% load imagekit_static %}{% imagekit_static 'images/logo.png' width=450 height=450 %}")
+        with mock.patch('imagekitio_storage.storage.StaticImagekitStorage.stored_name',
+                        side_effect=lambda name: 'static/' + name) as stored_name_mock:
+            outputs = {template.render(Context()) for _ in range(100)}
+        self.assertEqual(len(outputs), 1)
+        self.assertIn('static/images/logo.png', outputs.pop())
+        self.assertEqual(stored_name_mock.call_count, 1)
+        self.assertEqual(url_mock.call_count, 1)
+        self.assertEqual(url_mock.call_args[0][0]['transformation'], [{'width': 450, 'height': 450}])
+
+    def test_variable_arguments_are_resolved_on_render(self, url_mock):
+        source = "{% imagekit_static path options width=width %}"
+        first = self.render(source, path='images/a.png', options={'quality': 80}, width=100)
+        second = self.render(source, path='images/b.png', options={'quality': 80}, width=200)
+        self.assertIn('images/a.png', first)
+        self.assertIn('images/b.png', second)
+        self.assertEqual(url_mock.call_args_list[0][0][0]['transformation'], [{'quality': 80, 'width': 100}])
+        self.render(source, path='images/a.png', options={'quality': 80}, width=100)
+        self.assertEqual(url_mock.call_count, 2)
+
+    def test_secure_requests_get_secure_urls(self, url_mock):
+        request = RequestFactory().get('/', secure=True)
+        self.render("{% imagekit_static 'images/logo.png' %}", request=request)
+        self.render("{% imagekit_static 'images/logo.png' %}", request=RequestFactory().get('/'))
+        transformations = [call[0][0]['transformation'] for call in url_mock.call_args_list]
+        self.assertEqual(transformations, [[{'secure': True}], [{}]])
+
+    def test_unhashable_options_are_not_memoized(self, url_mock):
+        source = "{% imagekit_static 'images/logo.png' overlay=overlay %}"
+        self.render(source, overlay=['a'])
+        self.render(source, overlay=['a'])
+        self.assertEqual(url_mock.call_count, 2)
+
+    def test_url_can_be_stored_in_variable(self, url_mock):
+        output = self.render("{% imagekit_static 'images/logo.png' width=10 as logo %}<img src=\"{{ logo }}\">")
+        self.assertTrue(output.startswith('<img src="https://ik.imagekit.io/'))
+
+    def test_path_is_required(self, url_mock):
+        with self.assertRaises(TemplateSyntaxError):
+            self.render("{% imagekit_static %}")
+        with self.assertRaises(TemplateSyntaxError):
+            self.render("{% imagekit_static 'images/logo.png' width=10 extra %}")
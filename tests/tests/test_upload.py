@@ -0,0 +1,84 @@
+import io
+import tempfile
+import tracemalloc
+
+from django.core.files.base import ContentFile, File
+from django.test import SimpleTestCase
+from imagekitio.models.UploadFileRequestOptions import UploadFileRequestOptions
+
+from imagekitio_storage.resource import ImageKitResource
+from imagekitio_storage.storage import MediaImagekitStorage
+from tests.tests.test_helpers import import_mock
+
+mock = import_mock()
+
+
+class FakeUploadServer(object):
+    """
+    Consumes streamed request bodies in small chunks, like a socket would.
+    """
+
+    def __init__(self, keep_body=True):
+        self.keep_body = keep_body
+        self.body = b''
+        self.headers = None
+
+    def request(self, method, url, headers, params=None, files=None, data=None):
+        self.headers = headers
+        while True:
+            chunk = data.read(64 * 1024)
+            if not chunk:
+                break
+            if self.keep_body:
+                self.body += chunk
+        response = mock.Mock(status_code=200, headers={})
+        response.json.return_value = {'fileId': 'file-id', 'name': 'name', 'filePath': '/folder/name',
+                                      'url': 'https://ik.imagekit.io/xxx/folder/name', 'size': 1,
+                                      'AITags': [], 'versionInfo': {'id': 'file-id', 'name': 'Version 1'}}
+        return response
+
+
+class NonSeekableStream(object):
+    def __init__(self, data):
+        self.read = io.BytesIO(data).read
+
+
+class StreamingUploadTests(SimpleTestCase):
+    def setUp(self):
+        self.server = FakeUploadServer()
+        patcher = mock.patch.object(ImageKitResource, 'request', side_effect=self.server.request)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.resource = ImageKitResource(private_key='private', public_key='public', url_endpoint='endpoint')
+
+    def test_file_is_sent_as_binary_multipart(self):
+        content = bytes(range(256))
+        response = self.resource.upload(ContentFile(content), 'name',
+                                        UploadFileRequestOptions(folder='/folder', tags=['a', 'b'],
+                                                                 use_unique_file_name=False))
+        self.assertIn(content, self.server.body)
+        self.assertIn(b'name="folder"\r\n\r\n/folder', self.server.body)
+        self.assertIn(b'name="tags"\r\n\r\na,b', self.server.body)
+        self.assertIn(b'name="useUniqueFileName"\r\n\r\nfalse', self.server.body)
+        self.assertTrue(self.server.headers['Content-Type'].startswith('multipart/form-data'))
+        self.assertEqual(response.file_id, 'file-id')
+
+    def test_storage_spools_stream_of_unknown_size(self):
+        storage = MediaImagekitStorage()
+        content = File(NonSeekableStream(b'streamed content'), 'name')
+        with mock.patch.object(storage, '_get_resource', return_value=self.resource):
+            storage._save('name', content)
+        self.assertIn(b'streamed content', self.server.body)
+
+    def test_memory_usage_doesnt_grow_with_file_size(self):
+        self.server.keep_body = False
+        peaks = []
+        for size in (4, 16):
+            with tempfile.TemporaryFile() as file:
+                file.truncate(size * 1024 * 1024)
+                tracemalloc.start()
+                self.resource.upload(File(file, 'name'), 'name')
+                peaks.append(tracemalloc.get_traced_memory()[1])
+                tracemalloc.stop()
+        self.assertLess(peaks[1], 1024 * 1024)
+        self.assertLess(peaks[1], peaks[0] * 2)
@@ -0,0 +1,88 @@
+import datetime
+
+from django.test import SimpleTestCase
+
+from imagekitio_storage import ik_api
+from imagekitio_storage.url_builder import build_url, get_signature, get_transformation_string
+from tests.tests.test_helpers import import_mock
+
+mock = import_mock()
+
+TRANSFORMATIONS = [
+    None,
+    [],
+    [{}],
+    [{'width': 300, 'height': 200}],
+    [{'width': 300}, {'rotation': 90, 'format': 'webp'}],
+    [{'progressive': True, 'lossless': False, 'effect_gray': '-'}],
+    [{'overlay_image': '/folder/overlay.png', 'default_image': 'folder/default.png'}],
+    [{'raw': 'w-100,h-100', 'named': 'thumbnail'}],
+    [{'overlay_text': 'Hello world & more', 'not_supported': 'value'}],
+    [{'width': 1.5, 'quality': 'auto'}],
+]
+
+
+class UrlBuilderTests(SimpleTestCase):
+    def setUp(self):
+        # the endpoint of the test settings can be a placeholder, which urls are left to the SDK for
+        patcher = mock.patch.object(ik_api.ik_request, 'url_endpoint', 'https://ik.imagekit.io/endpoint')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assertSameUrl(self, options):
+        self.assertEqual(build_url(dict(options)), ik_api.url(dict(options)), options)
+
+    def test_urls_are_same_as_sdk_urls(self):
+        endpoint = ik_api.ik_request.url_endpoint.rstrip('/')
+        for transformation in TRANSFORMATIONS:
+            for position in ('path', 'query'):
+                for signed in (False, True):
+                    for source in ({'path': '/folder/image.jpg'}, {'path': 'folder/źdźbło file.jpg/'},
+                                   {'src': endpoint + '/folder/image.jpg'}):
+                        options = dict(source, transformation_position=position, signed=signed)
+                        if transformation is not None:
+                            options['transformation'] = transformation
+                        self.assertSameUrl(options)
+
+    def test_expiring_signed_urls_are_same_as_sdk_urls(self):
+        now = datetime.datetime(2024, 1, 1, 12, 0, 0)
+        with mock.patch('imagekitio.url.dt') as sdk_dt_mock, \
+                mock.patch('imagekitio_storage.url_builder.dt') as dt_mock:
+            sdk_dt_mock.now.return_value = dt_mock.now.return_value = now
+            self.assertSameUrl({'path': 'image.jpg', 'signed': True, 'expire_seconds': 300,
+                                'transformation': [{'width': 100}], 'transformation_position': 'query'})
+            self.assertSameUrl({'path': 'image.jpg', 'signed': True, 'expire_seconds': 300})
+
+    @mock.patch.object(ik_api, 'url', wraps=ik_api.url)
+    def test_common_urls_are_built_without_sdk(self, url_mock):
+        build_url({'path': 'image.jpg', 'transformation': [{'width': 100}], 'transformation_position': 'query'})
+        build_url({'src': ik_api.ik_request.url_endpoint.rstrip('/') + '/image.jpg', 'signed': True,
+                   'transformation': [{'width': 100}]})
+        self.assertFalse(url_mock.called)
+
+    @mock.patch.object(ik_api, 'url', return_value='sdk-url')
+    def test_other_options_are_left_to_sdk(self, url_mock):
+        endpoint = ik_api.ik_request.url_endpoint.rstrip('/')
+        for options in ({'path': 'image.jpg', 'query_parameters': {'v': '1'}},
+                        {'path': 'image.jpg', 'transformationPosition': 'query'},
+                        {'src': 'https://example.com/image.jpg'},
+                        {'src': endpoint + '/image.jpg?v=1'},
+                        {'path': 'image.jpg;v=1'}):
+            self.assertEqual(build_url(options), 'sdk-url')
+        self.assertEqual(url_mock.call_count, 5)
+
+    def test_sdk_fallbacks_are_same_as_sdk_urls(self):
+        endpoint = ik_api.ik_request.url_endpoint.rstrip('/')
+        self.assertSameUrl({'src': endpoint + '/image.jpg?v=1', 'transformation': [{'width': 100}]})
+        self.assertSameUrl({'path': 'image.jpg', 'query_parameters': {'v': '1'}, 'signed': True})
+        self.assertSameUrl({'path': ''})
+
+    def test_transformations_of_different_types_are_not_mixed_up(self):
+        self.assertEqual(get_transformation_string([{'lossless': 1}]), 'lo-1')
+        self.assertEqual(get_transformation_string([{'lossless': True}]), 'lo-true')
+
+    def test_signature_is_same_for_reused_key(self):
+        self.assertEqual(get_signature('private-key', 'image.jpg9999999999'),
+                         get_signature('private-key', 'image.jpg9999999999'))
+        self.assertNotEqual(get_signature('private-key', 'image.jpg9999999999'),
+                            get_signature('other-key', 'image.jpg9999999999'))
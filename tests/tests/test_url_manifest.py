@@ -0,0 +1,140 @@
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from imagekitio_storage import app_settings
+from imagekitio_storage.storage import ManifestImagekitStorage, StaticHashedImagekitStorage, StaticImagekitStorage
+from imagekitio_storage.templatetags.imagekit_static import clear_static_url_cache
+from imagekitio_storage.url_manifest import UrlManifest
+from tests.tests.test_helpers import get_file_details_result, get_random_file_id, import_mock
+
+mock = import_mock()
+
+TRANSFORMATIONS = {'thumbnail': {'width': 100, 'height': 100}}
+
+
+class UrlManifestTests(SimpleTestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        self.storage = ManifestImagekitStorage(location=self.location)
+
+    def get_manifest(self, target=None, transformations=None):
+        return UrlManifest(self.storage, 'urls.json', target or ['endpoint', 'folder', None], transformations)
+
+    def test_urls_are_saved_and_loaded(self):
+        self.get_manifest(transformations=TRANSFORMATIONS).save(
+            {'images/logo.png': 'https://cdn/logo.png'},
+            {'thumbnail': {'images/logo.png': 'https://cdn/logo.png?tr=w-100'}})
+        manifest = self.get_manifest(transformations=TRANSFORMATIONS)
+        self.assertEqual(manifest.get('images/logo.png'), 'https://cdn/logo.png')
+        self.assertEqual(manifest.get('images/logo.png', 'thumbnail'), 'https://cdn/logo.png?tr=w-100')
+        self.assertIsNone(manifest.get('images/other.png'))
+        self.assertIsNone(manifest.get('images/logo.png', 'other'))
+
+    def test_manifest_of_other_target_is_ignored(self):
+        self.get_manifest().save({'images/logo.png': 'https://cdn/logo.png'}, {})
+        self.assertIsNone(self.get_manifest(target=['other-endpoint', 'folder', None]).get('images/logo.png'))
+
+    def test_transformed_urls_are_ignored_when_transformations_change(self):
+        self.get_manifest(transformations=TRANSFORMATIONS).save(
+            {'images/logo.png': 'https://cdn/logo.png'},
+            {'thumbnail': {'images/logo.png': 'https://cdn/logo.png?tr=w-100'}})
+        manifest = self.get_manifest(transformations={'thumbnail': {'width': 200}})
+        self.assertEqual(manifest.get('images/logo.png'), 'https://cdn/logo.png')
+        self.assertIsNone(manifest.get('images/logo.png', 'thumbnail'))
+
+    def test_unchanged_manifest_is_not_written(self):
+        self.get_manifest().save({}, {})
+        self.assertFalse(self.storage.exists('urls.json'))
+
+
+@override_settings(DEBUG=False)
+@mock.patch.object(app_settings, 'STATIC_URL_TRANSFORMATIONS', TRANSFORMATIONS)
+@mock.patch.object(StaticImagekitStorage, '_exists_with_etag', return_value=False)
+@mock.patch.object(StaticImagekitStorage, '_upload',
+                   side_effect=lambda file, file_name, options: get_file_details_result(
+                       get_random_file_id(), '/{}'.format(file_name)))
+class StaticStorageUrlManifestTests(SimpleTestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.location)
+        patcher = mock.patch('imagekitio_storage.storage.ManifestImagekitStorage',
+                             return_value=ManifestImagekitStorage(location=self.location))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def collect(self, storage, names):
+        for name in names:
+            storage.save(name, ContentFile(name.encode()))
+        storage.save_sync_state()
+        storage.save_url_manifest()
+
+    def test_urls_are_resolved_without_network(self, upload_mock, exists_with_etag_mock):
+        self.collect(StaticImagekitStorage(), ['css/style.css', 'images/logo.png'])
+        storage = StaticImagekitStorage()
+        with mock.patch.object(StaticImagekitStorage, '_get_metadata') as get_metadata_mock:
+            self.assertEqual(storage.url('css/style.css'), 'https://ik.imagekit.io/xxx/static/css/style.css')
+            self.assertEqual(storage.url('images/logo.png'), 'https://ik.imagekit.io/xxx/static/images/logo.png')
+        self.assertFalse(get_metadata_mock.called)
+        self.assertEqual(storage.url_manifest.get('images/logo.png', 'thumbnail'),
+                         'https://ik.imagekit.io/xxx/static/images/logo.png?tr=w-100%2Ch-100')
+        self.assertIsNone(storage.url_manifest.get('css/style.css', 'thumbnail'))
+
+    def test_urls_missing_in_sync_state_are_looked_up(self, upload_mock, exists_with_etag_mock):
+        storage = StaticImagekitStorage()
+        storage.sync_state.set('css/style.css', 'hash', 'file-id')
+        with mock.patch.object(StaticImagekitStorage, '_get_metadata',
+                               return_value={'url': 'https://ik.imagekit.io/xxx/style.css'}):
+            storage.save_url_manifest()
+        self.assertEqual(StaticImagekitStorage().url('css/style.css'), 'https://ik.imagekit.io/xxx/style.css')
+
+    def test_original_names_of_post_processed_files_are_mapped(self, upload_mock, exists_with_etag_mock):
+        source_storage = FileSystemStorage(location=tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, source_storage.location)
+        source_storage.save('css/style.css', ContentFile(b'body { margin: 0; }'))
+        source_storage.save('images/logo.png', ContentFile(b'png'))
+        storage = StaticHashedImagekitStorage()
+        paths = {path: (source_storage, path) for path in ('css/style.css', 'images/logo.png')}
+        processed = list(storage.post_process(paths))
+        self.assertFalse([error for name, hashed_name, error in processed if isinstance(error, Exception)])
+        storage.save_sync_state()
+        storage.save_url_manifest()
+
+        storage = StaticHashedImagekitStorage()
+        with mock.patch.object(StaticImagekitStorage, '_get_metadata') as get_metadata_mock:
+            style_url = storage.url('css/style.css')
+            logo_url = storage.url('images/logo.png')
+        self.assertFalse(get_metadata_mock.called)
+        self.assertRegex(style_url, r'^https://ik\.imagekit\.io/xxx/static/css/style\.\w{12}\.css$')
+        self.assertRegex(logo_url, r'^https://ik\.imagekit\.io/xxx/static/images/logo\.\w{12}\.png$')
+        self.assertEqual(storage.get_manifest_url('css/style.css'), style_url)
+        self.assertEqual(storage.get_manifest_url(storage.stored_name('css/style.css')), style_url)
+
+    @override_settings(STATICFILES_STORAGE='imagekitio_storage.storage.StaticImagekitStorage')
+    def test_template_tag_resolves_urls_from_manifest(self, upload_mock, exists_with_etag_mock):
+        self.collect(StaticImagekitStorage(), ['images/logo.png'])
+        clear_static_url_cache()
+        self.addCleanup(clear_static_url_cache)
+        template = Template("{% load imagekit_static %}{% imagekit_static 'images/logo.png' %} "
+                            "{% imagekit_static 'images/logo.png' transformation='thumbnail' %}")
+        with mock.patch('imagekitio_storage.templatetags.imagekit_static.build_url') as build_url_mock:
+            output = template.render(Context())
+        self.assertFalse(build_url_mock.called)
+        self.assertEqual(output, 'https://ik.imagekit.io/xxx/static/images/logo.png '
+                                 'https://ik.imagekit.io/xxx/static/images/logo.png?tr=w-100%2Ch-100')
+
+    @override_settings(STATICFILES_STORAGE='imagekitio_storage.storage.StaticImagekitStorage')
+    def test_template_tag_expands_transformation_missing_in_manifest(self, upload_mock, exists_with_etag_mock):
+        clear_static_url_cache()
+        self.addCleanup(clear_static_url_cache)
+        template = Template("{% load imagekit_static %}"
+                            "{% imagekit_static 'images/logo.png' transformation='thumbnail' %}")
+        with mock.patch('imagekitio_storage.templatetags.imagekit_static.build_url') as build_url_mock:
+            build_url_mock.return_value = 'https://ik.imagekit.io/xxx/static/images/logo.png?tr=w-100%2Ch-100'
+            template.render(Context())
+        self.assertEqual(build_url_mock.call_args[0][0]['transformation'], [{'width': 100, 'height': 100}])
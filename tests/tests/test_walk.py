@@ -0,0 +1,102 @@
+import shutil
+import tempfile
+import threading
+
+from django.test import SimpleTestCase
+
+from imagekitio_storage.helpers import walk_folders
+from imagekitio_storage.storage import ManifestImagekitStorage, MediaImagekitStorage, StaticImagekitStorage
+from imagekitio_storage.sync_state import SyncState
+from tests.tests.test_helpers import import_mock, get_fake_list_files, get_file_details_result
+
+mock = import_mock()
+
+
+def get_files(storage, names, mimes=None):
+    mimes = mimes or {}
+    return [get_file_details_result(name, file_path=storage._get_remote_path(name), mime=mimes.get(name))
+            for name in names]
+
+
+@mock.patch('imagekitio_storage.helpers.ik_api')
+class WalkFoldersTests(SimpleTestCase):
+    def test_folders_are_walked_top_down(self, ik_api_mock):
+        file_paths = ['/root/1', '/root/a/2', '/root/a/b/3', '/root/c/4']
+        ik_api_mock.list_files.side_effect = get_fake_list_files(
+            [get_file_details_result(path.rsplit('/', 1)[1], file_path=path) for path in file_paths])
+        walked = list(walk_folders('/root/'))
+        folders = [folder for folder, subfolders, files in walked]
+        self.assertEqual(sorted(folders), ['/root', '/root/a', '/root/a/b', '/root/c'])
+        self.assertEqual(folders[0], '/root')
+        self.assertLess(folders.index('/root/a'), folders.index('/root/a/b'))
+        listed = {folder: (subfolders, [resource.file_path for resource in files])
+                  for folder, subfolders, files in walked}
+        self.assertEqual(listed['/root'], (['a', 'c'], ['/root/1']))
+        self.assertEqual(listed['/root/a/b'], ([], ['/root/a/b/3']))
+
+    def test_sibling_folders_are_listed_concurrently(self, ik_api_mock):
+        barrier = threading.Barrier(2, timeout=5)
+        fake_list_files = get_fake_list_files(
+            [get_file_details_result('1', file_path='/root/a/1'), get_file_details_result('2', file_path='/root/b/2')])
+
+        def list_files(options):
+            if options.path in ('/root/a', '/root/b') and options.type == 'file':
+                # fails with BrokenBarrierError unless both siblings are listed at the same time
+                barrier.wait()
+            return fake_list_files(options)
+
+        ik_api_mock.list_files.side_effect = list_files
+        self.assertEqual(len(list(walk_folders('/root', max_workers=2))), 3)
+
+    def test_folders_are_yielded_as_listed(self, ik_api_mock):
+        ik_api_mock.list_files.side_effect = get_fake_list_files(
+            [get_file_details_result('1', file_path='/root/a/1')])
+        walk = walk_folders('/root')
+        self.assertEqual(next(walk)[0], '/root')
+        walk.close()
+
+
+@mock.patch('imagekitio_storage.helpers.ik_api')
+class StorageWalkTests(SimpleTestCase):
+    def test_listdir(self, ik_api_mock):
+        for storage in (MediaImagekitStorage(), StaticImagekitStorage()):
+            ik_api_mock.list_files.side_effect = get_fake_list_files(
+                get_files(storage, ['file.txt', 'folder/a.txt', 'folder/b.txt', 'folder/nested/c.txt']))
+            self.assertEqual(storage.listdir(''), (['folder'], ['file.txt']))
+            self.assertEqual(storage.listdir('folder/'), (['nested'], ['a.txt', 'b.txt']))
+            self.assertEqual(storage.listdir('folder/nested'), ([], ['c.txt']))
+            self.assertEqual(storage.listdir('missing'), ([], []))
+
+    def test_walk(self, ik_api_mock):
+        storage = MediaImagekitStorage()
+        ik_api_mock.list_files.side_effect = get_fake_list_files(
+            get_files(storage, ['file.txt', 'folder/a.txt', 'folder/nested/c.txt', 'other/d.txt']))
+        self.assertEqual(sorted(storage.walk()), [
+            ('', ['folder', 'other'], ['file.txt']),
+            ('folder', ['nested'], ['a.txt']),
+            ('folder/nested', [], ['c.txt']),
+            ('other', [], ['d.txt']),
+        ])
+        self.assertEqual(sorted(storage.walk('folder')), [
+            ('folder', ['nested'], ['a.txt']),
+            ('folder/nested', [], ['c.txt']),
+        ])
+
+    def test_static_images_and_videos_are_listed_with_extensions(self, ik_api_mock):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        storage = StaticImagekitStorage()
+        storage.sync_state = SyncState(ManifestImagekitStorage(location=location), 'state.json', None)
+        storage.sync_state.set('images/photo.jpeg', 'hash', 'file-id')
+        names = ['images/logo.png', 'images/photo.jpeg', 'images/icon.svg', 'videos/intro.mp4', 'css/style.css']
+        mimes = {'images/logo.png': 'image/png', 'images/photo.jpeg': 'image/jpeg',
+                 'images/icon.svg': 'image/svg+xml', 'videos/intro.mp4': 'video/mp4', 'css/style.css': 'text/css'}
+        ik_api_mock.list_files.side_effect = get_fake_list_files(get_files(storage, names, mimes))
+        subfolders, files = storage.listdir('images')
+        self.assertEqual(sorted(files), ['icon.svg', 'logo.png', 'photo.jpeg'])
+        self.assertEqual(sorted((directory, sorted(files)) for directory, subfolders, files in storage.walk()), [
+            ('', []),
+            ('css', ['style.css']),
+            ('images', ['icon.svg', 'logo.png', 'photo.jpeg']),
+            ('videos', ['intro.mp4']),
+        ])